@@ -1,29 +1,110 @@
-from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from abc import ABC
+from typing import Dict, Any, Callable, FrozenSet, Optional
 from datetime import datetime
+import time
+from .task_history import TaskHistory, get_history_sink
+from . import metrics, settings
+
+
+def task_handler(*task_types: str) -> Callable:
+    """Declare the task types an agent method handles; the method is called with the task data"""
+    def register(method: Callable) -> Callable:
+        method.handles_tasks = getattr(method, "handles_tasks", ()) + task_types
+        return method
+    return register
 
 
 class BaseAgent(ABC):
-    """Base class for all agents in the system"""
+    """Base class for all agents in the system
+
+    Subclasses mark their handlers with @task_handler; the handlers of a
+    class and its bases are collected once, when the class is defined, into
+    `task_handlers`, so dispatching a task is a single dict lookup.
+    """
+
+    # Key of the agent in the orchestrator's registry, e.g. "kpi"
+    agent_type: str = ""
+
+    # Task types whose handlers are CPU-heavy and may run in a worker process
+    cpu_bound_tasks: FrozenSet[str] = frozenset()
+
+    # Task types changing state held in the agent's memory, which every
+    # server worker process must apply; applying one twice must be harmless.
+    # Other workers' tasks are replayed on a worker thread, so their handlers
+    # must be safe to run alongside the event loop
+    replicated_tasks: FrozenSet[str] = frozenset()
+
+    # Task types whose state stays in the memory of one server worker
+    # process; they are refused while several workers share state
+    worker_local_tasks: FrozenSet[str] = frozenset()
+
+    # Task type -> name of the method handling it
+    task_handlers: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        handlers: Dict[str, str] = {}
+        for klass in reversed(cls.__mro__):
+            for name, member in vars(klass).items():
+                for task_type in getattr(member, "handles_tasks", ()):
+                    handlers[task_type] = name
+        cls.task_handlers = handlers
 
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
         self.created_at = datetime.now()
-        self.task_history: List[Dict[str, Any]] = []
+        self.task_history = TaskHistory(
+            name,
+            max_entries=settings.HISTORY_MAX_ENTRIES,
+            sink=get_history_sink(settings.HISTORY_SINK)
+        )
 
-    @abstractmethod
     async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Process a task and return results"""
+        started = time.perf_counter()
+        try:
+            result = await self.handle(task)
+        except Exception:
+            self.log_failure(task, (time.perf_counter() - started) * 1000)
+            raise
+        self.log_task(task, result, (time.perf_counter() - started) * 1000)
+        return result
+
+    async def handle(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task and return results without recording it in the history"""
+        task_type = task.get("type", "")
+        handler = self.task_handlers.get(task_type)
+        if handler is None:
+            return {
+                "status": "error",
+                "message": f"Unknown task type: {task_type}"
+            }
+        return await getattr(self, handler)(task.get("data", {}))
+
+    def replicated_state(self) -> Dict[str, Any]:
+        """JSON-serializable state changed by replicated_tasks, for workers starting later"""
+        return {}
+
+    def restore_replicated_state(self, state: Dict[str, Any]):
+        """Apply a state from replicated_state"""
         pass
 
-    def log_task(self, task: Dict[str, Any], result: Dict[str, Any]):
-        """Log task execution"""
-        self.task_history.append({
-            "timestamp": datetime.now().isoformat(),
-            "task": task,
-            "result": result
-        })
+    def log_task(self, task: Dict[str, Any], result: Dict[str, Any],
+                 duration_ms: Optional[float] = None, queue_wait_ms: Optional[float] = None,
+                 **details: Any):
+        """Log a compact summary of a task execution and update the task metrics"""
+        if queue_wait_ms is not None:
+            details["queue_wait_ms"] = round(queue_wait_ms, 3)
+        entry = self.task_history.record(task, result, duration_ms, **details)
+        metrics.registry.observe(
+            self.name, entry["type"], entry["status"] == "error",
+            duration_ms, queue_wait_ms, entry["input_items"]
+        )
+
+    def log_failure(self, task: Dict[str, Any], duration_ms: Optional[float] = None, **details: Any):
+        """Log a task whose handler raised"""
+        self.log_task(task, {"status": "error"}, duration_ms, **details)
 
     def get_info(self) -> Dict[str, Any]:
         """Get agent information"""
@@ -31,5 +112,8 @@ class BaseAgent(ABC):
             "name": self.name,
             "description": self.description,
             "created_at": self.created_at.isoformat(),
-            "tasks_completed": len(self.task_history)
+            "tasks_completed": self.task_history.total,
+            "tasks_failed": self.task_history.failed,
+            "recent_tasks": self.task_history.recent(settings.STATUS_RECENT_TASKS),
+            "task_types": sorted(self.task_handlers)
         }
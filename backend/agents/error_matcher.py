@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import copy
+import re
+
+
+_GROUP_PREFIX = "_err"
+_REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+
+class ErrorMatcher:
+    """Matches log lines against many error patterns in a single pass
+
+    Patterns are folded into a single alternation, so each line is scanned
+    once instead of once per pattern, and the match tells us which pattern
+    hit. Plain-literal patterns are matched case-insensitively by lowercasing
+    the line once and running a case-sensitive alternation, which is several
+    times faster than re.IGNORECASE; any other pattern goes into an
+    alternation of named groups.
+
+    A line is reported with the first pattern, in the configured order, that
+    matches it. The alternations find the leftmost match, which may come
+    from a later pattern, so on a hit the patterns listed before it are
+    checked one by one; that only happens for error lines.
+    """
+
+    def __init__(self, patterns: List[str], flags: int = re.IGNORECASE):
+        self.flags = flags
+        self.patterns: List[str] = []
+        # Lowercased literal -> index of the first pattern it stands for
+        self._literals: Dict[str, int] = {}
+        self._literal_regex: Optional[re.Pattern] = None
+        self._regex: Optional[re.Pattern] = None
+        # Per pattern: the lowercased literal (str) or the compiled pattern
+        self._checks: List[Union[str, re.Pattern]] = []
+        self.add_patterns(patterns)
+
+    def add_patterns(self, patterns: List[str]):
+        """Register additional error patterns and rebuild the matcher once"""
+        new_patterns = [p for p in dict.fromkeys(patterns) if p not in self.patterns]
+        for pattern in new_patterns:
+            self._validate(pattern)
+        if new_patterns:
+            patterns = self.patterns + new_patterns
+            self._literals, self._literal_regex, self._regex, self._checks = self._compile(patterns)
+            self.patterns = patterns
+
+    def with_patterns(self, patterns: List[str]) -> "ErrorMatcher":
+        """A new matcher with additional patterns; this one is left as is for the lines it is scanning"""
+        matcher = copy.copy(self)
+        matcher.add_patterns(patterns)
+        return matcher
+
+    def match(self, line: str) -> Optional[str]:
+        """Return the first pattern, in the configured order, that matches the line, or None"""
+        lowered = line.lower()
+        hit = None
+        if self._literal_regex is not None:
+            match = self._literal_regex.search(lowered)
+            if match is not None:
+                hit = self._literals[match.group()]
+        if self._regex is not None:
+            match = self._regex.search(line)
+            if match is not None:
+                index = int(match.lastgroup[len(_GROUP_PREFIX):])
+                hit = index if hit is None else min(hit, index)
+        if hit is None:
+            return None
+        return self.patterns[self._first_match(line, lowered, hit)]
+
+    def _first_match(self, line: str, lowered: str, hit: int) -> int:
+        """Index of the first pattern matching a line known to match pattern `hit`"""
+        for index in range(hit):
+            check = self._checks[index]
+            if check in lowered if isinstance(check, str) else check.search(line) is not None:
+                return index
+        return hit
+
+    def is_error(self, line: str) -> bool:
+        """Check whether any error pattern matches the line"""
+        if self._literal_regex is not None and self._literal_regex.search(line.lower()):
+            return True
+        return self._regex is not None and self._regex.search(line) is not None
+
+    def scan_buffer(self, buffer: str, line_starts: Sequence[int],
+                    line_lengths: Sequence[int]) -> List[Tuple[int, str]]:
+        """Find the error lines of a newline-joined buffer
+
+        Returns (row, pattern) pairs in row order. Each line is searched in
+        place through pos/endpos, so no per-line strings are created, and the
+        buffer is lowercased once for the literal patterns rather than once
+        per line.
+        """
+        hits: Dict[int, str] = {}
+        rows = range(len(line_starts))
+
+        lowered = buffer.lower() if self._literal_regex is not None else buffer
+        if len(lowered) != len(buffer):
+            # Case folding changed offsets (rare non-ASCII input); go line by line
+            for row in rows:
+                start = line_starts[row]
+                pattern = self.match(buffer[start:start + line_lengths[row]])
+                if pattern is not None:
+                    hits[row] = pattern
+            return list(hits.items())
+
+        # Row -> index of a pattern matching it
+        indexes: Dict[int, int] = {}
+        if self._literal_regex is not None:
+            search = self._literal_regex.search
+            literals = self._literals
+            for row, start, length in zip(rows, line_starts, line_lengths):
+                match = search(lowered, start, start + length)
+                if match is not None:
+                    indexes[row] = literals[match.group()]
+
+        if self._regex is not None:
+            # Sliced per line so that ^ and $ keep their usual meaning; rows
+            # hit by a literal have their earlier patterns checked below
+            search = self._regex.search
+            group_offset = len(_GROUP_PREFIX)
+            for row, start, length in zip(rows, line_starts, line_lengths):
+                if row in indexes:
+                    continue
+                match = search(buffer[start:start + length])
+                if match is not None:
+                    indexes[row] = int(match.lastgroup[group_offset:])
+
+        for row in sorted(indexes):
+            index = indexes[row]
+            if index:
+                start, end = line_starts[row], line_starts[row] + line_lengths[row]
+                index = self._first_match(buffer[start:end], lowered[start:end], index)
+            hits[row] = self.patterns[index]
+        return list(hits.items())
+
+    def _validate(self, pattern: str):
+        # Each pattern must stand on its own; numbered backreferences would
+        # point at the wrong group once wrapped in the alternation, and named
+        # groups could clash with the generated ones or with each other.
+        compiled = re.compile(pattern, self.flags)
+        if compiled.groupindex:
+            raise ValueError(f"Named groups are not supported in error patterns: {pattern}")
+        if compiled.groups and re.search(r"\\[1-9]", pattern):
+            raise ValueError(f"Numbered backreferences are not supported in error patterns: {pattern}")
+
+    def _is_literal(self, pattern: str) -> bool:
+        return not _REGEX_METACHARACTERS.intersection(pattern)
+
+    def _compile(self, patterns: List[str]):
+        fold_case = bool(self.flags & re.IGNORECASE)
+        literals: Dict[str, int] = {}
+        regex_groups = []
+        checks: List[Union[str, re.Pattern]] = []
+        for index, pattern in enumerate(patterns):
+            if fold_case and self._is_literal(pattern):
+                literals.setdefault(pattern.lower(), index)
+                checks.append(pattern.lower())
+            else:
+                regex_groups.append(f"(?P<{_GROUP_PREFIX}{index}>{pattern})")
+                checks.append(re.compile(pattern, self.flags))
+
+        # Literals are matched without capture groups (which would disable the
+        # engine's literal-prefix fast path); the matched text itself tells us
+        # which literal hit. Longest first so overlapping literals resolve
+        # to the most specific one.
+        literal_regex = None
+        if literals:
+            alternation = "|".join(re.escape(literal) for literal in sorted(literals, key=len, reverse=True))
+            literal_regex = re.compile(alternation, self.flags & ~re.IGNORECASE)
+        regex = re.compile("|".join(regex_groups), self.flags) if regex_groups else None
+        return literals, literal_regex, regex, checks
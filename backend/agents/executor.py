@@ -0,0 +1,85 @@
+from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import time
+from .base_agent import BaseAgent
+from . import settings
+
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+
+def _run_in_worker(agent: BaseAgent, task: Dict[str, Any]) -> Tuple[Dict[str, Any], float, float]:
+    """Entry point of a pool worker: run one task on the agent
+
+    Returns the result with the wall-clock start and end of the run, so the
+    caller can split the elapsed time into queue wait and processing.
+    """
+    started = time.time()
+    result = asyncio.run(agent.handle(task))
+    return result, started, time.time()
+
+
+class TaskExecutor:
+    """Runs agent tasks, sending CPU-bound ones to a bounded worker pool
+
+    Agents list their CPU-heavy task types in `cpu_bound_tasks`. In "process"
+    mode those tasks are pickled together with a copy of the agent (its task
+    history stays behind) and run in a worker process, so they neither block
+    the event loop nor contend for the GIL; "thread" mode runs them on worker
+    threads, and "inline" mode directly on the loop. Everything else always
+    runs as a coroutine on the loop. Either way the result is recorded in the
+    parent agent's history and metrics, with pooled tasks reporting how long
+    they waited for a worker separately from their processing time.
+    """
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None):
+        self.mode = mode or settings.EXECUTOR_MODE
+        if self.mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {self.mode}")
+        self.max_workers = max_workers or settings.EXECUTOR_WORKERS
+        self._pool: Optional[Executor] = None
+
+    def is_cpu_bound(self, agent: BaseAgent, task: Dict[str, Any]) -> bool:
+        return task.get("type", "") in agent.cpu_bound_tasks
+
+    async def run(self, agent: BaseAgent, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task on an agent and record it in the agent's history"""
+        if self.mode == "inline" or not self.is_cpu_bound(agent, task):
+            return await agent.process(task)
+
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        try:
+            result, started, finished = await loop.run_in_executor(
+                self._get_pool(), _run_in_worker, agent, task
+            )
+        except Exception:
+            agent.log_failure(task, (time.time() - submitted) * 1000, executor=self.mode)
+            raise
+        agent.log_task(
+            task, result,
+            duration_ms=(finished - started) * 1000,
+            queue_wait_ms=max(0.0, started - submitted) * 1000,
+            executor=self.mode
+        )
+        return result
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent-worker")
+        return self._pool
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,410 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from .shared_state import process_alive
+
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = frozenset({COMPLETED, FAILED, CANCELLED})
+JOB_STATES = (QUEUED, RUNNING) + tuple(sorted(FINISHED_STATES))
+
+# How often the store is read for a job held by another server worker, in seconds
+STORE_POLL_SECONDS = 0.25
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue holds its maximum of pending jobs"""
+
+
+class Job:
+    """A task submitted for asynchronous execution and its lifecycle"""
+
+    def __init__(self, task: Dict[str, Any], priority: int = 0, job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.task = task
+        self.type = task.get("type", "")
+        self.priority = priority
+        self.status = QUEUED
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        job = {
+            "id": self.id,
+            "type": self.type,
+            "priority": self.priority,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.error is not None:
+            job["error"] = self.error
+        if include_result and self.result is not None:
+            job["result"] = self.result
+        return job
+
+
+class JobStore(ABC):
+    """Keeps the snapshots of jobs, including their results once finished"""
+
+    @abstractmethod
+    def save(self, job: Dict[str, Any]):
+        """Store the latest snapshot of a job"""
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job with its result, or None if unknown"""
+        pass
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently submitted jobs first, without their results"""
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """Job snapshots in memory; the oldest finished jobs are dropped beyond `max_finished`"""
+
+    def __init__(self, max_finished: int = 1000):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job["id"]] = job
+            if job["status"] in FINISHED_STATES:
+                self._finished[job["id"]] = None
+                while len(self._finished) > self.max_finished:
+                    oldest, _ = self._finished.popitem(last=False)
+                    del self._jobs[oldest]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        jobs = []
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if status is None or job["status"] == status:
+                    jobs.append({key: value for key, value in job.items() if key != "result"})
+                    if len(jobs) == limit:
+                        break
+        return jobs
+
+
+class SqliteJobStore(JobStore):
+    """Job snapshots in a local SQLite database, so results survive restarts
+
+    Several server workers may share the database. Each job records the pid
+    of the process running it; on startup, jobs still queued or running in a
+    process that is gone are marked failed, since their tasks were lost with
+    it, while those of live workers are left alone.
+    """
+
+    COLUMNS = ("id", "type", "priority", "status", "submitted_at", "started_at", "finished_at", "error")
+
+    def __init__(self, path: str, max_finished: int = 1000):
+        self.path = path
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE,"
+            " type TEXT, priority INTEGER, status TEXT,"
+            " submitted_at TEXT, started_at TEXT, finished_at TEXT, error TEXT, result TEXT, pid INTEGER)"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")]
+        if "pid" not in columns:
+            self._connection.execute("ALTER TABLE jobs ADD COLUMN pid INTEGER")
+        unfinished = self._connection.execute(
+            "SELECT id, pid FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchall()
+        self._connection.executemany(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            [(FAILED, "Interrupted by a server restart", datetime.now().isoformat(), job_id)
+             for job_id, pid in unfinished if not process_alive(pid)]
+        )
+        self._connection.commit()
+
+    def save(self, job: Dict[str, Any]):
+        result = job.get("result")
+        values = tuple(job.get(column) for column in self.COLUMNS)
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO jobs (id, type, priority, status, submitted_at, started_at, finished_at, error, result, pid)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET status = excluded.status, started_at = excluded.started_at,"
+                " finished_at = excluded.finished_at, error = excluded.error, result = excluded.result",
+                values + (None if result is None else json.dumps(result, default=str), os.getpid())
+            )
+            if job["status"] in FINISHED_STATES:
+                self._connection.execute(
+                    "DELETE FROM jobs WHERE seq IN (SELECT seq FROM jobs WHERE status IN (?, ?, ?)"
+                    " ORDER BY seq DESC LIMIT -1 OFFSET ?)",
+                    tuple(sorted(FINISHED_STATES)) + (self.max_finished,)
+                )
+            self._connection.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(self.COLUMNS)}, result FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = self._job(row[:-1])
+        if row[-1] is not None:
+            job["result"] = json.loads(row[-1])
+        return job
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM jobs"
+        params: tuple = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._connection.execute(query + " ORDER BY seq DESC LIMIT ?", params + (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def _job(self, row) -> Dict[str, Any]:
+        job = dict(zip(self.COLUMNS, row))
+        if job["error"] is None:
+            del job["error"]
+        return job
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def get_job_store(spec: str, max_finished: int = 1000) -> JobStore:
+    """Store for a spec: "" or "memory" keeps jobs in memory, "sqlite:jobs.db" in SQLite"""
+    kind, _, path = spec.partition(":")
+    if kind in ("", "memory"):
+        return MemoryJobStore(max_finished)
+    if kind == "sqlite":
+        return SqliteJobStore(path, max_finished)
+    raise ValueError(f"Unknown job store: {spec}")
+
+
+class JobQueue:
+    """Bounded priority queue of jobs run by a pool of asyncio workers
+
+    `run` is the coroutine executing a task (the orchestrator's process), so
+    jobs get the same routing, caching and worker processes as synchronous
+    requests; `workers` bounds how many run at once. Higher priorities run
+    first, in submission order within a priority. Once `max_queued` jobs are
+    waiting, submit raises QueueFullError instead of queueing more, so a
+    burst turns into rejections the client can retry rather than unbounded
+    memory. Queued jobs are cancelled in place; a running job's coroutine is
+    cancelled, which abandons work sent to a worker process without
+    interrupting it. Live jobs stay in memory and every state change is
+    saved to the store, which also holds the finished jobs. A job held by
+    another server worker sharing the store is followed by polling it.
+    """
+
+    def __init__(self, run: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 workers: int = 4, max_queued: int = 100, store: Optional[JobStore] = None):
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self.store = store or MemoryJobStore()
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._changed: Dict[str, asyncio.Condition] = {}
+        self._queued = 0
+        self._available: Optional[asyncio.Semaphore] = None
+        self._workers: List[asyncio.Task] = []
+
+    def _start(self):
+        if not self._workers:
+            self._available = asyncio.Semaphore(0)
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def submit(self, task: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        """Queue a task and return its job; raises QueueFullError"""
+        if self._queued >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+        self._start()
+        job = Job(task, priority)
+        self._jobs[job.id] = job
+        self._changed[job.id] = asyncio.Condition()
+        heapq.heappush(self._heap, (-priority, next(self._order), job.id))
+        self._queued += 1
+        self.store.save(job.to_dict())
+        self._available.release()
+        return job.to_dict()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job is not None else self.store.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.store.list(status, limit)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job; returns it, or None when it is not live"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status == QUEUED:
+            # Left in the heap; workers skip it
+            self._queued -= 1
+            await self._finish(job, CANCELLED)
+        elif job.status == RUNNING:
+            self._running[job_id].cancel()
+            await self.wait(job_id, None)
+        return job.to_dict()
+
+    async def wait(self, job_id: str, timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """The job once finished, or as it is after `timeout` seconds"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return await self._poll_store(job_id, lambda snapshot: snapshot["status"] in FINISHED_STATES, timeout)
+        changed = self._changed[job_id]
+        async with changed:
+            try:
+                await asyncio.wait_for(changed.wait_for(lambda: job.finished), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job.to_dict()
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """The job now and after each state change, until it is finished"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            snapshot = self.store.get(job_id)
+            while snapshot is not None:
+                yield snapshot
+                if snapshot["status"] in FINISHED_STATES:
+                    return
+                status = snapshot["status"]
+                snapshot = await self._poll_store(job_id, lambda current: current["status"] != status, None)
+            return
+        changed = self._changed[job_id]
+        while True:
+            async with changed:
+                snapshot = job.to_dict()
+                yield snapshot
+                if job.finished:
+                    return
+                await changed.wait_for(lambda: job.status != snapshot["status"])
+
+    async def _poll_store(self, job_id: str, done: Callable[[Dict[str, Any]], bool],
+                          timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """The stored job once `done` holds for it, or as it is after `timeout` seconds"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        snapshot = self.store.get(job_id)
+        while snapshot is not None and not done(snapshot) and (deadline is None or loop.time() < deadline):
+            await asyncio.sleep(STORE_POLL_SECONDS)
+            snapshot = self.store.get(job_id)
+        return snapshot
+
+    def held_elsewhere(self, job_id: str) -> bool:
+        """Whether the job is unfinished but not held by this queue: it runs in another server worker"""
+        snapshot = self.store.get(job_id)
+        return job_id not in self._jobs and snapshot is not None and snapshot["status"] not in FINISHED_STATES
+
+    async def _work(self):
+        while True:
+            await self._available.acquire()
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Cancelled while queued
+                continue
+            self._queued -= 1
+            job.status = RUNNING
+            job.started_at = datetime.now().isoformat()
+            running = asyncio.create_task(self.run(job.task))
+            self._running[job_id] = running
+            await self._changed_state(job)
+
+            try:
+                result = await asyncio.shield(running)
+            except asyncio.CancelledError:
+                if not running.cancelled():
+                    # The worker itself is being stopped
+                    running.cancel()
+                    raise
+                await self._finish(job, CANCELLED)
+            except Exception as e:
+                await self._finish(job, FAILED, error=str(e))
+            else:
+                if isinstance(result, dict) and result.get("status") == "error":
+                    await self._finish(job, FAILED, result=result, error=result.get("message"))
+                else:
+                    await self._finish(job, COMPLETED, result=result)
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _finish(self, job: Job, status: str, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[str] = None):
+        job.status = status
+        job.finished_at = datetime.now().isoformat()
+        job.result = result
+        job.error = error
+        await self._changed_state(job)
+        # Finished jobs are served by the store
+        del self._jobs[job.id]
+        del self._changed[job.id]
+
+    async def _changed_state(self, job: Job):
+        self.store.save(job.to_dict())
+        changed = self._changed[job.id]
+        async with changed:
+            changed.notify_all()
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": self._queued,
+            "running": len(self._running),
+            "store": type(self.store).__name__
+        }
+
+    async def shutdown(self):
+        """Stop the workers, cancelling running jobs"""
+        for worker in self._workers:
+            worker.cancel()
+        for running in list(self._running.values()):
+            running.cancel()
+        await asyncio.gather(*self._workers, *self._running.values(), return_exceptions=True)
+        self._workers = []
+        self.store.close()
@@ -1,61 +1,93 @@
 from typing import Dict, Any, List
-import statistics
 from datetime import datetime, timedelta
-from .base_agent import BaseAgent
+import math
+from .base_agent import BaseAgent, task_handler
+from .kpi_batch import calculate_kpis
+from .kpi_streams import KPIStreamRegistry
+from .quantile_sketch import (
+    DEFAULT_PERCENTILES, DEFAULT_RELATIVE_ACCURACY, DDSketch, merge_sketches, parse_percentiles
+)
+from . import kpi_anomalies, kpi_compute, kpi_trends, settings
+
+
+def _rounded_percentiles(sketch: DDSketch, percentiles=DEFAULT_PERCENTILES) -> Dict[str, float]:
+    return {name: round(value, 2) for name, value in sketch.percentiles(percentiles).items()}
+
+
+def _anomaly_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """detect_anomalies keyword arguments from request options; raises ValueError"""
+    method = options.get("method", "mad")
+    if method not in kpi_anomalies.METHODS:
+        raise ValueError(f"method must be one of {', '.join(kpi_anomalies.METHODS)}")
+    arguments = {"method": method}
+    for name, lowest in (("window", 2), ("season_length", 1), ("seasons", 1)):
+        value = options.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value < lowest:
+            raise ValueError(f"{name} must be an integer of at least {lowest}")
+        arguments[name] = value
+    threshold = options.get("threshold")
+    if threshold is not None:
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or threshold <= 0:
+            raise ValueError("threshold must be a positive number")
+        arguments["threshold"] = threshold
+    return arguments
 
 
 class KPIAgent(BaseAgent):
     """Agent specialized in analyzing KPI data and metrics"""
 
+    agent_type = "kpi"
+
+    cpu_bound_tasks = frozenset({
+        "analyze_metrics",
+        "trend_analysis",
+        "performance_report",
+        "detect_anomalies"
+    })
+
+    # Streams live in the memory of the worker that received them
+    worker_local_tasks = frozenset({
+        "kpi_stream_append",
+        "kpi_stream_query",
+        "kpi_stream_delete"
+    })
+
     def __init__(self):
         super().__init__(
             name="KPI Data Agent",
             description="Specializes in analyzing metrics, performance data, and KPI tracking"
         )
+        self.kpi_streams = KPIStreamRegistry(
+            max_streams=settings.KPI_MAX_STREAMS,
+            default_window=settings.KPI_STREAM_WINDOW,
+            max_window=settings.KPI_STREAM_MAX_WINDOW,
+            default_alpha=settings.KPI_STREAM_ALPHA
+        )
 
-    async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Process KPI-related tasks"""
-        task_type = task.get("type", "")
-        data = task.get("data", {})
-
-        result = {}
-
-        if task_type == "analyze_metrics":
-            result = await self._analyze_metrics(data)
-        elif task_type == "calculate_kpi":
-            result = await self._calculate_kpi(data)
-        elif task_type == "trend_analysis":
-            result = await self._trend_analysis(data)
-        elif task_type == "performance_report":
-            result = await self._generate_performance_report(data)
-        else:
-            result = {
-                "status": "error",
-                "message": f"Unknown task type: {task_type}"
-            }
-
-        self.log_task(task, result)
-        return result
-
+    @task_handler("analyze_metrics")
     async def _analyze_metrics(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze general metrics"""
         metrics = data.get("metrics", [])
 
-        if not metrics:
+        if not kpi_compute.is_series(metrics) or not len(metrics):
             return {"status": "error", "message": "No metrics provided"}
 
+        stats = kpi_compute.describe(metrics)
         analysis = {
             "status": "success",
-            "total_metrics": len(metrics),
-            "average": statistics.mean(metrics) if metrics else 0,
-            "median": statistics.median(metrics) if metrics else 0,
-            "min": min(metrics) if metrics else 0,
-            "max": max(metrics) if metrics else 0,
-            "std_dev": statistics.stdev(metrics) if len(metrics) > 1 else 0
+            "total_metrics": stats["count"],
+            "average": stats["mean"],
+            "median": stats["median"],
+            "min": stats["min"],
+            "max": stats["max"],
+            "std_dev": stats["std_dev"]
         }
 
         return analysis
 
+    @task_handler("calculate_kpi")
     async def _calculate_kpi(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate specific KPIs"""
         kpi_type = data.get("kpi_type", "")
@@ -73,7 +105,7 @@ class KPIAgent(BaseAgent):
             }
         elif kpi_type == "average_response_time":
             response_times = values.get("response_times", [])
-            avg = statistics.mean(response_times) if response_times else 0
+            avg = kpi_compute.mean(response_times) if len(response_times) else 0
             return {
                 "status": "success",
                 "kpi_type": kpi_type,
@@ -90,39 +122,141 @@ class KPIAgent(BaseAgent):
                 "value": round(percentage, 2),
                 "unit": "%"
             }
+        elif kpi_type == "response_time_percentiles":
+            return self._response_time_percentiles(data)
         else:
             return {
                 "status": "error",
                 "message": f"Unknown KPI type: {kpi_type}"
             }
 
+    @task_handler("calculate_kpi_batch")
+    async def _calculate_kpi_batch(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Calculate many KPIs in one call, grouped by KPI type"""
+        items = data.get("items")
+        if not isinstance(items, list):
+            return {"status": "error", "message": "items must be a list of KPI definitions"}
+        if len(items) > settings.KPI_BATCH_MAX_ITEMS:
+            return {
+                "status": "error",
+                "message": f"At most {settings.KPI_BATCH_MAX_ITEMS} KPI definitions per batch"
+            }
+
+        results = calculate_kpis(items, self._response_time_percentiles)
+        failed = sum(1 for result in results if result["status"] == "error")
+        return {
+            "status": "success",
+            "count": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results
+        }
+
+    def _response_time_percentiles(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Percentiles of response times and/or serialized sketches built elsewhere, merged"""
+        values = data.get("values", {})
+        response_times = values.get("response_times", [])
+        sketches = values.get("sketches", [])
+        if isinstance(sketches, dict):
+            sketches = [sketches]
+
+        try:
+            percentiles = parse_percentiles(data.get("percentiles"))
+            sketch = merge_sketches(sketches)
+            if len(response_times):
+                own = DDSketch(sketch.relative_accuracy) if sketch else DDSketch(
+                    data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY)
+                )
+                own.add_many(response_times)
+                if sketch is None:
+                    sketch = own
+                else:
+                    sketch.merge(own)
+        except (ValueError, TypeError) as e:
+            return {"status": "error", "message": str(e)}
+
+        if sketch is None or not sketch.count:
+            return {"status": "error", "message": "No response times or sketches provided"}
+
+        result = {
+            "status": "success",
+            "kpi_type": "response_time_percentiles",
+            "value": _rounded_percentiles(sketch, percentiles),
+            "unit": "ms",
+            "count": sketch.count,
+            "relative_accuracy": sketch.relative_accuracy
+        }
+        if data.get("include_sketch"):
+            result["sketch"] = sketch.to_dict()
+        return result
+
+    @task_handler("trend_analysis")
     async def _trend_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze trends in time-series data"""
         time_series = data.get("time_series", [])
+        # A bare series of values (e.g. a binary upload) stands in for points without timestamps
+        values = data.get("values")
+        if not kpi_compute.is_series(values):
+            values = [point.get("value", 0) for point in time_series]
 
-        if len(time_series) < 2:
+        if len(values) < 2:
             return {"status": "error", "message": "Need at least 2 data points for trend analysis"}
 
-        values = [point.get("value", 0) for point in time_series]
+        season_length = data.get("season_length")
+        max_change_points = data.get("max_change_points", kpi_trends.DEFAULT_MAX_CHANGE_POINTS)
+        min_segment_length = data.get("min_segment_length")
+        for name, value, lowest in (("season_length", season_length, 2),
+                                    ("max_change_points", max_change_points, 0),
+                                    ("min_segment_length", min_segment_length, 2)):
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < lowest):
+                return {"status": "error", "message": f"{name} must be an integer of at least {lowest}"}
 
         # Simple trend calculation
         first_half = values[:len(values)//2]
         second_half = values[len(values)//2:]
 
-        avg_first = statistics.mean(first_half)
-        avg_second = statistics.mean(second_half)
+        avg_first = kpi_compute.mean(first_half)
+        avg_second = kpi_compute.mean(second_half)
 
         trend = "increasing" if avg_second > avg_first else "decreasing" if avg_second < avg_first else "stable"
         change_percentage = ((avg_second - avg_first) / avg_first * 100) if avg_first != 0 else 0
 
+        source = "given" if season_length is not None else "auto"
+        if season_length is None:
+            season_length = kpi_trends.detect_season_length(values)
+        # "detected" says whether the series has a season at all, "source" where its length came from
+        seasonality = {"season_length": season_length, "detected": season_length is not None, "source": source}
+        if season_length:
+            delta = kpi_trends.seasonal_delta(values, season_length)
+            if delta:
+                seasonality.update({key: round(value, 2) for key, value in delta.items() if key != "season_length"})
+
+        segmentation = kpi_trends.change_points(values, max_change_points, min_segment_length, season_length)
+        change_points = []
+        for point in segmentation["change_points"]:
+            index = point["index"]
+            change_points.append({
+                "index": index,
+                "timestamp": time_series[index].get("timestamp") if index < len(time_series) else None,
+                "level_before": round(point["level_before"], 2),
+                "level_after": round(point["level_after"], 2),
+                "delta": round(point["delta"], 2),
+                "change_percentage": round(point["change_percentage"], 2)
+            })
+
         return {
             "status": "success",
             "trend": trend,
             "change_percentage": round(change_percentage, 2),
             "first_half_avg": round(avg_first, 2),
-            "second_half_avg": round(avg_second, 2)
+            "second_half_avg": round(avg_second, 2),
+            "regression": kpi_trends.linear_trend(values),
+            "seasonality": seasonality,
+            "change_points": change_points,
+            "drift_per_point": segmentation["drift_per_point"]
         }
 
+    @task_handler("performance_report")
     async def _generate_performance_report(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a comprehensive performance report"""
         metrics = data.get("metrics", {})
@@ -134,16 +268,59 @@ class KPIAgent(BaseAgent):
             "recommendations": []
         }
 
-        # Analyze each metric
-        for metric_name, metric_values in metrics.items():
-            if isinstance(metric_values, list) and metric_values:
-                avg = statistics.mean(metric_values)
-                report["summary"][metric_name] = {
-                    "average": round(avg, 2),
-                    "min": min(metric_values),
-                    "max": max(metric_values),
-                    "count": len(metric_values)
-                }
+        # Analyze all metrics as one batch
+        series = {
+            metric_name: metric_values
+            for metric_name, metric_values in metrics.items()
+            if kpi_compute.is_series(metric_values) and len(metric_values)
+        }
+        for metric_name, stats in kpi_compute.describe_many(series).items():
+            sketch = DDSketch()
+            sketch.add_many(series[metric_name])
+            report["summary"][metric_name] = {
+                "average": round(stats["mean"], 2),
+                "min": stats["min"],
+                "max": stats["max"],
+                "count": stats["count"],
+                "percentiles": _rounded_percentiles(sketch)
+            }
+
+        # Metrics sent as serialized sketches (e.g. partial sketches from
+        # several workers) are merged and summarized from the sketch alone
+        for metric_name, metric_sketches in data.get("sketches", {}).items():
+            if isinstance(metric_sketches, dict):
+                metric_sketches = [metric_sketches]
+            try:
+                sketch = merge_sketches(metric_sketches)
+                if metric_name in series:
+                    own = DDSketch(sketch.relative_accuracy)
+                    own.add_many(series[metric_name])
+                    sketch.merge(own)
+            except (ValueError, TypeError, AttributeError) as e:
+                return {"status": "error", "message": f"Invalid sketch for {metric_name}: {e}"}
+            if sketch is None or not sketch.count:
+                continue
+            report["summary"][metric_name] = {
+                "average": round(sketch.sum / sketch.count, 2),
+                "min": sketch.min,
+                "max": sketch.max,
+                "count": sketch.count,
+                "percentiles": _rounded_percentiles(sketch)
+            }
+
+        # Optional anomaly scan over the same batch of metrics
+        anomaly_detection = data.get("anomaly_detection")
+        if anomaly_detection:
+            try:
+                options = _anomaly_options(anomaly_detection if isinstance(anomaly_detection, dict) else {})
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            report["anomalies"] = kpi_anomalies.detect_anomalies(series, **options)
+            for metric_name, found in report["anomalies"].items():
+                if found["anomalies"]:
+                    report["recommendations"].append(
+                        f"{metric_name} has anomalous points ({len(found['anomalies'])}). Investigation needed."
+                    )
 
         # Generate simple recommendations
         if "response_time" in report["summary"]:
@@ -155,3 +332,84 @@ class KPIAgent(BaseAgent):
                 report["recommendations"].append("Error rate is above threshold. Investigation needed.")
 
         return report
+
+    @task_handler("detect_anomalies")
+    async def _detect_anomalies(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Flag anomalous points across many metrics at once"""
+        metrics = data.get("metrics", {})
+        if not isinstance(metrics, dict) or not metrics:
+            return {"status": "error", "message": "No metrics provided"}
+        for metric_name, metric_values in metrics.items():
+            if not kpi_compute.is_series(metric_values):
+                return {"status": "error", "message": f"Metric {metric_name} must be a list of numbers"}
+
+        try:
+            options = _anomaly_options(data)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        results = kpi_anomalies.detect_anomalies(metrics, **options)
+
+        return {
+            "status": "success",
+            "method": options["method"],
+            "total_anomalies": sum(len(found["anomalies"]) for found in results.values()),
+            "metrics": results
+        }
+
+    @task_handler("kpi_stream_append")
+    async def _kpi_stream_append(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Append points to a named KPI stream (created on first use) and return its aggregates"""
+        name = data.get("stream")
+        points = data.get("points", [])
+
+        if not name:
+            return {"status": "error", "message": "A stream name is required"}
+
+        # Validate everything first so a bad point leaves the stream untouched
+        parsed = []
+        for position, point in enumerate(points):
+            value, timestamp = (point.get("value"), point.get("timestamp")) if isinstance(point, dict) else (point, None)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return {"status": "error", "message": f"Invalid point at index {position}: {point!r}"}
+            parsed.append((value, timestamp))
+
+        try:
+            stream = self.kpi_streams.get_or_create(name, data.get("window"), data.get("alpha"))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        for value, timestamp in parsed:
+            stream.add(value, timestamp)
+
+        return {
+            "status": "success",
+            "appended": len(parsed),
+            "stream": stream.snapshot()
+        }
+
+    @task_handler("kpi_stream_query")
+    async def _kpi_stream_query(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Current aggregates of a KPI stream, or the names of all streams"""
+        name = data.get("stream")
+
+        if not name:
+            return {"status": "success", "streams": self.kpi_streams.names()}
+
+        try:
+            stream = self.kpi_streams.get(name)
+        except KeyError as e:
+            return {"status": "error", "message": e.args[0]}
+
+        return {"status": "success", "stream": stream.snapshot()}
+
+    @task_handler("kpi_stream_delete")
+    async def _kpi_stream_delete(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop a KPI stream"""
+        name = data.get("stream")
+
+        try:
+            self.kpi_streams.delete(name)
+        except KeyError as e:
+            return {"status": "error", "message": e.args[0]}
+
+        return {"status": "success", "deleted": name}
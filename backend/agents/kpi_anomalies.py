@@ -0,0 +1,240 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import math
+import statistics
+from . import kpi_compute
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the metrics are then scored one by one
+    np = None
+
+
+METHODS = ("mad", "zscore")
+
+# Trailing points each point is compared with
+DEFAULT_WINDOW = 30
+
+# |score| above which a point is anomalous; 3.5 is the usual cut-off for
+# MAD-based (modified) z-scores
+DEFAULT_THRESHOLDS = {"mad": 3.5, "zscore": 3.0}
+
+# Seasons back whose same-phase points make the seasonal baseline
+DEFAULT_SEASONS = 3
+
+# Scale of a normal distribution's MAD relative to its standard deviation
+MAD_SCALE = 1.4826
+
+# Floor of the scale, relative to the baseline, so a flat history still
+# gives finite scores
+MIN_RELATIVE_SCALE = 1e-6
+
+# Matrix elements scored at a time (window elements for the MAD method):
+# blocks that stay in the CPU cache are faster than whole-matrix passes
+BLOCK_ELEMENTS = 262_144
+
+
+def _use_numpy() -> bool:
+    return np is not None and kpi_compute.BACKEND == "numpy"
+
+
+def _safe_scale(scale, center):
+    return np.maximum(scale, MIN_RELATIVE_SCALE * (np.abs(center) + 1))
+
+
+def _rolling_zscore(matrix: "np.ndarray", window: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Mean and sample standard deviation of the `window` points before each column"""
+    valid = ~np.isnan(matrix)
+    # Centering each metric first keeps the sums of squares precise
+    present = np.where(valid, matrix, 0.0)
+    offsets = present.sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    centered = np.where(valid, present - offsets, 0.0)
+    zeros = np.zeros((matrix.shape[0], 1))
+    sums = np.concatenate((zeros, np.cumsum(centered, axis=1)), axis=1)
+    squares = np.concatenate((zeros, np.cumsum(centered * centered, axis=1)), axis=1)
+    counts = np.concatenate((zeros, np.cumsum(valid, axis=1)), axis=1)
+
+    center = np.full(matrix.shape, np.nan)
+    scale = np.full(matrix.shape, np.nan)
+    window_sums = sums[:, window:-1] - sums[:, :-window - 1]
+    window_squares = squares[:, window:-1] - squares[:, :-window - 1]
+    complete = (counts[:, window:-1] - counts[:, :-window - 1]) == window
+    means = window_sums / window
+    variances = np.maximum(window_squares - window_sums * means, 0.0) / (window - 1)
+    center[:, window:] = np.where(complete, means + offsets, np.nan)
+    scale[:, window:] = np.where(complete, np.sqrt(variances), np.nan)
+    return center, scale
+
+
+def _window_median(ordered: "np.ndarray") -> "np.ndarray":
+    """Medians of windows sorted along the last axis (NaN when a window has one)"""
+    size = ordered.shape[-1]
+    medians = (ordered[..., (size - 1) // 2] + ordered[..., size // 2]) / 2
+    # NaN sorts last
+    medians[np.isnan(ordered[..., -1])] = np.nan
+    return medians
+
+
+def _rolling_mad(matrix: "np.ndarray", window: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Median and scaled MAD of the `window` points before each column
+
+    Windows are strided views of the matrix, sorted for all metrics at once a
+    chunk of columns at a time so memory stays bounded; on windows this small
+    a vectorized sort beats np.median's partitioning. A window with a missing
+    point has a NaN median, so points without a full history are never scored.
+    """
+    metrics, length = matrix.shape
+    center = np.full(matrix.shape, np.nan)
+    scale = np.full(matrix.shape, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(matrix[:, :-1], window, axis=1)
+    chunk = max(1, BLOCK_ELEMENTS // (metrics * window))
+    for start in range(0, windows.shape[1], chunk):
+        block = np.sort(windows[:, start:start + chunk], axis=2)
+        medians = _window_median(block)
+        columns = slice(window + start, window + start + block.shape[1])
+        center[:, columns] = medians
+        scale[:, columns] = MAD_SCALE * _window_median(np.sort(np.abs(block - medians[:, :, None]), axis=2))
+    return center, scale
+
+
+def _seasonal_baseline(matrix: "np.ndarray", season_length: int, seasons: int) -> "np.ndarray":
+    """Median of the same point in the previous `seasons` seasons (NaN without them)"""
+    shifted = np.full((seasons,) + matrix.shape, np.nan)
+    for back in range(1, seasons + 1):
+        lag = back * season_length
+        if lag < matrix.shape[1]:
+            shifted[back - 1, :, lag:] = matrix[:, :-lag]
+    return np.median(shifted, axis=0)
+
+
+def _score_matrix(matrix: "np.ndarray", method: str, window: int, season_length: Optional[int],
+                  seasons: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Scores and expected values of every point of every metric row"""
+    baseline = None
+    target = matrix
+    if season_length:
+        baseline = _seasonal_baseline(matrix, season_length, seasons)
+        target = matrix - baseline
+    rolling = _rolling_mad if method == "mad" else _rolling_zscore
+    center, scale = rolling(target, window)
+    with np.errstate(invalid="ignore"):
+        scores = (target - center) / _safe_scale(scale, center)
+    expected = center if baseline is None else center + baseline
+    return scores, expected
+
+
+def _python_scores(values: Sequence[float], method: str, window: int, season_length: Optional[int],
+                   seasons: int) -> List[Tuple[int, float, float]]:
+    """(index, score, expected) of every scorable point of one metric"""
+    target = list(values)
+    baselines = None
+    if season_length:
+        baselines = []
+        for index in range(len(values)):
+            if index < seasons * season_length:
+                baselines.append(None)
+            else:
+                baselines.append(statistics.median(
+                    values[index - back * season_length] for back in range(1, seasons + 1)
+                ))
+        target = [None if baseline is None else value - baseline for value, baseline in zip(values, baselines)]
+
+    scored = []
+    for index in range(window, len(target)):
+        history = target[index - window:index]
+        if target[index] is None or any(value is None for value in history):
+            continue
+        if method == "mad":
+            center = statistics.median(history)
+            scale = MAD_SCALE * statistics.median(abs(value - center) for value in history)
+        else:
+            center = statistics.fmean(history)
+            scale = (math.fsum((value - center) ** 2 for value in history) / (window - 1)) ** 0.5
+        scale = max(scale, MIN_RELATIVE_SCALE * (abs(center) + 1))
+        expected = center if baselines is None else center + baselines[index]
+        scored.append((index, (target[index] - center) / scale, expected))
+    return scored
+
+
+def detect_anomalies(series: Dict[str, Sequence[float]], method: str = "mad", window: int = DEFAULT_WINDOW,
+                     threshold: Optional[float] = None, season_length: Optional[int] = None,
+                     seasons: int = DEFAULT_SEASONS) -> Dict[str, Dict[str, Any]]:
+    """Points of each named series that stand out from their recent history
+
+    Each point is scored against the `window` points before it: by its
+    distance from their median in scaled MADs ("mad", robust to the outliers
+    it is looking for) or from their mean in standard deviations ("zscore").
+    With a season length, each point is first compared with the median of
+    the same point in the previous `seasons` seasons, and the residuals are
+    scored instead, so a regular daily peak is not flagged. Points without a
+    full history are not scored. `latest_score` is the score of the last
+    point, the one a dashboard refresh cares about.
+
+    With NumPy all series go into one NaN-padded matrix, aligned on their
+    latest point, and are scored together by a few vectorized passes over
+    cache-sized blocks of rows, instead of a Python loop over metrics and
+    points.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    names = [name for name, values in series.items() if len(values)]
+    results = {
+        name: {"points": len(series[name]), "scored": 0, "latest_score": None, "anomalies": []}
+        for name in series
+    }
+    if not names:
+        return results
+
+    if _use_numpy():
+        length = max(len(series[name]) for name in names)
+        if length <= window:
+            return results
+        matrix = np.full((len(names), length), np.nan)
+        for row, name in enumerate(names):
+            matrix[row, length - len(series[name]):] = np.asarray(series[name], dtype=float)
+        scores = np.empty_like(matrix)
+        expected = np.empty_like(matrix)
+        rows_per_block = max(1, BLOCK_ELEMENTS // length)
+        for first in range(0, len(names), rows_per_block):
+            block = slice(first, first + rows_per_block)
+            scores[block], expected[block] = _score_matrix(matrix[block], method, window, season_length, seasons)
+
+        scored = ~np.isnan(scores)
+        counts = scored.sum(axis=1).tolist()
+        with np.errstate(invalid="ignore"):
+            rows, columns = np.nonzero(np.abs(scores) > threshold)
+        # Rows are aligned on their latest point, so the last column holds it
+        latest = scores[:, -1].tolist()
+        for row, name in enumerate(names):
+            results[name]["scored"] = counts[row]
+            if not math.isnan(latest[row]):
+                results[name]["latest_score"] = round(latest[row], 2)
+        offsets = [length - len(series[name]) for name in names]
+        for row, column, score, estimate in zip(
+            rows.tolist(), columns.tolist(), scores[rows, columns].tolist(), expected[rows, columns].tolist()
+        ):
+            name, index = names[row], column - offsets[row]
+            results[name]["anomalies"].append(_anomaly(index, series[name][index], score, estimate))
+        return results
+
+    for name in names:
+        values = series[name]
+        scored = _python_scores(values, method, window, season_length, seasons)
+        results[name]["scored"] = len(scored)
+        if scored and scored[-1][0] == len(values) - 1:
+            results[name]["latest_score"] = round(scored[-1][1], 2)
+        results[name]["anomalies"] = [
+            _anomaly(index, values[index], score, estimate)
+            for index, score, estimate in scored if abs(score) > threshold
+        ]
+    return results
+
+
+def _anomaly(index: int, value: float, score: float, expected: float) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "value": value,
+        "expected": round(expected, 4),
+        "score": round(score, 2),
+        "direction": "high" if score > 0 else "low"
+    }
@@ -0,0 +1,157 @@
+from typing import Dict, Any, Callable, List, Optional, Sequence
+import itertools
+import statistics
+from . import kpi_compute
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; items are then computed one by one
+    np = None
+
+
+# Ratio KPIs: the numerator and denominator fields of their values
+RATIO_KPIS = {
+    "conversion_rate": ("conversions", "total"),
+    "uptime_percentage": ("uptime_minutes", "total_minutes"),
+}
+
+KPI_UNITS = {
+    "conversion_rate": "%",
+    "uptime_percentage": "%",
+    "average_response_time": "ms",
+}
+
+
+def _use_numpy() -> bool:
+    return np is not None and kpi_compute.BACKEND == "numpy"
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def _error(message: str) -> Dict[str, Any]:
+    return {"status": "error", "message": message}
+
+
+def _kpi(kpi_type: str, value: Any) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "kpi_type": kpi_type,
+        "value": value,
+        "unit": KPI_UNITS[kpi_type]
+    }
+
+
+def _ratios(kpi_type: str, items: Sequence[Dict[str, Any]], positions: List[int],
+            results: List[Optional[Dict[str, Any]]]):
+    """Percentages of a ratio KPI for all its items, in one vectorized pass"""
+    numerator, denominator = RATIO_KPIS[kpi_type]
+    valid, numerators, denominators = [], [], []
+    for position in positions:
+        values = items[position].get("values", {})
+        top, bottom = values.get(numerator, 0), values.get(denominator, 0)
+        if not (_is_number(top) and _is_number(bottom)):
+            results[position] = _error(f"{numerator} and {denominator} must be numbers")
+            continue
+        valid.append(position)
+        numerators.append(top)
+        denominators.append(bottom)
+
+    if _use_numpy():
+        bottoms = np.asarray(denominators, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = (np.asarray(numerators, dtype=float) / bottoms * 100).tolist()
+    else:
+        rates = [top / bottom * 100 if bottom > 0 else 0 for top, bottom in zip(numerators, denominators)]
+    for position, rate, bottom in zip(valid, rates, denominators):
+        results[position] = _kpi(kpi_type, round(rate, 2) if bottom > 0 else 0)
+
+
+def _averages(items: Sequence[Dict[str, Any]], positions: List[int],
+              results: List[Optional[Dict[str, Any]]]):
+    """Mean response time of every item, computed one matrix of equal-length series at a time"""
+    valid, series = [], []
+    for position in positions:
+        response_times = items[position].get("values", {}).get("response_times", [])
+        if not kpi_compute.is_series(response_times):
+            results[position] = _error("response_times must be a list of numbers")
+            continue
+        valid.append(position)
+        series.append(response_times)
+
+    if not _use_numpy():
+        for position, response_times in zip(valid, series):
+            try:
+                average = statistics.mean(response_times) if len(response_times) else 0
+            except TypeError:
+                results[position] = _error("response_times must be a list of numbers")
+                continue
+            results[position] = _kpi("average_response_time", round(average, 2))
+        return
+
+    # Series of the same length make the rows of one matrix, averaged in one
+    # pass; row means sum like np.mean on each series, so values (and their
+    # rounding) match calculate_kpi exactly
+    by_length: Dict[int, List[int]] = {}
+    for index, values in enumerate(series):
+        by_length.setdefault(len(values), []).append(index)
+    for length, indexes in by_length.items():
+        if not length:
+            for index in indexes:
+                results[valid[index]] = _kpi("average_response_time", 0)
+            continue
+        try:
+            matrix = np.fromiter(
+                itertools.chain.from_iterable(series[index] for index in indexes),
+                dtype=float, count=len(indexes) * length
+            ).reshape(len(indexes), length)
+        except (TypeError, ValueError):
+            # Some item holds something else than numbers: average this group one by one
+            for index in indexes:
+                try:
+                    average = kpi_compute.mean(np.asarray(series[index], dtype=float))
+                except (TypeError, ValueError):
+                    results[valid[index]] = _error("response_times must be a list of numbers")
+                else:
+                    results[valid[index]] = _kpi("average_response_time", round(average, 2))
+            continue
+        for index, average in zip(indexes, matrix.mean(axis=1).tolist()):
+            results[valid[index]] = _kpi("average_response_time", round(average, 2))
+
+
+def calculate_kpis(items: Sequence[Any],
+                   percentiles: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Results of many KPI definitions, in order, each shaped like a calculate_kpi result
+
+    Items are grouped by `kpi_type` and every group is computed at once:
+    the ratio KPIs as two arrays divided in one operation, and average
+    response times as the row means of a matrix per series length. Response
+    time percentiles go through `percentiles` item by item, since each
+    builds its own sketch. An invalid item gets an error result without
+    failing the others; an item's `id` is echoed in its result.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    groups: Dict[str, List[int]] = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("values", {}), dict):
+            results[position] = _error("Each item must be an object with a values object")
+        else:
+            groups.setdefault(item.get("kpi_type", ""), []).append(position)
+
+    for kpi_type, positions in groups.items():
+        if kpi_type in RATIO_KPIS:
+            _ratios(kpi_type, items, positions, results)
+        elif kpi_type == "average_response_time":
+            _averages(items, positions, results)
+        elif kpi_type == "response_time_percentiles":
+            for position in positions:
+                results[position] = percentiles(items[position])
+        else:
+            for position in positions:
+                results[position] = _error(f"Unknown KPI type: {kpi_type}")
+
+    for item, result in zip(items, results):
+        if isinstance(item, dict) and "id" in item:
+            result["id"] = item["id"]
+    return results
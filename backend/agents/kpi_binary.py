@@ -0,0 +1,177 @@
+from typing import Dict, Any, Mapping, Optional
+from array import array
+import json
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; raw arrays are then decoded into array("d")
+    np = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack bodies are only accepted when it is installed
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # Arrow bodies are only accepted when it is installed
+    pyarrow = None
+
+
+FLOAT64_CONTENT_TYPE = "application/octet-stream"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+
+# KPI task fed by each binary endpoint, and where a decoded series goes in its data
+BINARY_TASKS = {
+    "analyze": "analyze_metrics",
+    "calculate": "calculate_kpi",
+    "trend": "trend_analysis",
+    "report": "performance_report",
+    "anomalies": "detect_anomalies",
+}
+
+# Name given to the series of a raw float64 body when no metric is named
+DEFAULT_METRIC = "value"
+
+
+def drop_non_finite(values):
+    """The values without NaN and ±inf, which JSON cannot carry; unchanged (not copied) when all are finite"""
+    if np is not None and isinstance(values, np.ndarray):
+        finite = np.isfinite(values)
+        return values if finite.all() else values[finite]
+    if all(map(math.isfinite, values)):
+        return values
+    return array("d", (value for value in values if math.isfinite(value)))
+
+
+def decode_float64(buffer: bytes):
+    """Raw little-endian float64 values as an array, without copying them when NumPy is available
+
+    NaN and ±inf values are dropped. Raises ValueError when the length is
+    not a multiple of 8.
+    """
+    if len(buffer) % 8:
+        raise ValueError("A float64 body must be a multiple of 8 bytes long")
+    if np is not None:
+        return drop_non_finite(np.frombuffer(buffer, dtype="<f8"))
+    values = array("d")
+    values.frombytes(buffer)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return drop_non_finite(values)
+
+
+def _decode_msgpack_value(value: Any) -> Any:
+    """msgpack structure with every bin value turned into a float64 array"""
+    if isinstance(value, bytes):
+        return decode_float64(value)
+    if isinstance(value, dict):
+        return {key: _decode_msgpack_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_msgpack_value(item) for item in value]
+    return value
+
+
+def decode_msgpack(buffer: bytes) -> Dict[str, Any]:
+    """Task data from a msgpack map shaped like the JSON request
+
+    Numeric series may be sent as bin values holding raw little-endian
+    float64s; they are decoded straight into arrays. Raises ValueError.
+    """
+    if msgpack is None:
+        raise ValueError("msgpack bodies need the msgpack package")
+    try:
+        data = msgpack.unpackb(buffer, raw=False, strict_map_key=False)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise ValueError(f"Invalid msgpack body: {e!r}") from e
+    if not isinstance(data, dict):
+        raise ValueError("A msgpack body must be a map")
+    return _decode_msgpack_value(data)
+
+
+def decode_arrow(buffer: bytes) -> Dict[str, Any]:
+    """Named series from the numeric columns of an Arrow IPC stream or file; raises ValueError
+
+    Nulls, NaN and ±inf values are dropped.
+    """
+    if pyarrow is None:
+        raise ValueError("Arrow bodies need the pyarrow package")
+    try:
+        source = pyarrow.py_buffer(buffer)
+        try:
+            table = pyarrow.ipc.open_stream(source).read_all()
+        except pyarrow.ArrowInvalid:
+            table = pyarrow.ipc.open_file(source).read_all()
+    except pyarrow.ArrowException as e:
+        raise ValueError(f"Invalid Arrow body: {e}") from e
+
+    series = {}
+    for name, column in zip(table.column_names, table.columns):
+        if not (pyarrow.types.is_integer(column.type) or pyarrow.types.is_floating(column.type)):
+            continue
+        column = column.cast(pyarrow.float64())
+        if column.num_chunks == 1 and not column.null_count:
+            # A single chunk without nulls is viewed in place
+            series[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            series[name] = column.to_numpy()
+        series[name] = drop_non_finite(series[name])
+    if not series:
+        raise ValueError("The Arrow body has no numeric columns")
+    return series
+
+
+def _query_value(text: str) -> Any:
+    """Query parameter as a JSON value when it parses as one ("5" -> 5), else as text"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def build_task_data(operation: str, content_type: str, body: bytes,
+                    params: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """Data of the KPI task behind a binary endpoint, from the request body and query
+
+    A msgpack body is the task data itself. Raw float64 and Arrow bodies
+    carry only series, which go where the task expects them (`metrics` of
+    analyze, report and anomalies, `values` of trend, response times of
+    calculate); the other options come from the query string. Raises
+    ValueError for unsupported content types and malformed bodies.
+    """
+    if operation not in BINARY_TASKS:
+        raise ValueError(f"Unknown binary KPI operation: {operation}")
+    content_type = content_type.split(";")[0].strip().lower()
+    params = dict(params or {})
+
+    if content_type in MSGPACK_CONTENT_TYPES:
+        return decode_msgpack(body)
+    if content_type == FLOAT64_CONTENT_TYPE:
+        series = {params.get("metric", DEFAULT_METRIC): decode_float64(body)}
+    elif content_type in ARROW_CONTENT_TYPES:
+        series = decode_arrow(body)
+    else:
+        raise ValueError(f"Unsupported content type: {content_type or 'none'}")
+
+    metric = params.pop("metric", None)
+    data = {name: _query_value(value) for name, value in params.items()}
+    if operation in ("report", "anomalies"):
+        data["metrics"] = series
+        return data
+
+    if metric is None:
+        metric = next(iter(series))
+    if metric not in series:
+        raise ValueError(f"Unknown metric: {metric}")
+    if operation == "analyze":
+        data["metrics"] = series[metric]
+    elif operation == "trend":
+        data["values"] = series[metric]
+    else:
+        data.setdefault("kpi_type", "response_time_percentiles")
+        data["values"] = {"response_times": series[metric]}
+    return data
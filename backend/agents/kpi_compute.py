@@ -0,0 +1,140 @@
+from typing import Dict, Any, List, Sequence
+from array import array
+import os
+import statistics
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the statistics module is the fallback
+    np = None
+
+
+HAS_NUMPY = np is not None
+
+# "numpy" or "python"; defaults to NumPy whenever it is installed
+BACKEND = os.getenv("KPI_COMPUTE_BACKEND", "numpy" if HAS_NUMPY else "python")
+
+
+def set_backend(name: str):
+    """Switch the compute backend ("numpy" or "python")"""
+    global BACKEND
+    if name not in ("numpy", "python"):
+        raise ValueError(f"Unknown compute backend: {name}")
+    if name == "numpy" and not HAS_NUMPY:
+        raise ValueError("NumPy is not installed")
+    BACKEND = name
+
+
+def _use_numpy() -> bool:
+    return BACKEND == "numpy" and HAS_NUMPY
+
+
+def _to_python(value):
+    """Convert NumPy scalars into plain Python numbers for JSON responses"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def is_series(value: Any) -> bool:
+    """Whether a value is a flat numeric series: a list, an array("d") or a 1-D NumPy array"""
+    if isinstance(value, (list, array)):
+        return True
+    return np is not None and isinstance(value, np.ndarray) and value.ndim == 1
+
+
+def mean(values: Sequence[float]) -> float:
+    """Arithmetic mean of a non-empty series"""
+    if _use_numpy():
+        array = np.asarray(values)
+        return _keep_int(_is_integral(array), _to_python(np.mean(array)))
+    return statistics.mean(values)
+
+
+def describe(values: Sequence[float]) -> Dict[str, Any]:
+    """Count, mean, median, sample standard deviation, min and max of a non-empty series
+
+    Both backends return the same types: results over an all-integer series
+    are ints wherever `statistics`, min() and max() would return ints. A
+    series mixing ints and floats is treated as floats by NumPy, so its
+    min and max come back as floats even when the extreme element is an int.
+    """
+    count = len(values)
+
+    if _use_numpy():
+        array = np.asarray(values)
+        integral = _is_integral(array)
+        average = array.sum(dtype=float) / count
+        std_dev = np.sqrt(np.square(array - average).sum() / (count - 1)) if count > 1 else 0
+        return {
+            "count": count,
+            "mean": _keep_int(integral, _to_python(average)),
+            # statistics.median averages the middle pair of an even-length series into a float
+            "median": _keep_int(integral and count % 2 == 1, _to_python(np.median(array))),
+            "min": _to_python(array.min()),
+            "max": _to_python(array.max()),
+            "std_dev": _to_python(std_dev)
+        }
+
+    return {
+        "count": count,
+        "mean": statistics.mean(values),
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+        "std_dev": statistics.stdev(values) if count > 1 else 0
+    }
+
+
+def describe_many(series: Dict[str, Sequence[float]]) -> Dict[str, Dict[str, Any]]:
+    """Count, mean, min and max for many named, non-empty series at once
+
+    With NumPy all series are concatenated into one array and reduced
+    segment-wise with `reduceat`, so the cost is a handful of vectorized
+    passes no matter how many metrics there are.
+    """
+    if not series:
+        return {}
+
+    names: List[str] = list(series)
+
+    if _use_numpy():
+        arrays = [np.asarray(series[name]) for name in names]
+        integral = [_is_integral(a) for a in arrays]
+        counts = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        flat = np.concatenate(arrays).astype(float, copy=False)
+        means = np.add.reduceat(flat, offsets) / counts
+        minimums = np.minimum.reduceat(flat, offsets)
+        maximums = np.maximum.reduceat(flat, offsets)
+        return {
+            name: {
+                "count": int(count),
+                "mean": _keep_int(exact, average),
+                "min": _keep_int(exact, low),
+                "max": _keep_int(exact, high)
+            }
+            for name, exact, count, average, low, high in zip(
+                names, integral, counts, means.tolist(), minimums.tolist(), maximums.tolist()
+            )
+        }
+
+    return {
+        name: {
+            "count": len(series[name]),
+            "mean": statistics.mean(series[name]),
+            "min": min(series[name]),
+            "max": max(series[name])
+        }
+        for name in names
+    }
+
+
+def _is_integral(array) -> bool:
+    """Whether a series converted to NumPy holds only integers (no floats, no bools)"""
+    return array.dtype.kind in "iu"
+
+
+def _keep_int(integral: bool, value: float):
+    """Report integral results over integer series as ints, as statistics, min() and max() do"""
+    if integral and float(value).is_integer():
+        return int(value)
+    return value
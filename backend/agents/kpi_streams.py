@@ -0,0 +1,284 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import heapq
+import math
+from .quantile_sketch import DDSketch
+
+
+class RunningStats:
+    """Count, mean, variance and extremes of everything seen, by Welford's algorithm"""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 below two points)"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class SlidingExtremes:
+    """Minimum and maximum of the last `window` points, in amortized O(1)
+
+    Monotonic deques of (sequence number, value): a point that can never be
+    the extreme again (an older, smaller value in the max deque) is dropped
+    as soon as a newer one arrives.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._minimums: deque = deque()
+        self._maximums: deque = deque()
+
+    def add(self, sequence: int, value: float):
+        oldest = sequence - self.window
+        minimums, maximums = self._minimums, self._maximums
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        while maximums and maximums[-1][1] <= value:
+            maximums.pop()
+        minimums.append((sequence, value))
+        maximums.append((sequence, value))
+        if minimums[0][0] <= oldest:
+            minimums.popleft()
+        if maximums[0][0] <= oldest:
+            maximums.popleft()
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._minimums[0][1] if self._minimums else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._maximums[0][1] if self._maximums else None
+
+
+class SlidingMedian:
+    """Exact median of a sliding window, in O(log window) per update
+
+    The lower half of the window lives in a max-heap and the upper half in a
+    min-heap. Points leaving the window are only marked as removed and
+    discarded once they reach the top of their heap (lazy deletion). Marked
+    points buried below the top are dropped by compacting a heap once it
+    holds more of them than live points, so both heaps stay within twice
+    the window and compaction costs amortized O(1) per update.
+    """
+
+    def __init__(self):
+        self._low: List[Tuple[float, int]] = []  # (-value, sequence)
+        self._high: List[Tuple[float, int]] = []  # (value, sequence)
+        self._low_size = 0
+        self._high_size = 0
+        self._in_low: Dict[int, bool] = {}
+        self._removed: set = set()
+
+    def _prune(self, heap: List[Tuple[float, int]]):
+        removed = self._removed
+        while heap and heap[0][1] in removed:
+            removed.discard(heapq.heappop(heap)[1])
+
+    def _compact(self, heap: List[Tuple[float, int]]):
+        """Rebuild a heap without its removed points"""
+        removed = self._removed
+        kept = []
+        for entry in heap:
+            if entry[1] in removed:
+                removed.discard(entry[1])
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        heap[:] = kept
+
+    def _rebalance(self):
+        if self._low_size > self._high_size + 1:
+            self._prune(self._low)
+            negated, sequence = heapq.heappop(self._low)
+            heapq.heappush(self._high, (-negated, sequence))
+            self._in_low[sequence] = False
+            self._low_size -= 1
+            self._high_size += 1
+        elif self._high_size > self._low_size:
+            self._prune(self._high)
+            value, sequence = heapq.heappop(self._high)
+            heapq.heappush(self._low, (-value, sequence))
+            self._in_low[sequence] = True
+            self._high_size -= 1
+            self._low_size += 1
+        self._prune(self._low)
+        self._prune(self._high)
+        if len(self._low) > 2 * self._low_size:
+            self._compact(self._low)
+        if len(self._high) > 2 * self._high_size:
+            self._compact(self._high)
+
+    def add(self, sequence: int, value: float):
+        if not self._low or value <= -self._low[0][0]:
+            heapq.heappush(self._low, (-value, sequence))
+            self._in_low[sequence] = True
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, (value, sequence))
+            self._in_low[sequence] = False
+            self._high_size += 1
+        self._rebalance()
+
+    def remove(self, sequence: int):
+        if self._in_low.pop(sequence):
+            self._low_size -= 1
+        else:
+            self._high_size -= 1
+        self._removed.add(sequence)
+        self._rebalance()
+
+    @property
+    def median(self) -> Optional[float]:
+        if not self._low_size:
+            return None
+        if self._low_size > self._high_size:
+            return -self._low[0][0]
+        return (-self._low[0][0] + self._high[0][0]) / 2
+
+
+class KPIStream:
+    """A named KPI series whose aggregates are updated as points are appended
+
+    All-time figures (Welford mean and variance, extremes, EWMA, and
+    percentiles from a DDSketch) cost O(1) per point; the sliding window over
+    the last `window` points keeps its mean and extremes in O(1) and its
+    median in O(log window). Queries read the maintained figures, so they
+    cost the same whatever the history length.
+    """
+
+    def __init__(self, name: str, window: int, alpha: float):
+        self.name = name
+        self.window = window
+        self.alpha = alpha
+        self.stats = RunningStats()
+        self.ewma: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.last_timestamp: Optional[Any] = None
+        self._values: deque = deque()
+        self._window_sum = 0.0
+        self._extremes = SlidingExtremes(window)
+        self._median = SlidingMedian()
+        self.sketch = DDSketch()
+
+    def add(self, value: float, timestamp: Optional[Any] = None):
+        """Append one point"""
+        sequence = self.stats.count
+        self.stats.add(value)
+        self.sketch.add(value)
+        self.ewma = value if self.ewma is None else self.alpha * value + (1 - self.alpha) * self.ewma
+        self.last_value = value
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+        self._values.append(value)
+        self._window_sum += value
+        self._extremes.add(sequence, value)
+        self._median.add(sequence, value)
+        if len(self._values) > self.window:
+            self._window_sum -= self._values.popleft()
+            self._median.remove(sequence - self.window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current aggregates of the stream"""
+        stats = self.stats
+        size = len(self._values)
+        return {
+            "name": self.name,
+            "count": stats.count,
+            "last_value": self.last_value,
+            "last_timestamp": self.last_timestamp,
+            "mean": stats.mean,
+            "variance": stats.variance,
+            "std_dev": math.sqrt(stats.variance),
+            "min": stats.min,
+            "max": stats.max,
+            "percentiles": self.sketch.percentiles(),
+            "ewma": self.ewma,
+            "alpha": self.alpha,
+            "window": {
+                "size": size,
+                "capacity": self.window,
+                "mean": self._window_sum / size if size else None,
+                "median": self._median.median,
+                "min": self._extremes.min,
+                "max": self._extremes.max
+            }
+        }
+
+
+class KPIStreamRegistry:
+    """Named KPI streams kept in memory by the KPI agent
+
+    Streams are live state of the serving process: like the task history,
+    they stay behind when the agent is copied into a worker process.
+    """
+
+    def __init__(self, max_streams: int, default_window: int, max_window: int,
+                 default_alpha: float):
+        self.max_streams = max_streams
+        self.default_window = default_window
+        self.max_window = max_window
+        self.default_alpha = default_alpha
+        self.streams: Dict[str, KPIStream] = {}
+
+    def names(self) -> List[str]:
+        return sorted(self.streams)
+
+    def get(self, name: str) -> KPIStream:
+        """Stream by name; raises KeyError for unknown streams"""
+        stream = self.streams.get(name)
+        if stream is None:
+            raise KeyError(f"Unknown KPI stream: {name}")
+        return stream
+
+    def get_or_create(self, name: str, window: Optional[int] = None,
+                      alpha: Optional[float] = None) -> KPIStream:
+        """Existing stream, or a new one with the given window and EWMA alpha
+
+        Raises ValueError for invalid settings or when the stream limit is reached.
+        """
+        stream = self.streams.get(name)
+        if stream is not None:
+            return stream
+
+        window = self.default_window if window is None else window
+        alpha = self.default_alpha if alpha is None else alpha
+        if isinstance(window, bool) or not isinstance(window, int) or not 1 <= window <= self.max_window:
+            raise ValueError(f"window must be an integer between 1 and {self.max_window}")
+        if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0 < alpha <= 1:
+            raise ValueError("alpha must be a number in (0, 1]")
+        if len(self.streams) >= self.max_streams:
+            raise ValueError(f"Too many KPI streams (limit {self.max_streams})")
+
+        stream = self.streams[name] = KPIStream(name, window, float(alpha))
+        return stream
+
+    def delete(self, name: str):
+        """Drop a stream; raises KeyError for unknown streams"""
+        self.get(name)
+        del self.streams[name]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the configuration travels to worker processes
+        state = self.__dict__.copy()
+        state["streams"] = {}
+        return state
@@ -0,0 +1,419 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from itertools import accumulate
+import heapq
+import math
+import statistics
+from . import kpi_compute
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python paths are the fallback
+    np = None
+
+
+# Two-sided p-value below which a slope counts as a real trend
+SIGNIFICANCE_LEVEL = 0.05
+
+DEFAULT_MAX_CHANGE_POINTS = 5
+
+# Penalty per change point, in units of noise variance * log(n) (BIC-like)
+CHANGE_POINT_PENALTY = 2.0
+
+# Smallest level shift reported, in noise standard deviations
+MIN_CHANGE_SHIFT = 0.5
+
+# Rounds of alternating segmentation and drift estimation
+DRIFT_REFINEMENTS = 2
+
+# Longest season looked for by default (one day of minutely points is 1440)
+DEFAULT_MAX_SEASON_LAG = 10000
+
+# Smallest autocorrelation a lag needs to count as the season length
+MIN_SEASONAL_AUTOCORRELATION = 0.3
+
+# Share of the highest autocorrelation peak a shorter peak needs to be the season
+SEASON_PEAK_TOLERANCE = 0.9
+
+# Largest multiple of the season used to refine its length
+MAX_SEASON_REFINEMENT_MULTIPLE = 8
+
+
+def _use_numpy() -> bool:
+    return np is not None and kpi_compute.BACKEND == "numpy"
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b), by continued fraction"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _betainc(b, a, 1 - x)
+
+    log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return math.exp(log_front) * fraction / a
+
+
+def _t_test_p_value(t_stat: float, dof: int) -> float:
+    """Two-sided p-value of Student's t statistic"""
+    if math.isinf(t_stat):
+        return 0.0
+    return _betainc(dof / 2, 0.5, dof / (dof + t_stat * t_stat))
+
+
+def linear_trend(values: Sequence[float]) -> Dict[str, Any]:
+    """Least-squares line through (index, value) and how confident the slope is
+
+    The slope is per point. `confidence` is 1 - p of the two-sided t-test of
+    a zero slope, and `direction` only calls a trend increasing or
+    decreasing when that test is significant at SIGNIFICANCE_LEVEL.
+    """
+    n = len(values)
+    # Sums over x = 0..n-1 have closed forms; only the y sums need a pass
+    mean_x = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12
+    if _use_numpy():
+        y = np.asarray(values, dtype=float)
+        mean_y = float(y.mean())
+        centered = y - mean_y
+        sxy = float(np.dot(np.arange(n, dtype=float) - mean_x, centered))
+        syy = float(np.dot(centered, centered))
+    else:
+        mean_y = statistics.fmean(values)
+        sxy = math.fsum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+        syy = math.fsum((y - mean_y) ** 2 for y in values)
+
+    slope = sxy / sxx if sxx else 0.0
+    intercept = mean_y - slope * mean_x
+    residual = max(syy - slope * sxy, 0.0)
+    r_squared = 1 - residual / syy if syy else 0.0
+
+    dof = n - 2
+    p_value = None
+    slope_stderr = None
+    if dof > 0 and sxx:
+        slope_stderr = math.sqrt(residual / dof / sxx)
+        if slope_stderr:
+            p_value = _t_test_p_value(slope / slope_stderr, dof)
+        else:
+            p_value = 0.0 if slope else 1.0
+
+    significant = p_value is not None and p_value < SIGNIFICANCE_LEVEL
+    return {
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "slope_stderr": slope_stderr,
+        "p_value": p_value,
+        "confidence": None if p_value is None else 1 - p_value,
+        "direction": ("increasing" if slope > 0 else "decreasing") if significant and slope else "stable"
+    }
+
+
+def _high_pass(y: "np.ndarray", window: int) -> "np.ndarray":
+    """Series minus its centered moving average, removing drift and level shifts"""
+    cumulative = np.concatenate(([0.0], np.cumsum(y)))
+    positions = np.arange(len(y))
+    lower = np.maximum(positions - window // 2, 0)
+    upper = np.minimum(positions + window // 2 + 1, len(y))
+    return y - (cumulative[upper] - cumulative[lower]) / (upper - lower)
+
+
+def _autocorrelation_peak(autocorrelation: "np.ndarray") -> Optional[int]:
+    """Shortest lag whose peak is close to the highest one, past the first zero crossing"""
+    # Short lags of a smooth series are correlated anyway: only look for
+    # peaks once the autocorrelation has first dropped below zero
+    negative = np.flatnonzero(autocorrelation < 0)
+    if not len(negative):
+        return None
+    inner = autocorrelation[1:-1]
+    peaks = np.flatnonzero((inner > autocorrelation[:-2]) & (inner >= autocorrelation[2:])) + 1
+    peaks = peaks[peaks > negative[0]]
+    if not len(peaks):
+        return None
+    heights = autocorrelation[peaks]
+    highest = heights.max()
+    if highest < MIN_SEASONAL_AUTOCORRELATION:
+        return None
+    # Multiples of the season peak about as high as the season itself
+    return int(peaks[np.argmax(heights >= SEASON_PEAK_TOLERANCE * highest)])
+
+
+def detect_season_length(values: Sequence[float], max_lag: Optional[int] = None) -> Optional[int]:
+    """Season length of a series from its autocorrelation, or None (NumPy only)
+
+    The series is first high-passed (minus a moving average over max_lag
+    points) so that drift and level shifts do not swamp the autocorrelation,
+    which then comes from one FFT for all lags. The season is the shortest
+    autocorrelation peak nearly as high as the highest one, which must reach
+    MIN_SEASONAL_AUTOCORRELATION; lags go up to a quarter of the series so a
+    season repeats at least four times. The estimate is then refined on a
+    multiple of it, where one point of error weighs less.
+    """
+    n = len(values)
+    if not _use_numpy():
+        return None
+    max_lag = min(max_lag or DEFAULT_MAX_SEASON_LAG, n // 4)
+    if max_lag < 3:
+        return None
+
+    y = _high_pass(np.asarray(values, dtype=float), max_lag)
+    y = y - y.mean()
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(y, size)
+    autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:max_lag + 1]
+    if autocorrelation[0] <= 0:
+        return None
+    # Unbiased estimate: lag k only has n - k pairs
+    autocorrelation = autocorrelation / autocorrelation[0] * (n / (n - np.arange(max_lag + 1)))
+
+    best = _autocorrelation_peak(autocorrelation)
+    if best is None:
+        return None
+
+    # Noise ripples on long seasons make spurious local peaks; smoothing over
+    # a quarter season removes them without moving the real ones
+    half = best // 8
+    if half:
+        cumulative = np.concatenate(([0.0], np.cumsum(autocorrelation)))
+        smoothed = (cumulative[2 * half + 1:] - cumulative[:-2 * half - 1]) / (2 * half + 1)
+        # smoothed[k] is centered on lag k + half; the first lags are kept
+        # as they are, and the last ones, which have no full window, dropped
+        autocorrelation = np.concatenate((autocorrelation[:half], smoothed))
+        best = _autocorrelation_peak(autocorrelation) or best
+
+    last_lag = len(autocorrelation) - 1
+    multiple = min(last_lag // best, MAX_SEASON_REFINEMENT_MULTIPLE)
+    if multiple > 1:
+        center = multiple * best
+        low, high = center - best // 2, min(center + best // 2, last_lag)
+        best = round((low + int(np.argmax(autocorrelation[low:high + 1]))) / multiple)
+    return best
+
+
+def seasonal_delta(values: Sequence[float], season_length: int) -> Optional[Dict[str, Any]]:
+    """Last season compared with the one before, point for point (None if under two seasons)
+
+    Comparing each point with the same point one season earlier removes the
+    seasonal swing from the change, unlike a comparison of arbitrary halves.
+    """
+    if season_length < 1 or len(values) < 2 * season_length:
+        return None
+    current = values[-season_length:]
+    previous = values[-2 * season_length:-season_length]
+    current_mean = kpi_compute.mean(current)
+    previous_mean = kpi_compute.mean(previous)
+    delta = current_mean - previous_mean
+    return {
+        "season_length": season_length,
+        "current_season_avg": current_mean,
+        "previous_season_avg": previous_mean,
+        "delta": delta,
+        "change_percentage": delta / previous_mean * 100 if previous_mean else 0,
+        "last_point_delta": values[-1] - values[-1 - season_length]
+    }
+
+
+def _noise_variance(values: Sequence[float]) -> float:
+    """Robust noise variance from the MAD of first differences, unaffected by level shifts"""
+    if _use_numpy():
+        differences = np.diff(np.asarray(values, dtype=float))
+        mad = float(np.median(np.abs(differences - np.median(differences))))
+    else:
+        differences = [b - a for a, b in zip(values, values[1:])]
+        center = statistics.median(differences)
+        mad = statistics.median(abs(d - center) for d in differences)
+    sigma = mad * 1.4826 / math.sqrt(2)
+    return sigma * sigma
+
+
+def remove_seasonality(values: Sequence[float], season_length: int) -> Sequence[float]:
+    """Values minus the mean of their phase within the season (plus the overall mean)"""
+    n = len(values)
+    if _use_numpy():
+        y = np.asarray(values, dtype=float)
+        phases = np.arange(n) % season_length
+        profile = np.bincount(phases, weights=y, minlength=season_length) / np.bincount(phases, minlength=season_length)
+        return y - profile[phases] + y.mean()
+
+    sums = [0.0] * season_length
+    counts = [0] * season_length
+    for position, value in enumerate(values):
+        sums[position % season_length] += value
+        counts[position % season_length] += 1
+    profile = [total / count for total, count in zip(sums, counts)]
+    overall = statistics.fmean(values)
+    return [value - profile[position % season_length] + overall for position, value in enumerate(values)]
+
+
+class _PrefixSums:
+    """Cumulative sums of a series, giving the best mean-shift split of any segment in O(length)"""
+
+    def __init__(self, values: Sequence[float]):
+        # Centering first keeps the sums small, so the gains below do not
+        # lose precision to cancellation
+        if _use_numpy():
+            y = np.asarray(values, dtype=float)
+            self.offset = float(y.mean())
+            self.cumulative = np.concatenate(([0.0], np.cumsum(y - self.offset)))
+        else:
+            self.offset = statistics.fmean(values)
+            self.cumulative = list(accumulate((v - self.offset for v in values), initial=0.0))
+
+    def segment_mean(self, start: int, end: int) -> float:
+        return float(self.cumulative[end] - self.cumulative[start]) / (end - start) + self.offset
+
+    def best_split(self, start: int, end: int, min_size: int) -> Optional[Tuple[float, int]]:
+        """(gain, split) maximizing the drop in squared error from splitting [start, end) in two
+
+        Splitting a segment of sum S and length n at k reduces its squared
+        error by S_left^2/n_left + S_right^2/n_right - S^2/n, which the
+        prefix sums give for every k at once.
+        """
+        first, last = start + min_size, end - min_size
+        if first > last:
+            return None
+        cumulative = self.cumulative
+        total = cumulative[end] - cumulative[start]
+        length = end - start
+
+        if _use_numpy():
+            splits = np.arange(first, last + 1)
+            left = cumulative[first:last + 1] - cumulative[start]
+            gains = left * left / (splits - start) + (total - left) ** 2 / (end - splits) - total * total / length
+            best = int(np.argmax(gains))
+            return float(gains[best]), int(splits[best])
+
+        best_gain, best_split = -math.inf, first
+        base = cumulative[start]
+        for split in range(first, last + 1):
+            left = cumulative[split] - base
+            gain = left * left / (split - start) + (total - left) ** 2 / (end - split) - total * total / length
+            if gain > best_gain:
+                best_gain, best_split = gain, split
+        return best_gain, best_split
+
+
+def _segment(values: Sequence[float], max_change_points: int, min_size: int,
+             noise_variance: float) -> Tuple[List[int], _PrefixSums]:
+    """Sorted split positions of a greedy binary segmentation, with the prefix sums used"""
+    n = len(values)
+    sums = _PrefixSums(values)
+    penalty = CHANGE_POINT_PENALTY * noise_variance * math.log(n)
+    min_shift = MIN_CHANGE_SHIFT * math.sqrt(noise_variance)
+    # Ignore gains that are only floating point noise on flat series
+    threshold = max(penalty, 1e-9 * (abs(sums.offset) + 1) ** 2)
+
+    candidates: List[Tuple[float, int, int, int]] = []
+
+    def consider(start: int, end: int):
+        best = sums.best_split(start, end, min_size)
+        if best is None or best[0] <= threshold:
+            return
+        gain, split = best
+        if abs(sums.segment_mean(split, end) - sums.segment_mean(start, split)) < min_shift:
+            return
+        heapq.heappush(candidates, (-gain, split, start, end))
+
+    consider(0, n)
+    splits: List[int] = []
+    while candidates and len(splits) < max_change_points:
+        _, split, start, end = heapq.heappop(candidates)
+        splits.append(split)
+        consider(start, split)
+        consider(split, end)
+    return sorted(splits), sums
+
+
+def _pooled_slope(values: Sequence[float], boundaries: List[int]) -> float:
+    """Common least-squares slope of the segments, each with its own level
+
+    This is the drift of a model with steps at the boundaries, so unlike a
+    single line through the series it is not tilted by the steps themselves.
+    """
+    edges = [0] + boundaries + [len(values)]
+    sxy = sxx = 0.0
+    if _use_numpy():
+        y = np.asarray(values, dtype=float)
+        for start, end in zip(edges, edges[1:]):
+            if end - start < 2:
+                continue
+            x = np.arange(end - start, dtype=float) - (end - start - 1) / 2
+            sxy += float(np.dot(x, y[start:end]))
+            sxx += (end - start) * ((end - start) ** 2 - 1) / 12
+    else:
+        for start, end in zip(edges, edges[1:]):
+            middle = (start + end - 1) / 2
+            sxy += math.fsum((x - middle) * values[x] for x in range(start, end))
+            sxx += (end - start) * ((end - start) ** 2 - 1) / 12
+    return sxy / sxx if sxx else 0.0
+
+
+def _subtract_drift(values: Sequence[float], slope: float) -> Sequence[float]:
+    if not slope:
+        return values
+    if _use_numpy():
+        return np.asarray(values, dtype=float) - slope * np.arange(len(values))
+    return [value - slope * x for x, value in enumerate(values)]
+
+
+def change_points(values: Sequence[float], max_change_points: int = DEFAULT_MAX_CHANGE_POINTS,
+                  min_segment_length: Optional[int] = None,
+                  season_length: Optional[int] = None) -> Dict[str, Any]:
+    """Shifts in the level of a series, by greedy binary segmentation
+
+    The segment whose best split reduces the squared error the most is split
+    next, as long as the reduction beats a BIC-like penalty scaled by the
+    noise variance and the shift is at least MIN_CHANGE_SHIFT noise standard
+    deviations. Each split costs one vectorized pass over its segment, so K
+    change points in n points cost O(n K). A linear drift is estimated
+    alongside the steps (alternating segmentation and a pooled slope) and
+    removed, so a slow drift is not cut into steps; with a season length the
+    seasonal profile is removed first as well. Levels are reported at the
+    change point, drift included.
+    """
+    n = len(values)
+    min_size = min_segment_length or max(2, n // 100)
+    result = {"drift_per_point": 0.0, "change_points": []}
+    if n < 2 * min_size or max_change_points < 1:
+        return result
+    if season_length and 1 < season_length <= n // 2:
+        values = remove_seasonality(values, season_length)
+
+    noise_variance = _noise_variance(values)
+    slope = 0.0
+    for _ in range(DRIFT_REFINEMENTS):
+        boundaries, _ = _segment(_subtract_drift(values, slope), max_change_points, min_size, noise_variance)
+        slope = _pooled_slope(values, boundaries)
+    boundaries, sums = _segment(_subtract_drift(values, slope), max_change_points, min_size, noise_variance)
+
+    edges = [0] + boundaries + [n]
+    for position, split in enumerate(boundaries, 1):
+        before = sums.segment_mean(edges[position - 1], split) + slope * split
+        after = sums.segment_mean(split, edges[position + 1]) + slope * split
+        result["change_points"].append({
+            "index": split,
+            "level_before": before,
+            "level_after": after,
+            "delta": after - before,
+            "change_percentage": (after - before) / before * 100 if before else 0
+        })
+    result["drift_per_point"] = slope
+    return result
@@ -0,0 +1,241 @@
+from typing import Dict, Any, List, Optional, Tuple
+import heapq
+from collections import Counter
+from datetime import datetime, timezone
+from .log_batch import ParsedLogBatch
+from .log_pages import LogEntryPage
+from .log_templates import LogTemplateMiner
+from .timestamps import TimestampParser
+
+
+class BoundedCounter:
+    """Counter that keeps at most `capacity` keys
+
+    When the capacity is exceeded the table is pruned down to its most frequent
+    half, so memory stays constant on unbounded vocabularies. Counts of the
+    heavy hitters stay exact as long as they never fall out of the table.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self.counts: Counter = Counter()
+
+    def update(self, keys: List[str]):
+        self.counts.update(keys)
+        if len(self.counts) > self.capacity:
+            keep = heapq.nlargest(self.capacity // 2, self.counts.items(), key=lambda item: item[1])
+            self.counts = Counter(dict(keep))
+
+    def most_common(self, n: int) -> List[Any]:
+        return self.counts.most_common(n)
+
+
+class LogSummaryAccumulator:
+    """Incrementally aggregates the figures reported by summarize_logs
+
+    Entries are fed a batch at a time, so the summary of an arbitrarily large log
+    can be computed in constant memory. The time range runs from the earliest
+    to the latest parseable timestamp, whatever the input order; only when no
+    timestamp parses does it fall back to the first and last ones seen.
+    """
+
+    def __init__(self, track_keywords: bool = False, keyword_capacity: int = 10000):
+        self.total_entries = 0
+        self.error_count = 0
+        self.level_counts: Counter = Counter()
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.earliest: Optional[Tuple[float, str]] = None
+        self.latest: Optional[Tuple[float, str]] = None
+        self.keywords = BoundedCounter(keyword_capacity) if track_keywords else None
+        self._parse_timestamp = TimestampParser()
+
+    def _observe_time(self, moment: float, timestamp: str):
+        if self.earliest is None or moment < self.earliest[0]:
+            self.earliest = (moment, timestamp)
+        if self.latest is None or moment >= self.latest[0]:
+            self.latest = (moment, timestamp)
+
+    def add_batch(self, batch: ParsedLogBatch, error_count: int):
+        """Account for a whole parsed batch containing `error_count` errors"""
+        self.total_entries += len(batch)
+        self.level_counts.update(batch.level_counts())
+        self.error_count += error_count
+
+        first, last = batch.first_and_last_timestamp()
+        if first is not None:
+            if self.first_timestamp is None:
+                self.first_timestamp = first
+            self.last_timestamp = last
+
+        bounds = batch.time_bounds()
+        if bounds is not None:
+            times = batch.epoch_times()
+            for row in bounds:
+                self._observe_time(times[row], batch.timestamp(row))
+
+        if self.keywords is not None:
+            for row in range(len(batch)):
+                self.keywords.update(batch.message(row).lower().split())
+
+    def result(self) -> Dict[str, Any]:
+        """Build the summary for everything seen so far"""
+        summary = {
+            "status": "success",
+            "total_entries": self.total_entries,
+            "level_breakdown": dict(self.level_counts),
+            "error_count": self.error_count,
+            "error_percentage": round(self.error_count / self.total_entries * 100, 2) if self.total_entries else 0,
+            "time_range": {
+                "start": self.earliest[1] if self.earliest else self.first_timestamp,
+                "end": self.latest[1] if self.latest else self.last_timestamp
+            }
+        }
+
+        if self.keywords is not None:
+            summary["common_keywords"] = [
+                {"word": word, "count": count} for word, count in self.keywords.most_common(10)
+            ]
+
+        return summary
+
+
+class PatternAccumulator:
+    """Incrementally aggregates the figures reported by analyze_patterns
+
+    Besides exact repeats, messages are clustered into templates (variable
+    parts such as ids, IPs and durations masked) by a LogTemplateMiner.
+    Keywords and repeated messages are kept in BoundedCounters, so memory
+    stays bounded however many distinct messages a large file holds.
+    """
+
+    def __init__(self, max_templates: int = 1000, counter_capacity: int = 10000):
+        self.total_analyzed = 0
+        self.level_counts: Counter = Counter()
+        self.word_counts = BoundedCounter(counter_capacity)
+        self.message_counts = BoundedCounter(counter_capacity)
+        self.templates = LogTemplateMiner(max_clusters=max_templates)
+
+    def add_batch(self, batch: ParsedLogBatch):
+        """Account for a whole parsed batch"""
+        self.total_analyzed += len(batch)
+        self.level_counts.update(batch.level_counts())
+        messages = [batch.message(row) for row in range(len(batch))]
+        self.word_counts.update([word for message in messages for word in message.lower().split()])
+        self.message_counts.update(messages)
+        add_template = self.templates.add
+        for message in messages:
+            add_template(message)
+
+    def result(self) -> Dict[str, Any]:
+        """Build the pattern analysis for everything seen so far"""
+        repeated_messages = [
+            {"message": msg, "count": count}
+            for msg, count in self.message_counts.most_common(5) if count > 1
+        ]
+
+        return {
+            "status": "success",
+            "level_distribution": dict(self.level_counts),
+            "common_keywords": [
+                {"word": word, "count": count} for word, count in self.word_counts.most_common(10)
+            ],
+            "repeated_messages": repeated_messages,
+            "templates": self.templates.templates(10),
+            "template_count": len(self.templates.clusters),
+            "total_analyzed": self.total_analyzed
+        }
+
+
+class ErrorAccumulator:
+    """Counts the error entries reported by find_errors and keeps one page of them
+
+    The page (limit, cursor and fields) is the same as find_errors would
+    return, so only the requested entries are materialized.
+    """
+
+    def __init__(self, page: Optional[LogEntryPage] = None):
+        self.page = page or LogEntryPage()
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_batch(self, batch: ParsedLogBatch, error_hits: List[Tuple[int, str]]):
+        """Account for a parsed batch given its (row, matched pattern) error hits"""
+        self.errors.extend(self.page.add(
+            batch, [row for row, _ in error_hits], [pattern for _, pattern in error_hits]
+        ))
+
+    def result(self) -> Dict[str, Any]:
+        """Build the error report for everything seen so far"""
+        page = self.page
+        result = {
+            "status": "success",
+            "total_errors": page.matched,
+            "errors": self.errors,
+            "error_rate": page.matched / page.lines * 100 if page.lines else 0
+        }
+        page.annotate(result)
+        return result
+
+
+class LogHistogramAccumulator:
+    """Counts entries per level and errors in fixed time intervals, for log_histogram
+
+    Each batch is bucketed in one pass over its parsed epoch times; memory
+    grows with the number of non-empty intervals, not with the log.
+    """
+
+    def __init__(self, interval_seconds: int):
+        self.interval_seconds = interval_seconds
+        self.total_entries = 0
+        self.untimed_entries = 0
+        # Interval start (epoch seconds) -> [entries, errors, level counts]
+        self.buckets: Dict[int, List[Any]] = {}
+
+    def _bucket(self, start: int) -> List[Any]:
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = [0, 0, Counter()]
+        return bucket
+
+    def add_batch(self, batch: ParsedLogBatch, error_hits: List[Tuple[int, str]]):
+        """Account for a parsed batch given its (row, matched pattern) error hits"""
+        self.total_entries += len(batch)
+        interval = self.interval_seconds
+        # NaN (no timestamp) is the only value not equal to itself
+        starts = [int(moment // interval) * interval if moment == moment else None
+                  for moment in batch.epoch_times()]
+
+        levels = batch.levels
+        for (start, code), count in Counter(zip(starts, batch.level_codes)).items():
+            if start is None:
+                self.untimed_entries += count
+                continue
+            bucket = self._bucket(start)
+            bucket[0] += count
+            bucket[2][levels[code]] += count
+
+        for start, count in Counter(starts[row] for row, _ in error_hits).items():
+            if start is not None:
+                self.buckets[start][1] += count
+
+    def result(self) -> Dict[str, Any]:
+        """Build the histogram for everything seen so far, intervals in time order"""
+        buckets = []
+        for start in sorted(self.buckets):
+            entries, errors, level_counts = self.buckets[start]
+            buckets.append({
+                "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                "epoch": start,
+                "count": entries,
+                "levels": dict(level_counts),
+                "errors": errors,
+                "error_rate": round(errors / entries * 100, 2)
+            })
+
+        return {
+            "status": "success",
+            "interval_seconds": self.interval_seconds,
+            "total_entries": self.total_entries,
+            "untimed_entries": self.untimed_entries,
+            "buckets": buckets
+        }
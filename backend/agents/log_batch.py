@@ -0,0 +1,353 @@
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+import math
+from .log_formats import (
+    BRACKET_FORMAT, DETECTION_SAMPLE_SIZE, UNKNOWN_LEVEL, LogFormat, ParsedLine, detect_log_format
+)
+from .timestamps import TimestampParser
+
+
+# Common log pattern: [TIMESTAMP] LEVEL: MESSAGE
+LOG_LINE_PATTERN = BRACKET_FORMAT.pattern
+
+
+class ParsedLogBatch:
+    """Columnar, array-backed store of parsed log lines
+
+    All lines are joined into one shared buffer and, for formats whose fields
+    are slices of the line, every field is kept as an offset/length slice into
+    it, with levels interned as small integer codes. A row costs a few dozen
+    bytes instead of a 4-key dict plus two copies of the line. Structured
+    formats (JSON, logfmt) keep their decoded timestamps and messages instead.
+    Columns are only parsed the first time something needs them (error scans
+    and keyword filters work on the raw buffer alone), and strings
+    (timestamps, messages, dicts) are only materialized for the rows somebody
+    actually asks for. Unless one is given, the log format is detected once
+    from a sample of the batch.
+    """
+
+    def __init__(self, buffer: str, line_starts: array, line_lengths: array,
+                 log_format: Optional[LogFormat] = None):
+        self.buffer = buffer
+        self.line_starts = line_starts
+        self.line_lengths = line_lengths
+        self._log_format = log_format
+        self._parsed = False
+        self._spans = False
+        self._timestamp_offsets = array("I")
+        self._timestamp_lengths = array("I")
+        self._message_offsets = array("I")
+        self._message_lengths = array("I")
+        self._timestamps: List[Optional[str]] = []
+        self._messages: List[str] = []
+        self._level_codes = array("I")
+        self.levels: List[str] = []
+        self._epoch_times: Optional[array] = None
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], log_format: Optional[LogFormat] = None) -> "ParsedLogBatch":
+        """Build a batch from raw log lines"""
+        lines = lines if isinstance(lines, list) else list(lines)
+        line_lengths = array("I", map(len, lines))
+        line_starts = array("Q", accumulate(line_lengths, lambda start, length: start + length + 1, initial=0))
+        line_starts.pop()
+        return cls("\n".join(lines), line_starts, line_lengths, log_format)
+
+    @classmethod
+    def from_text(cls, text: str, log_format: Optional[LogFormat] = None) -> "ParsedLogBatch":
+        """Build a batch over newline-separated text, using it as the buffer as is
+
+        Blank lines are skipped and trailing carriage returns are left out of
+        the lines, as in a streamed upload.
+        """
+        lines = text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+
+        if "\r" not in text and "\n\n" not in text and not text.startswith("\n"):
+            # No blank lines and no carriage returns: offsets follow from the lengths
+            line_lengths = array("I", map(len, lines))
+            line_starts = array("Q", accumulate(line_lengths, lambda start, length: start + length + 1, initial=0))
+            line_starts.pop()
+            return cls(text, line_starts, line_lengths, log_format)
+
+        line_starts = array("Q")
+        line_lengths = array("I")
+        position = 0
+        for line in lines:
+            length = len(line)
+            if length and line[-1] == "\r":
+                trimmed = len(line.rstrip("\r"))
+            else:
+                trimmed = length
+            if trimmed:
+                line_starts.append(position)
+                line_lengths.append(trimmed)
+            position += length + 1
+        return cls(text, line_starts, line_lengths, log_format)
+
+    @property
+    def log_format(self) -> LogFormat:
+        """Format of the lines, detected from the first rows unless it was given"""
+        if self._log_format is None:
+            sample = [self.raw(row) for row in range(min(len(self), DETECTION_SAMPLE_SIZE))]
+            self._log_format = detect_log_format(sample)
+        return self._log_format
+
+    def _parse_row(self, row: int) -> ParsedLine:
+        """Parse one row into (timestamp, level, message) without parsing the whole batch"""
+        line = self.raw(row)
+        parsed = self.log_format.parse(line)
+        return parsed if parsed else (None, UNKNOWN_LEVEL, line)
+
+    def _ensure_parsed(self):
+        """Parse every row into the timestamp, message and level columns"""
+        if self._parsed:
+            return
+
+        log_format = self.log_format
+        if log_format.spans:
+            self._parse_spans(log_format)
+        else:
+            self._parse_values(log_format)
+        self._spans = log_format.spans
+        self._parsed = True
+
+    def _intern_level(self, level: str, level_index: Dict[str, int]) -> int:
+        code = level_index.get(level)
+        if code is None:
+            code = level_index[level] = len(self.levels)
+            self.levels.append(level)
+        return code
+
+    def _parse_spans(self, log_format: LogFormat):
+        """Fill the offset/length columns of a format whose fields are slices of the line"""
+        timestamp_offsets = self._timestamp_offsets
+        timestamp_lengths = self._timestamp_lengths
+        message_offsets = self._message_offsets
+        message_lengths = self._message_lengths
+        level_codes = self._level_codes
+        levels = self.levels
+        level_index: Dict[str, int] = {}
+
+        buffer = self.buffer
+        match_line = log_format.pattern.match
+        timestamp_group = log_format.timestamp_group
+        message_group = log_format.message_group
+        level_group = log_format.level_group
+        level_of = log_format.level
+        for start, length in zip(self.line_starts, self.line_lengths):
+            match = match_line(buffer, start, start + length)
+            if match:
+                ts_start, ts_end = match.span(timestamp_group)
+                msg_start, msg_end = match.span(message_group)
+                level = match.group(level_group) if level_group is not None else level_of(match)
+                timestamp_offsets.append(ts_start - start)
+                timestamp_lengths.append(ts_end - ts_start)
+            else:
+                msg_start, msg_end = start, start + length
+                level = UNKNOWN_LEVEL
+                timestamp_offsets.append(0)
+                timestamp_lengths.append(0)
+
+            code = level_index.get(level)
+            if code is None:
+                code = level_index[level] = len(levels)
+                levels.append(level)
+
+            message_offsets.append(msg_start - start)
+            message_lengths.append(msg_end - msg_start)
+            level_codes.append(code)
+
+    def _parse_values(self, log_format: LogFormat):
+        """Fill the decoded timestamp and message columns of a structured format"""
+        timestamps = self._timestamps
+        messages = self._messages
+        level_codes = self._level_codes
+        level_index: Dict[str, int] = {}
+
+        parse = log_format.parse
+        for row in range(len(self)):
+            line = self.raw(row)
+            parsed = parse(line)
+            timestamp, level, message = parsed if parsed else (None, UNKNOWN_LEVEL, line)
+            timestamps.append(timestamp)
+            messages.append(message)
+            level_codes.append(self._intern_level(level, level_index))
+
+    @property
+    def level_codes(self) -> array:
+        self._ensure_parsed()
+        return self._level_codes
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def raw(self, row: int) -> str:
+        start = self.line_starts[row]
+        return self.buffer[start:start + self.line_lengths[row]]
+
+    def timestamp(self, row: int) -> Optional[str]:
+        if not self._parsed:
+            return self._parse_row(row)[0]
+        if not self._spans:
+            return self._timestamps[row]
+        length = self._timestamp_lengths[row]
+        if not length:
+            return None
+        start = self.line_starts[row] + self._timestamp_offsets[row]
+        return self.buffer[start:start + length]
+
+    def message(self, row: int) -> str:
+        if not self._parsed:
+            return self._parse_row(row)[2]
+        if not self._spans:
+            return self._messages[row]
+        start = self.line_starts[row] + self._message_offsets[row]
+        return self.buffer[start:start + self._message_lengths[row]]
+
+    def level(self, row: int) -> str:
+        if not self._parsed:
+            return self._parse_row(row)[1]
+        return self.levels[self._level_codes[row]]
+
+    def level_counts(self, rows: Optional[Iterable[int]] = None) -> Dict[str, int]:
+        """Count entries per level, in order of first appearance"""
+        if rows is None:
+            counts = Counter(self.level_codes)
+        else:
+            codes = self.level_codes
+            counts = Counter(codes[row] for row in rows)
+        return {self.levels[code]: count for code, count in counts.items()}
+
+    def rows_with_level(self, level: str) -> List[int]:
+        """Rows whose level equals `level`"""
+        codes = self.level_codes
+        if level not in self.levels:
+            return []
+        code = self.levels.index(level)
+        return [row for row, row_code in enumerate(codes) if row_code == code]
+
+    def rows_containing(self, keyword: str, rows: Optional[Iterable[int]] = None) -> List[int]:
+        """Rows whose raw line contains `keyword`, case-insensitively"""
+        keyword = keyword.lower()
+        if not keyword:
+            return list(range(len(self)) if rows is None else rows)
+        lowered = self.buffer.lower()
+
+        if rows is not None or len(lowered) != len(self.buffer) or "\n" in keyword:
+            candidates = range(len(self)) if rows is None else rows
+            return [row for row in candidates if keyword in self.raw(row).lower()]
+
+        # Scan the whole buffer with str.find and map hits back to rows,
+        # skipping to the next line after each hit.
+        matched = []
+        line_starts = self.line_starts
+        find = lowered.find
+        pos = find(keyword)
+        while pos != -1:
+            row = bisect_right(line_starts, pos) - 1
+            line_end = line_starts[row] + self.line_lengths[row]
+            if pos + len(keyword) <= line_end:
+                matched.append(row)
+                pos = find(keyword, line_end + 1)
+            else:
+                pos = find(keyword, pos + 1)
+        return matched
+
+    def epoch_times(self) -> array:
+        """Timestamp of every row in epoch seconds (NaN where it is missing or unparseable)
+
+        Parsed once per batch and cached. Lines logged within the same second
+        share their timestamp string, so each distinct string is parsed once.
+        """
+        if self._epoch_times is None:
+            self._ensure_parsed()
+            if self._spans:
+                buffer = self.buffer
+                stamps = [
+                    buffer[start + offset:start + offset + length] if length else None
+                    for start, offset, length in zip(self.line_starts, self._timestamp_offsets,
+                                                     self._timestamp_lengths)
+                ]
+            else:
+                stamps = self._timestamps
+
+            parse = TimestampParser()
+            nan = math.nan
+            moments = {}
+            for stamp in stamps:
+                if stamp not in moments:
+                    moment = parse(stamp)
+                    moments[stamp] = nan if moment is None else moment
+            self._epoch_times = array("d", map(moments.__getitem__, stamps))
+        return self._epoch_times
+
+    def rows_in_time_range(self, start: Optional[float], end: Optional[float],
+                           rows: Optional[Iterable[int]] = None) -> List[int]:
+        """Rows whose timestamp lies within [start, end] (epoch seconds, None for open bounds)"""
+        times = self.epoch_times()
+        low = -math.inf if start is None else start
+        high = math.inf if end is None else end
+        candidates = range(len(self)) if rows is None else rows
+        # NaN compares false, so rows without a timestamp never match
+        return [row for row in candidates if low <= times[row] <= high]
+
+    def error_hits(self, error_matcher) -> List[Tuple[int, str]]:
+        """(row, matched pattern) pairs for every error line, in row order"""
+        return error_matcher.scan_buffer(self.buffer, self.line_starts, self.line_lengths)
+
+    def first_and_last_timestamp(self) -> Tuple[Optional[str], Optional[str]]:
+        """First and last timestamps in input order"""
+        self._ensure_parsed()
+        first = last = None
+        present = self._timestamp_lengths if self._spans else self._timestamps
+        for row in range(len(self)):
+            if present[row]:
+                first = self.timestamp(row)
+                break
+        for row in range(len(self) - 1, -1, -1):
+            if present[row]:
+                last = self.timestamp(row)
+                break
+        return first, last
+
+    def time_bounds(self) -> Optional[Tuple[int, int]]:
+        """Rows holding the earliest and latest parseable timestamps, or None when there are none"""
+        times = self.epoch_times()
+        earliest = latest = None
+        for row, moment in enumerate(times):
+            if moment != moment:
+                continue
+            if earliest is None or moment < times[earliest]:
+                earliest = row
+            if latest is None or moment >= times[latest]:
+                latest = row
+        return None if earliest is None else (earliest, latest)
+
+    def to_dict(self, row: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Materialize one row in the parse_logs entry format, optionally only some `fields`"""
+        if fields is not None and (not fields or fields == ("raw",)):
+            return {"raw": self.raw(row)} if fields else {}
+        if not self._parsed:
+            timestamp, level, message = self._parse_row(row)
+        else:
+            timestamp, level, message = self.timestamp(row), self.level(row), self.message(row)
+        entry = {
+            "timestamp": timestamp,
+            "level": level,
+            "message": message,
+            "raw": self.raw(row)
+        }
+        if fields is None:
+            return entry
+        return {field: entry[field] for field in fields}
+
+    def to_dicts(self, rows: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Materialize the given rows (all rows by default)"""
+        if rows is None:
+            rows = range(len(self))
+        return [self.to_dict(row) for row in rows]
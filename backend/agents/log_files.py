@@ -0,0 +1,103 @@
+from typing import Iterator, List, Sequence, Union
+import glob
+import gzip
+import mmap
+import os
+from .log_stream import GZIP_MAGIC
+
+
+# Size of the raw chunks log files are decoded and analyzed in
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def resolve_log_files(path: str) -> List[str]:
+    """Absolute paths of the log files behind a source path
+
+    The path may name a file, a directory (every visible file in it) or a
+    glob pattern such as "/var/log/app/*.log*".
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+
+    if os.path.isfile(path):
+        return [path]
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if not name.startswith(".") and os.path.isfile(os.path.join(path, name))
+        )
+    if glob.has_magic(path):
+        files = sorted(match for match in glob.glob(path) if os.path.isfile(match))
+        if files:
+            return files
+    raise FileNotFoundError(f"Log source not found: {path}")
+
+
+def map_file(path: str) -> Union[mmap.mmap, bytes]:
+    """Read-only memory map of a file (empty files, which cannot be mapped, give b"")"""
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def is_gzip_file(path: str) -> bool:
+    """Whether a file is gzip-compressed, judged by its magic bytes rather than its name"""
+    with open(path, "rb") as handle:
+        return handle.read(2) == GZIP_MAGIC
+
+
+def iter_file_text(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES, encoding: str = "utf-8") -> Iterator[str]:
+    """Decoded text of a log file in chunks that end on line boundaries
+
+    Plain files are memory-mapped and each chunk is decoded straight out of
+    the mapping, without copying the file into Python bytes first. Gzip files
+    (including concatenated members) are decompressed incrementally.
+    """
+    if is_gzip_file(path):
+        with gzip.open(path, "rb") as handle:
+            pending = b""
+            while True:
+                data = handle.read(chunk_bytes)
+                if not data:
+                    break
+                data = pending + data
+                cut = data.rfind(b"\n") + 1
+                pending = data[cut:]
+                if cut:
+                    yield data[:cut].decode(encoding, "replace")
+            if pending:
+                yield pending.decode(encoding, "replace")
+        return
+
+    data = map_file(path)
+    if not data:
+        return
+    try:
+        size = len(data)
+        with memoryview(data) as view:
+            position = 0
+            while position < size:
+                end = min(position + chunk_bytes, size)
+                if end < size:
+                    # Move the end of the chunk to the end of its last line
+                    cut = data.rfind(b"\n", position, end)
+                    if cut == -1:
+                        cut = data.find(b"\n", end)
+                    end = size if cut == -1 else cut + 1
+                yield str(view[position:end], encoding, "replace")
+                position = end
+    finally:
+        data.close()
+
+
+def ensure_allowed(path: str, roots: Sequence[str]):
+    """Raise PermissionError unless `path` lies under one of the allowed root directories"""
+    if not roots:
+        raise PermissionError("Server-side log files are disabled; set AGENT_LOG_SOURCE_ROOTS to allow them")
+
+    real = os.path.realpath(os.path.expanduser(path))
+    for root in roots:
+        root = os.path.realpath(os.path.expanduser(root))
+        if real == root or real.startswith(root.rstrip(os.sep) + os.sep):
+            return
+    raise PermissionError(f"Log path is outside the allowed roots: {path}")
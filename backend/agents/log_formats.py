@@ -0,0 +1,225 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+import json
+import re
+
+
+UNKNOWN_LEVEL = "UNKNOWN"
+
+# Lines sampled to pick the format of a batch or file
+DETECTION_SAMPLE_SIZE = 100
+
+# A parsed line: (timestamp, level, message)
+ParsedLine = Tuple[Optional[str], str, str]
+
+
+class LogFormat(ABC):
+    """A log line format: knows how to split a line into timestamp, level and message
+
+    Formats whose fields are plain slices of the line (`spans = True`) let
+    ParsedLogBatch keep offsets into its buffer instead of strings.
+    """
+
+    name = ""
+    spans = False
+
+    @abstractmethod
+    def parse(self, line: str) -> Optional[ParsedLine]:
+        """(timestamp, level, message) of a line, or None if the line is not in this format"""
+        pass
+
+    def parse_entry(self, line: str) -> Dict[str, Any]:
+        """Parse one line into the parse_logs entry format"""
+        parsed = self.parse(line)
+        timestamp, level, message = parsed if parsed else (None, UNKNOWN_LEVEL, line)
+        return {
+            "timestamp": timestamp,
+            "level": level,
+            "message": message,
+            "raw": line
+        }
+
+
+class RegexLogFormat(LogFormat):
+    """Format matched by one precompiled pattern with `timestamp` and `message` groups
+
+    The level comes from the `level` group, or from `level_of(match)` for
+    formats that encode it differently (HTTP status, syslog priority).
+    """
+
+    spans = True
+
+    def __init__(self, name: str, pattern: str,
+                 level_of: Optional[Callable[["re.Match"], str]] = None):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.timestamp_group = self.pattern.groupindex["timestamp"]
+        self.message_group = self.pattern.groupindex["message"]
+        self.level_group = self.pattern.groupindex.get("level")
+        self.level_of = level_of
+
+    def level(self, match: "re.Match") -> str:
+        if self.level_group is not None:
+            return match.group(self.level_group)
+        return self.level_of(match)
+
+    def parse(self, line: str) -> Optional[ParsedLine]:
+        match = self.pattern.match(line)
+        if not match:
+            return None
+        return match.group(self.timestamp_group), self.level(match), match.group(self.message_group)
+
+
+# Keys holding the standard fields in structured (JSON, logfmt) lines
+TIMESTAMP_KEYS = ("timestamp", "time", "ts", "@timestamp", "datetime")
+LEVEL_KEYS = ("level", "severity", "lvl", "loglevel", "log.level")
+MESSAGE_KEYS = ("message", "msg", "@message", "event")
+
+
+def _first_field(fields: Dict[str, Any], keys: Iterable[str]) -> Optional[str]:
+    for key in keys:
+        value = fields.get(key)
+        if value is not None:
+            return value if isinstance(value, str) else str(value)
+    return None
+
+
+class StructuredLogFormat(LogFormat):
+    """Format made of key/value fields, decoded by `decode(line)` into a dict"""
+
+    def __init__(self, name: str, decode: Callable[[str], Optional[Dict[str, Any]]]):
+        self.name = name
+        self.decode = decode
+
+    def parse(self, line: str) -> Optional[ParsedLine]:
+        fields = self.decode(line)
+        if fields is None:
+            return None
+        level = _first_field(fields, LEVEL_KEYS)
+        message = _first_field(fields, MESSAGE_KEYS)
+        return (
+            _first_field(fields, TIMESTAMP_KEYS),
+            level.upper() if level else UNKNOWN_LEVEL,
+            line if message is None else message
+        )
+
+
+def _decode_json(line: str) -> Optional[Dict[str, Any]]:
+    if not line.startswith("{"):
+        return None
+    try:
+        fields = json.loads(line)
+    except ValueError:
+        return None
+    return fields if isinstance(fields, dict) else None
+
+
+# One key=value pair and the whitespace after it; quoted values are captured
+# without their quotes
+LOGFMT_PAIR = re.compile(r'([\w.\-@]+)=(?:"((?:[^"\\]|\\.)*)"|(\S*))(?:\s+|$)')
+
+
+def _decode_logfmt(line: str) -> Optional[Dict[str, Any]]:
+    end = len(line)
+    position = end - len(line.lstrip())
+    fields = {}
+    match_pair = LOGFMT_PAIR.match
+    while position < end:
+        match = match_pair(line, position)
+        if match is None:
+            return None
+        key, quoted, value = match.groups()
+        if quoted is not None:
+            value = quoted
+            if "\\" in quoted:
+                try:
+                    value = json.loads(f'"{quoted}"')
+                except ValueError:
+                    pass
+        fields[key] = value
+        position = match.end()
+    return fields or None
+
+
+def _http_status_level(match: "re.Match") -> str:
+    status = match.group("status")
+    if status >= "500":
+        return "ERROR"
+    if status >= "400":
+        return "WARN"
+    return "INFO"
+
+
+# Syslog severities 0-7 (emergency ... debug)
+SYSLOG_SEVERITY_LEVELS = ("CRITICAL", "CRITICAL", "CRITICAL", "ERROR", "WARN", "INFO", "INFO", "DEBUG")
+
+
+def _syslog_level(match: "re.Match") -> str:
+    priority = match.group("priority")
+    if priority is None:
+        return UNKNOWN_LEVEL
+    return SYSLOG_SEVERITY_LEVELS[int(priority) % 8]
+
+
+# [TIMESTAMP] LEVEL: MESSAGE
+BRACKET_FORMAT = RegexLogFormat(
+    "bracket",
+    r"\[(?P<timestamp>[^\]]+)\]\s+(?P<level>\w+):\s+(?P<message>.*)"
+)
+
+# {"timestamp": "...", "level": "info", "message": "..."}
+JSON_FORMAT = StructuredLogFormat("json", _decode_json)
+
+# ts=... level=info msg="..."
+LOGFMT_FORMAT = StructuredLogFormat("logfmt", _decode_logfmt)
+
+# Apache/nginx common and combined access logs; the level follows the status code
+COMBINED_FORMAT = RegexLogFormat(
+    "combined",
+    r'\S+ \S+ \S+ \[(?P<timestamp>[^\]]+)\] (?P<message>"[^"]*" (?P<status>\d{3})(?: .*)?)',
+    level_of=_http_status_level
+)
+
+# BSD syslog ("<34>Oct 11 22:14:15 host app[42]: text"), with an optional
+# priority and either the classic or an ISO 8601 timestamp
+SYSLOG_FORMAT = RegexLogFormat(
+    "syslog",
+    r"(?:<(?P<priority>\d{1,3})>(?:1 )?)?"
+    r"(?P<timestamp>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d|\d{4}-\d\d-\d\dT[\d:.]+(?:Z|[+-]\d\d:?\d\d)?) "
+    r"\S+ (?P<message>[^\s:\[]+(?:\[\d+\])?: .*)",
+    level_of=_syslog_level
+)
+
+_formats: Dict[str, LogFormat] = {}
+
+
+def register_log_format(log_format: LogFormat):
+    """Make a format available by name and to auto-detection"""
+    _formats[log_format.name] = log_format
+
+
+for _format in (BRACKET_FORMAT, JSON_FORMAT, LOGFMT_FORMAT, COMBINED_FORMAT, SYSLOG_FORMAT):
+    register_log_format(_format)
+
+
+def log_format_names() -> List[str]:
+    return list(_formats)
+
+
+def get_log_format(name: str) -> LogFormat:
+    """Registered format by name; raises LookupError for unknown names"""
+    log_format = _formats.get(name)
+    if log_format is None:
+        raise LookupError(f"Unknown log format: {name} (known: {', '.join(_formats)})")
+    return log_format
+
+
+def detect_log_format(sample: Iterable[str]) -> LogFormat:
+    """Format that parses most of the sample lines (the bracket format when none does)"""
+    lines = [line for line in sample if line][:DETECTION_SAMPLE_SIZE]
+    best, best_count = BRACKET_FORMAT, 0
+    for log_format in _formats.values():
+        count = sum(1 for line in lines if log_format.parse(line) is not None)
+        if count > best_count:
+            best, best_count = log_format, count
+    return best
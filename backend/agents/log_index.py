@@ -0,0 +1,522 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+from itertools import accumulate
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from .log_formats import DETECTION_SAMPLE_SIZE, UNKNOWN_LEVEL, LogFormat, detect_log_format, get_log_format
+from .log_files import is_gzip_file, map_file, resolve_log_files
+from .timestamps import TimestampParser
+
+
+INDEX_FORMAT_VERSION = 3
+
+# Tokens of the inverted index: lowercase runs of word characters
+TOKEN_PATTERN = re.compile(r"\w+")
+
+SOURCE_NAME_PATTERN = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
+
+# Column files of an index directory and their array type codes
+_COLUMNS = {
+    "line_starts": "Q",      # byte offset of every line in its file
+    "line_lengths": "I",     # byte length of every line
+    "file_ids": "H",         # file of every line
+    "level_codes": "H",      # level of every line
+    "row_times": "d",        # epoch timestamp of every line (NaN when absent)
+    "times": "d",            # all timestamps, sorted
+    "time_rows": "I",        # row of every sorted timestamp
+    "level_postings": "I",   # rows per level, concatenated
+    "token_postings": "I",   # rows per token, concatenated
+    "token_offsets": "Q"     # start of every token's postings (plus the end)
+}
+
+# Keyword tokens whose matching vocabulary entries are remembered per index
+KEYWORD_TOKEN_CACHE_SIZE = 1024
+
+
+def _indexable(token: str) -> bool:
+    # Pure numbers (ids, counters, ports) would bloat the vocabulary without
+    # making useful posting lists; lines are always verified anyway
+    return not token.isdigit()
+
+
+def _file_state(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _indexed_files(path: str) -> List[str]:
+    # Lines are read back by offset, which compressed (rotated) files do not allow
+    return [file_path for file_path in resolve_log_files(path) if not is_gzip_file(file_path)]
+
+
+def _detect_file_format(data) -> LogFormat:
+    """Format of a mapped log file, detected from its first lines"""
+    head = data[:64 * 1024].decode("utf-8", "replace")
+    return detect_log_format(head.splitlines()[:DETECTION_SAMPLE_SIZE])
+
+
+def build_log_index(name: str, path: str, index_dir: str) -> "LogIndex":
+    """Index every line of a log source and persist the index under `index_dir`/`name`"""
+    files = _indexed_files(path)
+    if len(files) > 65535:
+        raise ValueError(f"Too many files in log source: {len(files)}")
+
+    line_starts = array("Q")
+    line_lengths = array("I")
+    file_ids = array("H")
+    level_codes = array("H")
+    row_times = array("d")
+    levels: List[str] = []
+    level_index: Dict[str, int] = {}
+    level_rows: List[array] = []
+    token_rows: Dict[str, array] = {}
+
+    file_states = []
+    file_formats = []
+    find_tokens = TOKEN_PATTERN.findall
+    nan = math.nan
+
+    for file_id, file_path in enumerate(files):
+        file_states.append(_file_state(file_path))
+        data = map_file(file_path)
+        size = len(data)
+        log_format = _detect_file_format(data)
+        file_formats.append(log_format.name)
+        parse = log_format.parse
+        parse_timestamp = TimestampParser()
+        position = 0
+        while position < size:
+            end = data.find(b"\n", position)
+            if end == -1:
+                end = size
+            line_end = end - 1 if end > position and data[end - 1] == 13 else end
+
+            if line_end > position:
+                line = data[position:line_end].decode("utf-8", "replace")
+                row = len(line_starts)
+                parsed = parse(line)
+                level = parsed[1] if parsed else UNKNOWN_LEVEL
+                moment = parse_timestamp(parsed[0]) if parsed else None
+
+                code = level_index.get(level)
+                if code is None:
+                    code = level_index[level] = len(levels)
+                    levels.append(level)
+                    level_rows.append(array("I"))
+                level_rows[code].append(row)
+
+                line_starts.append(position)
+                line_lengths.append(line_end - position)
+                file_ids.append(file_id)
+                level_codes.append(code)
+                row_times.append(nan if moment is None else moment)
+
+                for token in set(find_tokens(line.lower())):
+                    if _indexable(token):
+                        rows = token_rows.get(token)
+                        if rows is None:
+                            rows = token_rows[token] = array("I")
+                        rows.append(row)
+
+            position = end + 1
+
+        if not isinstance(data, bytes):
+            data.close()
+
+    # Logs are usually written in time order, which makes this sort cheap
+    timed = sorted((moment, row) for row, moment in enumerate(row_times) if moment == moment)
+    times = array("d", (moment for moment, _ in timed))
+    time_rows = array("I", (row for _, row in timed))
+
+    level_postings = array("I")
+    level_offsets = [0]
+    for rows in level_rows:
+        level_postings.extend(rows)
+        level_offsets.append(len(level_postings))
+
+    vocabulary = sorted(token_rows)
+    token_postings = array("I")
+    token_offsets = array("Q", [0])
+    for token in vocabulary:
+        token_postings.extend(token_rows[token])
+        token_offsets.append(len(token_postings))
+
+    columns = {
+        "line_starts": line_starts,
+        "line_lengths": line_lengths,
+        "file_ids": file_ids,
+        "level_codes": level_codes,
+        "row_times": row_times,
+        "times": times,
+        "time_rows": time_rows,
+        "level_postings": level_postings,
+        "token_postings": token_postings,
+        "token_offsets": token_offsets
+    }
+    meta = {
+        "version": INDEX_FORMAT_VERSION,
+        "name": name,
+        "path": os.path.abspath(os.path.expanduser(path)),
+        "files": file_states,
+        "formats": file_formats,
+        "rows": len(line_starts),
+        "levels": levels,
+        "level_offsets": level_offsets,
+        "tokens": len(vocabulary),
+        "built_at": datetime.now().isoformat()
+    }
+
+    # Write into a scratch directory and swap it in, so readers in other
+    # processes never see a half-written index
+    directory = os.path.join(index_dir, name)
+    scratch = os.path.join(index_dir, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    for column, values in columns.items():
+        with open(os.path.join(scratch, f"{column}.bin"), "wb") as handle:
+            values.tofile(handle)
+    with open(os.path.join(scratch, "vocabulary.txt"), "w", encoding="utf-8") as handle:
+        handle.write("\n".join(vocabulary))
+    with open(os.path.join(scratch, "meta.json"), "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+
+    retired = None
+    if os.path.exists(directory):
+        retired = f"{scratch}.old"
+        os.replace(directory, retired)
+    os.replace(scratch, directory)
+    if retired:
+        shutil.rmtree(retired, ignore_errors=True)
+
+    return open_log_index(directory)
+
+
+class LogIndex:
+    """Persistent, memory-mapped index over the lines of a log source
+
+    Every column is a flat binary array on disk that is memory-mapped rather
+    than loaded: per-line file offsets, levels and timestamps, a sorted
+    timestamp→row index for time windows, per-level posting lists and a token
+    inverted index. A query starts from the most selective of those lookups
+    and only reads the candidate lines back from the log files.
+
+    An index is used as a context manager by whoever got it from
+    `open_log_index`; once a rebuild replaces it, it is retired and unmapped
+    as soon as the last of them is done.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as handle:
+            self.meta = json.load(handle)
+        if self.meta.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported log index version in {directory}")
+
+        self.name: str = self.meta["name"]
+        self.path: str = self.meta["path"]
+        self.levels: List[str] = self.meta["levels"]
+        self.rows: int = self.meta["rows"]
+        self.files: List[str] = [state["path"] for state in self.meta["files"]]
+        self.formats: List[LogFormat] = [get_log_format(name) for name in self.meta["formats"]]
+
+        self._maps = []
+        for column, typecode in _COLUMNS.items():
+            setattr(self, column, self._map_column(column, typecode))
+        self._file_maps: Dict[int, Any] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._vocabulary_text = ""
+        self._vocabulary_starts: List[int] = []
+        self._vocabulary_matching = lru_cache(maxsize=KEYWORD_TOKEN_CACHE_SIZE)(self._find_in_vocabulary)
+
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+
+    def __enter__(self) -> "LogIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def acquire(self):
+        """Mark the index as in use; open_log_index does this for its caller"""
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        """Done using the index; unmaps it if it was retired meanwhile"""
+        with self._lock:
+            self._users -= 1
+            unused = self._retired and self._users == 0
+        if unused:
+            self.close()
+
+    def retire(self):
+        """Unmap the index once no one is using it any more"""
+        with self._lock:
+            self._retired = True
+            unused = self._users == 0
+        if unused:
+            self.close()
+
+    def _map_column(self, column: str, typecode: str):
+        data = map_file(os.path.join(self.directory, f"{column}.bin"))
+        if not data:
+            return array(typecode)
+        self._maps.append(data)
+        return memoryview(data).cast(typecode)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Indexed tokens in sorted order (loaded on first keyword query)"""
+        if self._vocabulary is None:
+            with open(os.path.join(self.directory, "vocabulary.txt"), encoding="utf-8") as handle:
+                text = handle.read()
+            vocabulary = text.split("\n") if text else []
+            self._vocabulary_text = text
+            self._vocabulary_starts = list(accumulate((len(word) + 1 for word in vocabulary), initial=0))
+            self._vocabulary = vocabulary
+        return self._vocabulary
+
+    def _find_in_vocabulary(self, token: str) -> Tuple[int, ...]:
+        """Indexes of the vocabulary tokens containing `token`
+
+        Searches the newline-separated vocabulary text with str.find rather
+        than testing every token; a hit is mapped back to its token by
+        bisecting the token start offsets, and the search resumes at the next
+        token. Tokens never contain newlines, so no hit spans two of them.
+        """
+        self.vocabulary  # loads the text and the start offsets
+        text = self._vocabulary_text
+        starts = self._vocabulary_starts
+        matching = []
+        position = text.find(token)
+        while position >= 0:
+            index = bisect_right(starts, position) - 1
+            matching.append(index)
+            position = text.find(token, starts[index + 1])
+        return tuple(matching)
+
+    def is_stale(self) -> bool:
+        """Whether the log files changed since the index was built"""
+        try:
+            current = [_file_state(path) for path in _indexed_files(self.path)]
+        except FileNotFoundError:
+            return True
+        return current != self.meta["files"]
+
+    def raw(self, row: int) -> str:
+        """Read one line back from its log file"""
+        file_id = self.file_ids[row]
+        data = self._file_maps.get(file_id)
+        if data is None:
+            data = self._file_maps[file_id] = map_file(self.files[file_id])
+        start = self.line_starts[row]
+        return data[start:start + self.line_lengths[row]].decode("utf-8", "replace")
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              level: Optional[str] = None, keyword: Optional[str] = None) -> List[int]:
+        """Rows matching all the given filters, in log order
+
+        `start`/`end` bound the timestamp (epoch seconds, inclusive), `level`
+        must match exactly and `keyword` is a case-insensitive substring of
+        the raw line, like the in-memory filter_logs.
+        """
+        candidates: List[Sequence[int]] = []
+        unordered = None
+
+        level_code = None
+        if level:
+            if level not in self.levels:
+                return []
+            level_code = self.levels.index(level)
+            offsets = self.meta["level_offsets"]
+            candidates.append(self.level_postings[offsets[level_code]:offsets[level_code + 1]])
+
+        timed = start is not None or end is not None
+        if timed:
+            low = 0 if start is None else bisect_left(self.times, start)
+            high = len(self.times) if end is None else bisect_right(self.times, end)
+            if low >= high:
+                return []
+            unordered = self.time_rows[low:high]
+            candidates.append(unordered)
+
+        keyword = keyword.lower() if keyword else None
+        if keyword:
+            rows = self._keyword_candidates(keyword)
+            if rows is not None:
+                if not rows:
+                    return []
+                candidates.append(rows)
+
+        if not candidates:
+            base: Sequence[int] = range(self.rows)
+        else:
+            base = min(candidates, key=len)
+            if base is unordered:
+                base = sorted(base)
+
+        level_codes = self.level_codes
+        row_times = self.row_times
+        matched = []
+        for row in base:
+            if level_code is not None and level_codes[row] != level_code:
+                continue
+            if timed:
+                moment = row_times[row]
+                if moment != moment or (start is not None and moment < start) or (end is not None and moment > end):
+                    continue
+            if keyword and keyword not in self.raw(row).lower():
+                continue
+            matched.append(row)
+        return matched
+
+    def _keyword_candidates(self, keyword: str) -> Optional[Sequence[int]]:
+        """Rows that may contain `keyword`, from the most selective of its tokens
+
+        Every token of a substring is itself a substring of some token of the
+        line, so the postings of all vocabulary tokens containing it cover
+        every match. Returns None when the keyword has no indexable token.
+        """
+        offsets = self.token_offsets
+        postings = self.token_postings
+        best: Optional[Sequence[int]] = None
+
+        for token in set(TOKEN_PATTERN.findall(keyword)):
+            if not _indexable(token):
+                continue
+            matching = self._vocabulary_matching(token)
+            if len(matching) == 1:
+                rows: Sequence[int] = postings[offsets[matching[0]]:offsets[matching[0] + 1]]
+            else:
+                merged = set()
+                for index in matching:
+                    merged.update(postings[offsets[index]:offsets[index + 1]])
+                rows = sorted(merged)
+            if best is None or len(rows) < len(best):
+                best = rows
+            if not best:
+                break
+        return best
+
+    def entries(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """Materialize rows in the parse_logs entry format"""
+        formats = self.formats
+        file_ids = self.file_ids
+        return [formats[file_ids[row]].parse_entry(self.raw(row)) for row in rows]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "files": len(self.files),
+            "formats": sorted(set(log_format.name for log_format in self.formats)),
+            "total_lines": self.rows,
+            "levels": list(self.levels),
+            "timestamped_lines": len(self.times),
+            "indexed_tokens": self.meta["tokens"],
+            "built_at": self.meta["built_at"]
+        }
+
+    def close(self):
+        """Unmap the index columns and the log files"""
+        for column in _COLUMNS:
+            view = getattr(self, column)
+            if isinstance(view, memoryview):
+                # Views over a map keep it from closing
+                view.release()
+        for data in list(self._file_maps.values()) + self._maps:
+            if not isinstance(data, bytes):
+                data.close()
+        self._file_maps = {}
+        self._maps = []
+        self._vocabulary_matching.cache_clear()
+
+
+# Open indexes of this process, keyed by directory and validated against the
+# modification time of their meta file so rebuilds by other processes are seen
+_open_indexes: Dict[str, Tuple[int, LogIndex]] = {}
+_open_lock = threading.Lock()
+
+# Serializes index builds within a process (the registry itself is pickled
+# into worker processes, so it cannot hold the lock)
+_build_lock = threading.Lock()
+
+
+def open_log_index(directory: str) -> LogIndex:
+    """Open (or reuse) the index stored in `directory`, acquired for the caller
+
+    Use the returned index as a context manager (or call `release`) when
+    done with it. An index replaced by a rebuild is retired here, so its maps
+    are closed once the queries still using it finish.
+    """
+    version = os.stat(os.path.join(directory, "meta.json")).st_mtime_ns
+    with _open_lock:
+        cached = _open_indexes.get(directory)
+        if cached is None or cached[0] != version:
+            index = LogIndex(directory)
+            _open_indexes[directory] = (version, index)
+            if cached is not None:
+                cached[1].retire()
+        else:
+            index = cached[1]
+        index.acquire()
+        return index
+
+
+class LogSourceRegistry:
+    """Named log sources with their persistent indexes
+
+    Indexes live in one directory per source under `index_dir`, so sources
+    registered once are picked up again after a restart and by worker
+    processes, which map the same files instead of receiving the logs.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.index_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.index_dir)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.index_dir, name, "meta.json"))
+        )
+
+    def register(self, name: str, path: str) -> LogIndex:
+        """Index a log file or directory under `name`, replacing any previous source of that name
+
+        Like `get`, returns the index acquired for the caller.
+        """
+        if not SOURCE_NAME_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid log source name: {name}")
+        with _build_lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            return build_log_index(name, path, self.index_dir)
+
+    def get(self, name: str) -> LogIndex:
+        """Index of a registered source, rebuilt first if its files changed
+
+        The index is acquired for the caller: use it as a context manager.
+        """
+        if not SOURCE_NAME_PATTERN.fullmatch(name) or name not in self.names():
+            raise KeyError(f"Unknown log source: {name}")
+        directory = os.path.join(self.index_dir, name)
+        try:
+            index = open_log_index(directory)
+        except ValueError:
+            # Written by an older version of the index format: rebuild it
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as handle:
+                return self.register(name, json.load(handle)["path"])
+        if index.is_stale():
+            index.release()
+            index = self.register(name, index.path)
+        return index
@@ -0,0 +1,127 @@
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+import base64
+import binascii
+import json
+from .log_batch import ParsedLogBatch
+
+
+# Fields of a log entry, in the parse_logs entry format
+ENTRY_FIELDS = ("timestamp", "level", "message", "raw")
+
+# Extra field of the entries returned by find_errors
+MATCHED_PATTERN_FIELD = "matched_pattern"
+
+
+def encode_cursor(row: int) -> str:
+    """Opaque cursor pointing at the log row a page starts from"""
+    encoded = json.dumps({"row": row}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(encoded).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Row a cursor from encode_cursor points at; raises ValueError for invalid cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row = json.loads(base64.urlsafe_b64decode(padded.encode()))["row"]
+    except (AttributeError, TypeError, KeyError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if isinstance(row, bool) or not isinstance(row, int) or row < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return row
+
+
+def parse_fields(fields: Any, allowed: Sequence[str] = ENTRY_FIELDS) -> Optional[Tuple[str, ...]]:
+    """Requested entry fields (None for all); raises ValueError for unknown fields"""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    if not isinstance(fields, list) or not fields:
+        raise ValueError("fields must be a non-empty list of field names")
+    for field in fields:
+        if field not in allowed:
+            raise ValueError(f"Unknown field: {field!r} (expected one of {', '.join(allowed)})")
+    return tuple(fields)
+
+
+def project(entry: Dict[str, Any], fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Only the requested fields of an entry"""
+    if fields is None:
+        return entry
+    return {field: entry[field] for field in fields if field in entry}
+
+
+class LogEntryPage:
+    """Counts the matching rows of a log and materializes one page of them
+
+    Rows arrive batch by batch with the rows of each batch that match the
+    task. All of them are counted, but only the rows from `start_row` on
+    (a global row number across batches, as held by a cursor) and at most
+    `limit` of them are turned into entries, with only the requested
+    `fields`. The row of the first match left out becomes the next cursor.
+    """
+
+    def __init__(self, start_row: int = 0, limit: Optional[int] = None,
+                 fields: Optional[Tuple[str, ...]] = None):
+        self.start_row = start_row
+        self.limit = limit
+        self.fields = fields
+        self.lines = 0
+        self.matched = 0
+        self.returned = 0
+        self.next_row: Optional[int] = None
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None
+
+    def add(self, batch: ParsedLogBatch, rows: Sequence[int],
+            matched_patterns: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Account for a batch's matching rows (in row order); returns the page's entries among them
+
+        The entries are materialized lazily, so a caller streaming them out
+        never holds more than one.
+        """
+        base = self.lines
+        self.lines += len(batch)
+        self.matched += len(rows)
+
+        first = bisect_left(rows, self.start_row - base) if self.start_row > base else 0
+        taken = len(rows) - first
+        if self.limit is not None:
+            taken = max(0, min(taken, self.limit - self.returned))
+        if self.next_row is None and first + taken < len(rows):
+            self.next_row = base + rows[first + taken]
+        self.returned += taken
+        return self._entries(batch, rows, matched_patterns, first, first + taken)
+
+    def _entries(self, batch: ParsedLogBatch, rows: Sequence[int], matched_patterns: Optional[Sequence[str]],
+                 first: int, last: int) -> Iterator[Dict[str, Any]]:
+        fields = self.fields
+        row_fields = None if fields is None else tuple(field for field in fields if field in ENTRY_FIELDS)
+        with_pattern = matched_patterns is not None and (fields is None or MATCHED_PATTERN_FIELD in fields)
+        for position in range(first, last):
+            entry = batch.to_dict(rows[position], row_fields)
+            if with_pattern:
+                entry[MATCHED_PATTERN_FIELD] = matched_patterns[position]
+            yield entry
+
+    def add_entries(self, rows: Sequence[int], entries) -> List[Dict[str, Any]]:
+        """Page of rows already known by global row number (e.g. from an index)
+
+        `entries` materializes a list of rows; only the page's rows are passed.
+        """
+        self.matched += len(rows)
+        first = bisect_left(rows, self.start_row)
+        last = len(rows) if self.limit is None else min(len(rows), first + self.limit)
+        if last < len(rows):
+            self.next_row = rows[last]
+        self.returned += last - first
+        return [project(entry, self.fields) for entry in entries(rows[first:last])]
+
+    def annotate(self, result: Dict[str, Any]):
+        """Add the paging fields to a paginated result"""
+        if self.paginated:
+            result["truncated"] = self.next_row is not None
+            result["next_cursor"] = None if self.next_row is None else encode_cursor(self.next_row)
@@ -0,0 +1,90 @@
+from typing import AsyncIterable, AsyncIterator, Optional
+import codecs
+import zlib
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+async def iter_log_lines(
+    chunks: AsyncIterable[bytes],
+    compressed: Optional[bool] = None,
+    encoding: str = "utf-8",
+    max_line_length: int = MAX_LINE_LENGTH
+) -> AsyncIterator[str]:
+    """Turn a stream of raw byte chunks into decoded log lines
+
+    Gzip input is detected from the magic bytes unless `compressed` is given,
+    and concatenated gzip members (e.g. rotated files joined together) are
+    decompressed back to back; bytes after a member that do not start
+    another one are ignored, like gzip does with trailing garbage. Input
+    that is not gzip raises zlib.error, and a truncated member EOFError.
+    Blank lines are skipped. Only the current
+    partial line is buffered, and a line longer than `max_line_length` is
+    emitted in pieces, so memory stays bounded regardless of the input size.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    decompressor = None
+    # Start of what follows an ended member, too short yet to tell if it is a gzip header
+    member_start = b""
+    trailing_garbage = False
+    pending = ""
+    first_chunk = True
+    # Leading bytes held back until there are enough to recognize the gzip magic
+    head = b""
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+
+        if first_chunk:
+            if compressed is None and len(head) + len(chunk) < len(GZIP_MAGIC):
+                head += chunk
+                continue
+            chunk, head = head + chunk, b""
+            first_chunk = False
+            if compressed is None:
+                compressed = chunk[:2] == GZIP_MAGIC
+            if compressed:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if decompressor is not None:
+            data = b""
+            while chunk and not trailing_garbage:
+                if decompressor.eof:
+                    # The previous member ended: a new one starts here, or trailing bytes
+                    chunk, member_start = member_start + chunk, b""
+                    if len(chunk) < len(GZIP_MAGIC) and GZIP_MAGIC.startswith(chunk):
+                        member_start = chunk
+                        break
+                    if not chunk.startswith(GZIP_MAGIC):
+                        trailing_garbage = True
+                        break
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data += decompressor.decompress(chunk)
+                chunk = decompressor.unused_data
+            chunk = data
+
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if line:
+                yield line
+
+        while len(pending) > max_line_length:
+            yield pending[:max_line_length]
+            pending = pending[max_line_length:]
+
+    if head:
+        # Too short to be gzip
+        pending += decoder.decode(head)
+    if decompressor is not None and not decompressor.eof:
+        raise EOFError("Compressed stream ended before the end-of-stream marker was reached")
+    pending += decoder.decode(b"", final=True)
+    for line in pending.split("\n"):
+        line = line.rstrip("\r")
+        if line:
+            yield line
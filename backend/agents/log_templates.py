@@ -0,0 +1,176 @@
+from typing import Dict, Any, List, Optional, Tuple
+import heapq
+import re
+
+
+WILDCARD = "<*>"
+
+# Obvious variables, masked before a message is tokenized. Order matters:
+# UUIDs and IPs contain hex and numbers, so they go first.
+_MASKS = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0[xX][0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"), "<HEX>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<NUM>"),
+]
+
+
+def mask_variables(message: str) -> str:
+    """Replace UUIDs, IP addresses, hex ids and numbers with placeholders"""
+    for pattern, placeholder in _MASKS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+class LogCluster:
+    """One template and the number of messages it has absorbed"""
+
+    __slots__ = ("tokens", "count", "exemplar", "leaf", "path")
+
+    def __init__(self, tokens: List[str], exemplar: str, leaf: list, path: Tuple[Any, ...]):
+        self.tokens = tokens
+        self.count = 1
+        self.exemplar = exemplar
+        self.leaf = leaf
+        # Branch keys leading to its leaf, to rebuild the tree after pruning
+        self.path = path
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+class LogTemplateMiner:
+    """Online log template miner in the style of Drain
+
+    Messages are masked, split into tokens and routed through a fixed-depth
+    prefix tree: first by token count, then by their first `depth - 2` tokens
+    (beyond `max_children` branches per node, or once the tree holds
+    `max_nodes` nodes, through a shared wildcard branch). Only the few
+    clusters in the reached leaf are compared with the message; the most
+    similar one absorbs it if at least `similarity` of the tokens agree,
+    turning the positions that differ into wildcards, otherwise the message
+    starts a new cluster. Each message costs a constant amount of work, and
+    the number of clusters is capped at `max_clusters` by dropping the least
+    frequent half whenever the cap is exceeded; the tree is then rebuilt
+    from the clusters kept, so branches of dropped ones are freed.
+    """
+
+    def __init__(self, depth: int = 4, similarity: float = 0.4,
+                 max_children: int = 100, max_clusters: int = 1000, max_nodes: int = 10000):
+        self.prefix_depth = max(depth - 2, 1)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_nodes = max_nodes
+        self.root: Dict[int, Dict[str, Any]] = {}
+        self.nodes = 0
+        self.clusters: List[LogCluster] = []
+        self.total = 0
+        # Masked messages seen before and the cluster that absorbed them: a
+        # repeat is already covered by its template, so it skips the tree
+        self._seen: Dict[str, LogCluster] = {}
+
+    def add(self, message: str) -> LogCluster:
+        """Assign a message to a template, creating one if nothing is similar enough"""
+        self.total += 1
+        masked = mask_variables(message)
+        cluster = self._seen.get(masked)
+        if cluster is not None:
+            cluster.count += 1
+            return cluster
+
+        tokens = masked.split()
+        path = self._path(tokens)
+        leaf = self._leaf(path)
+
+        cluster = self._best_match(leaf, tokens)
+        if cluster is not None:
+            cluster.count += 1
+            template = cluster.tokens
+            for position, token in enumerate(tokens):
+                if template[position] != token and template[position] != WILDCARD:
+                    template[position] = WILDCARD
+        else:
+            cluster = LogCluster(tokens, message, leaf, path)
+            leaf.append(cluster)
+            self.clusters.append(cluster)
+            if len(self.clusters) > self.max_clusters:
+                self._prune()
+
+        if len(self._seen) >= self.max_clusters * 10:
+            self._seen.clear()
+        self._seen[masked] = cluster
+        return cluster
+
+    def _path(self, tokens: List[str]) -> Tuple[Any, ...]:
+        """Branch keys of the message through the prefix tree: its token count, then prefix tokens"""
+        path: List[Any] = [len(tokens)]
+        node = self.root.get(len(tokens))
+        # Numbers are masked already, so the tokens are digit-free and can be
+        # used as branch keys directly
+        for token in tokens[:self.prefix_depth]:
+            child = node.get(token) if node is not None else None
+            if child is None and node is not None and (
+                len(node) >= self.max_children or self.nodes >= self.max_nodes
+            ):
+                token = WILDCARD
+                child = node.get(token)
+            path.append(token)
+            node = child
+        return tuple(path)
+
+    def _leaf(self, path: Tuple[Any, ...]) -> list:
+        """Cluster list at the end of a path through the prefix tree, creating missing nodes"""
+        node = self.root
+        for key in path:
+            child = node.get(key)
+            if child is None:
+                child = node[key] = {}
+                self.nodes += 1
+            node = child
+
+        leaf = node.get(None)
+        if leaf is None:
+            leaf = node[None] = []
+        return leaf
+
+    def _best_match(self, leaf: List[LogCluster], tokens: List[str]) -> Optional[LogCluster]:
+        if not tokens:
+            return leaf[0] if leaf else None
+
+        best = None
+        best_score = (-1.0, -1)
+        for cluster in leaf:
+            same = wildcards = 0
+            for template_token, token in zip(cluster.tokens, tokens):
+                if template_token == WILDCARD:
+                    wildcards += 1
+                elif template_token == token:
+                    same += 1
+            score = (same / len(tokens), wildcards)
+            if score > best_score:
+                best, best_score = cluster, score
+
+        if best is not None and best_score[0] >= self.similarity:
+            return best
+        return None
+
+    def _prune(self):
+        """Drop the least frequent half of the clusters"""
+        keep = heapq.nlargest(self.max_clusters // 2, self.clusters, key=lambda cluster: cluster.count)
+        self.root = {}
+        self.nodes = 0
+        for cluster in keep:
+            cluster.leaf = self._leaf(cluster.path)
+            cluster.leaf.append(cluster)
+        self.clusters = keep
+        self._seen.clear()
+
+    def templates(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Templates by descending count, each with its count and first exemplar"""
+        ranked = sorted(self.clusters, key=lambda cluster: cluster.count, reverse=True)
+        return [
+            {"template": cluster.template, "count": cluster.count, "exemplar": cluster.exemplar}
+            for cluster in ranked[:limit]
+        ]
@@ -1,19 +1,79 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Generator, Iterable, Iterator, List, Optional, Tuple, Union
+import asyncio
+import codecs
+import json
 import re
+import threading
+import time
+import zlib
 from datetime import datetime
-from collections import Counter
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, task_handler
+from .error_matcher import ErrorMatcher
+from .log_analysis import ErrorAccumulator, LogHistogramAccumulator, LogSummaryAccumulator, PatternAccumulator
+from .log_batch import ParsedLogBatch
+from .log_formats import BRACKET_FORMAT, LogFormat, get_log_format
+from .log_files import ensure_allowed, iter_file_text, resolve_log_files
+from .log_index import LogSourceRegistry
+from .log_pages import ENTRY_FIELDS, MATCHED_PATTERN_FIELD, LogEntryPage, decode_cursor, parse_fields
+from .timestamps import parse_time_range
+from . import settings
+
+# Serializes error pattern registrations, which replays of other server
+# workers' registrations make from a worker thread (module level, as agents
+# are pickled into worker processes)
+_patterns_lock = threading.Lock()
+
+
+LOG_ANALYSES = ("summary", "patterns", "errors")
+
+# Interval names accepted by log_histogram, in seconds
+HISTOGRAM_INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "1d": 86400}
+STREAM_BATCH_SIZE = 10000
+
+# Tasks returning log entries: the method producing them and the result key holding them
+ENTRY_TASKS = {
+    "parse_logs": ("_parsed_entries", "parsed_logs"),
+    "find_errors": ("_error_entries", "errors"),
+    "filter_logs": ("_filtered_entries", "filtered_logs"),
+}
+
+ERROR_ENTRY_FIELDS = ENTRY_FIELDS + (MATCHED_PATTERN_FIELD,)
+
+# Yields the entries of each batch, then returns the rest of the task result
+EntryProducer = Generator[Iterable[Dict[str, Any]], None, Dict[str, Any]]
+
+# Failures reading server-side log files (missing or forbidden paths, corrupt
+# gzip data, unknown encodings) that are reported as task errors
+LOG_READ_ERRORS = (OSError, EOFError, zlib.error, LookupError)
 
 
 class LogsAgent(BaseAgent):
     """Agent specialized in parsing and analyzing logs"""
 
+    agent_type = "logs"
+
+    cpu_bound_tasks = frozenset({
+        "parse_logs",
+        "find_errors",
+        "analyze_patterns",
+        "filter_logs",
+        "summarize_logs",
+        "analyze_logs",
+        "log_histogram"
+    })
+
+    # Registered error patterns live in memory; log sources are shared on disk
+    replicated_tasks = frozenset({"register_error_patterns"})
+
+    # Task types whose entries can be streamed out with stream_entries
+    streamable_tasks = frozenset(ENTRY_TASKS)
+
     def __init__(self):
         super().__init__(
             name="Logs Agent",
             description="Specializes in parsing logs, finding errors, pattern matching, and troubleshooting"
         )
-        self.error_patterns = [
+        self.error_matcher = ErrorMatcher([
             r"ERROR",
             r"FATAL",
             r"CRITICAL",
@@ -21,186 +81,450 @@ class LogsAgent(BaseAgent):
             r"failed",
             r"timeout",
             r"refused"
-        ]
+        ])
+        self.log_sources = LogSourceRegistry(settings.LOG_INDEX_DIR)
+
+    @property
+    def error_patterns(self) -> List[str]:
+        """Error patterns currently known to the matcher"""
+        return self.error_matcher.patterns
+
+    def register_error_patterns(self, patterns: List[str]):
+        """Register custom error patterns
+
+        The matcher is replaced rather than changed in place, so scans
+        already running keep a consistent one.
+        """
+        with _patterns_lock:
+            self.error_matcher = self.error_matcher.with_patterns(patterns)
+
+    def replicated_state(self) -> Dict[str, Any]:
+        return {"error_patterns": self.error_patterns}
+
+    def restore_replicated_state(self, state: Dict[str, Any]):
+        self.register_error_patterns(state.get("error_patterns", []))
+
+    def _log_batches(self, data: Dict[str, Any]) -> Iterable[ParsedLogBatch]:
+        """Batches of the logs a task refers to: inline `logs`, or the server-side files at `path`
+
+        Files are read chunk by chunk, so a task over a multi-GB log holds one
+        chunk at a time. The log format is taken from `format` or detected.
+        Raises OSError when the path is missing or not allowed, and
+        LookupError for unknown formats or encodings.
+        """
+        log_format = get_log_format(data["format"]) if data.get("format") else None
+
+        path = data.get("path")
+        if not path:
+            return [ParsedLogBatch.from_lines(data.get("logs", []), log_format)]
+
+        ensure_allowed(path, settings.LOG_SOURCE_ROOTS)
+        files = resolve_log_files(path)
+        for file_path in files:
+            # A glob or directory may reach elsewhere through symlinks
+            ensure_allowed(file_path, settings.LOG_SOURCE_ROOTS)
+
+        encoding = data.get("encoding", "utf-8")
+        codecs.lookup(encoding)
+
+        def batches() -> Iterator[ParsedLogBatch]:
+            for file_path in files:
+                # Detect each file's format on its first chunk and keep it
+                file_format = log_format
+                for text in iter_file_text(file_path, settings.LOG_FILE_CHUNK_BYTES, encoding):
+                    batch = ParsedLogBatch.from_text(text, file_format)
+                    file_format = batch.log_format
+                    yield batch
+
+        return batches()
+
+    def _entry_page(self, data: Dict[str, Any], allowed_fields: Tuple[str, ...] = ENTRY_FIELDS) -> LogEntryPage:
+        """Paging and projection requested by a task returning log entries; raises ValueError
+
+        Results over server-side files are always paged (`limit` defaults to
+        LOG_QUERY_LIMIT); inline logs are paged once a `limit` or `cursor` is given.
+        """
+        cursor = data.get("cursor")
+        limit = data.get("limit")
+        if limit is None and (data.get("path") or data.get("source") or cursor):
+            limit = settings.LOG_QUERY_LIMIT
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+            raise ValueError("limit must be a positive integer")
+        return LogEntryPage(
+            start_row=decode_cursor(cursor) if cursor else 0,
+            limit=limit,
+            fields=parse_fields(data.get("fields"), allowed_fields)
+        )
 
-    async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Process log-related tasks"""
-        task_type = task.get("type", "")
-        data = task.get("data", {})
+    def _parsed_entries(self, data: Dict[str, Any], page: LogEntryPage) -> EntryProducer:
+        """Entries of parse_logs, batch by batch; returns the rest of the result"""
+        formats: List[str] = []
+        for batch in self._log_batches(data):
+            if batch.log_format.name not in formats:
+                formats.append(batch.log_format.name)
+            yield page.add(batch, range(len(batch)))
 
-        result = {}
-
-        if task_type == "parse_logs":
-            result = await self._parse_logs(data)
-        elif task_type == "find_errors":
-            result = await self._find_errors(data)
-        elif task_type == "analyze_patterns":
-            result = await self._analyze_patterns(data)
-        elif task_type == "filter_logs":
-            result = await self._filter_logs(data)
-        elif task_type == "summarize_logs":
-            result = await self._summarize_logs(data)
-        else:
-            result = {
-                "status": "error",
-                "message": f"Unknown task type: {task_type}"
-            }
+        return {
+            "status": "success",
+            "total_entries": page.lines,
+            "formats": formats
+        }
 
-        self.log_task(task, result)
-        return result
+    def _error_entries(self, data: Dict[str, Any], page: LogEntryPage) -> EntryProducer:
+        """Entries of find_errors, batch by batch; returns the rest of the result"""
+        for batch in self._log_batches(data):
+            hits = batch.error_hits(self.error_matcher)
+            yield page.add(batch, [row for row, _ in hits], [pattern for _, pattern in hits])
 
-    async def _parse_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse log entries into structured format"""
-        log_lines = data.get("logs", [])
+        return {
+            "status": "success",
+            "total_errors": page.matched,
+            "error_rate": page.matched / page.lines * 100 if page.lines else 0
+        }
+
+    def _filtered_entries(self, data: Dict[str, Any], page: LogEntryPage) -> EntryProducer:
+        """Entries of filter_logs, batch by batch; returns the rest of the result"""
+        filters = data.get("filters", {})
+
+        level_filter = filters.get("level")
+        keyword_filter = filters.get("keyword")
+
+        try:
+            start, end = parse_time_range(filters.get("time_range"))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        if data.get("source"):
+            return (yield from self._filter_source(data, page, start, end, level_filter, keyword_filter))
+
+        for batch in self._log_batches(data):
+            rows = None
+
+            # Apply level filter
+            if level_filter:
+                rows = batch.rows_with_level(level_filter)
 
-        parsed_logs = []
-        for line in log_lines:
-            parsed_entry = self._parse_log_line(line)
-            parsed_logs.append(parsed_entry)
+            # Apply keyword filter
+            if keyword_filter:
+                rows = batch.rows_containing(keyword_filter, rows)
+
+            # Apply time range filter
+            if start is not None or end is not None:
+                rows = batch.rows_in_time_range(start, end, rows)
+
+            # Only the rows that are returned are decoded into entries
+            yield page.add(batch, range(len(batch)) if rows is None else rows)
 
         return {
             "status": "success",
-            "total_entries": len(parsed_logs),
-            "parsed_logs": parsed_logs
+            "filtered_count": page.matched,
+            "original_count": page.lines
         }
 
-    def _parse_log_line(self, line: str) -> Dict[str, Any]:
-        """Parse a single log line"""
-        # Common log pattern: [TIMESTAMP] LEVEL: MESSAGE
-        pattern = r"\[([^\]]+)\]\s+(\w+):\s+(.*)"
-        match = re.match(pattern, line)
-
-        if match:
-            return {
-                "timestamp": match.group(1),
-                "level": match.group(2),
-                "message": match.group(3),
-                "raw": line
-            }
-        else:
-            return {
-                "timestamp": None,
-                "level": "UNKNOWN",
-                "message": line,
-                "raw": line
-            }
+    def _filter_source(self, data: Dict[str, Any], page: LogEntryPage, start: Optional[float],
+                       end: Optional[float], level_filter: Optional[str],
+                       keyword_filter: Optional[str]) -> EntryProducer:
+        """Filter a registered log source through its index"""
+        source = data["source"]
 
-    async def _find_errors(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Find error entries in logs"""
-        log_lines = data.get("logs", [])
+        try:
+            index = self.log_sources.get(source)
+        except KeyError as e:
+            return {"status": "error", "message": e.args[0]}
 
-        errors = []
-        for line in log_lines:
-            for pattern in self.error_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    parsed = self._parse_log_line(line)
-                    errors.append(parsed)
-                    break
+        with index:
+            rows = index.query(start=start, end=end, level=level_filter, keyword=keyword_filter)
+            yield page.add_entries(rows, index.entries)
 
         return {
             "status": "success",
-            "total_errors": len(errors),
-            "errors": errors,
-            "error_rate": len(errors) / len(log_lines) * 100 if log_lines else 0
+            "source": source,
+            "filtered_count": len(rows),
+            "original_count": index.rows
         }
 
-    async def _analyze_patterns(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze patterns in log data"""
-        log_lines = data.get("logs", [])
+    def _entry_producer(self, task_type: str, data: Dict[str, Any]) -> Tuple[LogEntryPage, EntryProducer]:
+        """Page and entry producer of a task returning log entries; raises ValueError"""
+        producer, _ = ENTRY_TASKS[task_type]
+        page = self._entry_page(data, ERROR_ENTRY_FIELDS if task_type == "find_errors" else ENTRY_FIELDS)
+        return page, getattr(self, producer)(data, page)
+
+    def _collect_entries(self, task_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task returning log entries and put its page of entries in the result"""
+        try:
+            page, producer = self._entry_producer(task_type, data)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        entries: List[Dict[str, Any]] = []
+        try:
+            while True:
+                entries.extend(next(producer))
+        except StopIteration as stop:
+            result = stop.value
+        except (LOG_READ_ERRORS + (ValueError,)) as e:
+            return {"status": "error", "message": str(e)}
+
+        if result.get("status") == "success":
+            result[ENTRY_TASKS[task_type][1]] = entries
+            page.annotate(result)
+        return result
 
-        # Count log levels
-        levels = []
-        messages = []
+    def stream_entries(self, task: Dict[str, Any]) -> Union[Dict[str, Any], Iterator[str]]:
+        """NDJSON lines of a task returning log entries, or an error result
 
-        for line in log_lines:
-            parsed = self._parse_log_line(line)
-            levels.append(parsed.get("level", "UNKNOWN"))
-            messages.append(parsed.get("message", ""))
+        One line per entry as it is produced, then a last line with the rest
+        of the result (counts, paging fields and status). Files are read and
+        entries encoded batch by batch, so the first lines go out before the
+        whole log is read and memory stays bounded. Errors found before the
+        first entry (bad options, missing files) are returned as a result
+        instead; later ones end the stream with an error line.
+        """
+        task_type = task.get("type", "")
+        data = task.get("data", {})
+        started = time.perf_counter()
+        try:
+            page, producer = self._entry_producer(task_type, data)
+            first = next(producer)
+        except StopIteration as stop:
+            # Nothing to stream: a result without entries
+            result = stop.value
+            if result.get("status") == "success":
+                result[ENTRY_TASKS[task_type][1]] = []
+                page.annotate(result)
+            self.log_task(task, result, (time.perf_counter() - started) * 1000, streamed=True)
+            return result
+        except (LOG_READ_ERRORS + (ValueError,)) as e:
+            result = {"status": "error", "message": str(e)}
+            self.log_task(task, result, (time.perf_counter() - started) * 1000, streamed=True)
+            return result
+
+        def lines() -> Iterator[str]:
+            entries = first
+            try:
+                while True:
+                    for entry in entries:
+                        yield json.dumps(entry) + "\n"
+                    entries = next(producer)
+            except StopIteration as stop:
+                result = stop.value
+                if result.get("status") == "success":
+                    page.annotate(result)
+            except (LOG_READ_ERRORS + (ValueError,)) as e:
+                result = {"status": "error", "message": str(e)}
+            self.log_task(task, result, (time.perf_counter() - started) * 1000, streamed=True)
+            yield json.dumps(result) + "\n"
+
+        return lines()
+
+    @task_handler("parse_logs")
+    async def _parse_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse log entries into structured format"""
+        return self._collect_entries("parse_logs", data)
 
-        level_distribution = dict(Counter(levels))
+    def _parse_log_line(self, line: str, log_format: LogFormat = BRACKET_FORMAT) -> Dict[str, Any]:
+        """Parse a single log line"""
+        return log_format.parse_entry(line)
 
-        # Find common keywords in messages
-        all_words = " ".join(messages).lower().split()
-        common_words = Counter(all_words).most_common(10)
+    @task_handler("find_errors")
+    async def _find_errors(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Find error entries in logs"""
+        return self._collect_entries("find_errors", data)
 
-        # Detect repeated messages
-        message_counts = Counter(messages)
-        repeated_messages = [
-            {"message": msg, "count": count}
-            for msg, count in message_counts.items() if count > 1
-        ]
+    @task_handler("analyze_patterns")
+    async def _analyze_patterns(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze patterns in log data"""
+        accumulator = PatternAccumulator()
 
-        return {
-            "status": "success",
-            "level_distribution": level_distribution,
-            "common_keywords": [{"word": word, "count": count} for word, count in common_words],
-            "repeated_messages": repeated_messages[:5],
-            "total_analyzed": len(log_lines)
-        }
+        try:
+            for batch in self._log_batches(data):
+                accumulator.add_batch(batch)
+        except LOG_READ_ERRORS as e:
+            return {"status": "error", "message": str(e)}
+
+        return accumulator.result()
 
+    @task_handler("filter_logs")
     async def _filter_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Filter logs based on criteria"""
-        log_lines = data.get("logs", [])
-        filters = data.get("filters", {})
-
-        level_filter = filters.get("level")
-        keyword_filter = filters.get("keyword")
-        time_range = filters.get("time_range")
+        return self._collect_entries("filter_logs", data)
 
-        filtered_logs = []
+    @task_handler("summarize_logs")
+    async def _summarize_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate a summary of log data"""
+        accumulator = LogSummaryAccumulator()
 
-        for line in log_lines:
-            parsed = self._parse_log_line(line)
+        try:
+            for batch in self._log_batches(data):
+                accumulator.add_batch(batch, len(batch.error_hits(self.error_matcher)))
+        except LOG_READ_ERRORS as e:
+            return {"status": "error", "message": str(e)}
 
-            # Apply level filter
-            if level_filter and parsed.get("level") != level_filter:
-                continue
+        if not accumulator.total_entries:
+            return {"status": "error", "message": "No logs provided"}
 
-            # Apply keyword filter
-            if keyword_filter and keyword_filter.lower() not in line.lower():
-                continue
+        return accumulator.result()
+
+    @task_handler("summarize_stream")
+    async def _summarize_stream(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize logs arriving as an async stream of lines, in constant memory"""
+        stream = data.get("stream")
+
+        if stream is None:
+            return {"status": "error", "message": "No log stream provided"}
+
+        try:
+            log_format = get_log_format(data["format"]) if data.get("format") else None
+        except LookupError as e:
+            return {"status": "error", "message": str(e)}
+
+        accumulator = LogSummaryAccumulator(track_keywords=True)
+
+        def add_lines(lines: List[str]):
+            nonlocal log_format
+            batch = ParsedLogBatch.from_lines(lines, log_format)
+            log_format = batch.log_format
+            accumulator.add_batch(batch, len(batch.error_hits(self.error_matcher)))
+
+        # Streams cannot leave the process, so each batch is analyzed on a
+        # worker thread to keep the event loop free between chunks
+        pending: List[str] = []
+        try:
+            async for line in stream:
+                pending.append(line)
+                if len(pending) >= STREAM_BATCH_SIZE:
+                    await asyncio.to_thread(add_lines, pending)
+                    pending = []
+        except LOG_READ_ERRORS as e:
+            return {"status": "error", "message": f"Could not read the log stream: {e}"}
+
+        if pending:
+            await asyncio.to_thread(add_lines, pending)
+
+        if not accumulator.total_entries:
+            return {"status": "error", "message": "No logs provided"}
 
-            filtered_logs.append(parsed)
+        return accumulator.result()
+
+    @task_handler("analyze_logs")
+    async def _analyze_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run several analyses over the logs in a single parsing pass
+
+        The errors section is paged like find_errors: `limit`, `cursor` and
+        `fields` apply to its entries.
+        """
+        analyses = data.get("analyses", list(LOG_ANALYSES))
+        if not isinstance(analyses, list):
+            return {"status": "error", "message": "analyses must be a list of analysis names"}
+
+        unknown = [str(name) for name in analyses if not isinstance(name, str) or name not in LOG_ANALYSES]
+        if unknown:
+            return {"status": "error", "message": f"Unknown analyses: {', '.join(unknown)}"}
+
+        try:
+            error_page = self._entry_page(data, ERROR_ENTRY_FIELDS) if "errors" in analyses else None
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        summary = LogSummaryAccumulator() if "summary" in analyses else None
+        patterns = PatternAccumulator() if "patterns" in analyses else None
+        errors = ErrorAccumulator(error_page) if error_page is not None else None
+        total_entries = 0
+
+        try:
+            for batch in self._log_batches(data):
+                total_entries += len(batch)
+                error_hits = batch.error_hits(self.error_matcher) if summary or errors else []
+                if summary is not None:
+                    summary.add_batch(batch, len(error_hits))
+                if patterns is not None:
+                    patterns.add_batch(batch)
+                if errors is not None:
+                    errors.add_batch(batch, error_hits)
+        except LOG_READ_ERRORS as e:
+            return {"status": "error", "message": str(e)}
+
+        if not total_entries:
+            return {"status": "error", "message": "No logs provided"}
 
-        return {
+        result = {
             "status": "success",
-            "filtered_count": len(filtered_logs),
-            "original_count": len(log_lines),
-            "filtered_logs": filtered_logs
+            "total_entries": total_entries
         }
 
-    async def _summarize_logs(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a summary of log data"""
-        log_lines = data.get("logs", [])
+        if summary is not None:
+            result["summary"] = summary.result()
+
+        if patterns is not None:
+            result["patterns"] = patterns.result()
+
+        if errors is not None:
+            result["errors"] = errors.result()
+
+        return result
+
+    @task_handler("log_histogram")
+    async def _log_histogram(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Count entries per level and the error rate in fixed time intervals"""
+        interval = data.get("interval", "5m")
+
+        if interval not in HISTOGRAM_INTERVALS:
+            return {
+                "status": "error",
+                "message": f"Unknown interval: {interval} (known: {', '.join(HISTOGRAM_INTERVALS)})"
+            }
+
+        histogram = LogHistogramAccumulator(HISTOGRAM_INTERVALS[interval])
 
-        if not log_lines:
+        try:
+            for batch in self._log_batches(data):
+                histogram.add_batch(batch, batch.error_hits(self.error_matcher))
+        except LOG_READ_ERRORS as e:
+            return {"status": "error", "message": str(e)}
+
+        if not histogram.total_entries:
             return {"status": "error", "message": "No logs provided"}
 
-        # Parse all logs
-        parsed_logs = [self._parse_log_line(line) for line in log_lines]
+        result = histogram.result()
+        result["interval"] = interval
+        return result
 
-        # Count by level
-        levels = [log.get("level") for log in parsed_logs]
-        level_counts = dict(Counter(levels))
+    @task_handler("register_error_patterns")
+    async def _register_error_patterns(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Register custom error patterns with the matcher"""
+        patterns = data.get("patterns", [])
 
-        # Find errors
-        error_count = sum(1 for line in log_lines if any(
-            re.search(pattern, line, re.IGNORECASE) for pattern in self.error_patterns
-        ))
+        if not patterns:
+            return {"status": "error", "message": "No patterns provided"}
 
-        # Time range
-        timestamps = [log.get("timestamp") for log in parsed_logs if log.get("timestamp")]
+        try:
+            self.register_error_patterns(patterns)
+        except (re.error, ValueError) as e:
+            return {"status": "error", "message": f"Invalid error pattern: {e}"}
 
-        summary = {
+        return {
             "status": "success",
-            "total_entries": len(log_lines),
-            "level_breakdown": level_counts,
-            "error_count": error_count,
-            "error_percentage": round(error_count / len(log_lines) * 100, 2) if log_lines else 0,
-            "time_range": {
-                "start": timestamps[0] if timestamps else None,
-                "end": timestamps[-1] if timestamps else None
-            }
+            "error_patterns": list(self.error_patterns)
         }
 
-        return summary
+    @task_handler("register_log_source")
+    async def _register_log_source(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a server-side log file or directory and build its index"""
+        name = data.get("name")
+        path = data.get("path")
+
+        if not name or not path:
+            return {"status": "error", "message": "A source name and path are required"}
+
+        try:
+            ensure_allowed(path, settings.LOG_SOURCE_ROOTS)
+            # Indexing reads the whole source, so keep it off the event loop
+            index = await asyncio.to_thread(self.log_sources.register, name, path)
+        except (OSError, ValueError) as e:
+            return {"status": "error", "message": str(e)}
+
+        with index:
+            return {
+                "status": "success",
+                "source": index.describe()
+            }
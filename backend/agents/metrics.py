@@ -0,0 +1,221 @@
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+import threading
+
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INPUT_ITEMS_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+OTHER_TASK_TYPE = "other"
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative on export)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "count": self.count, "sum": self.sum, "max": self.max}
+
+    def merge_state(self, state: Dict[str, Any]):
+        """Add the observations of another histogram with the same buckets, given by to_state"""
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, state["counts"])]
+        self.count += state["count"]
+        self.sum += state["sum"]
+        self.max = max(self.max, state["max"])
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs, ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((_format_number(bound), running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket, capped at the largest observation"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        running = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and running + count >= rank:
+                return min(lower + (bound - lower) * (rank - running) / count, self.max)
+            running += count
+            lower = bound
+        return self.max
+
+
+class TaskTypeMetrics:
+    """Counters and histograms for one (agent, task type) pair"""
+
+    HISTOGRAMS = ("latency", "queue_wait", "input_items")
+
+    def __init__(self):
+        self.total = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS_SECONDS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS_SECONDS)
+        self.input_items = Histogram(INPUT_ITEMS_BUCKETS)
+
+    def to_state(self) -> Dict[str, Any]:
+        state = {"total": self.total, "errors": self.errors}
+        for name in self.HISTOGRAMS:
+            state[name] = getattr(self, name).to_state()
+        return state
+
+    def merge_state(self, state: Dict[str, Any]):
+        self.total += state["total"]
+        self.errors += state["errors"]
+        for name in self.HISTOGRAMS:
+            getattr(self, name).merge_state(state[name])
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 3) if seconds is not None else None
+
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "latency_ms": {
+                "avg": ms(self.latency.sum / self.latency.count) if self.latency.count else None,
+                "p50": ms(self.latency.quantile(0.5)),
+                "p95": ms(self.latency.quantile(0.95)),
+                "p99": ms(self.latency.quantile(0.99))
+            },
+            "queue_wait_ms": {
+                "avg": ms(self.queue_wait.sum / self.queue_wait.count) if self.queue_wait.count else None,
+                "p99": ms(self.queue_wait.quantile(0.99))
+            },
+            "input_items": {
+                "total": int(self.input_items.sum),
+                "avg": round(self.input_items.sum / self.input_items.count, 1) if self.input_items.count else None
+            }
+        }
+
+
+class MetricsRegistry:
+    """Per-agent, per-task-type latency, queue wait, input size and error metrics
+
+    Task types come from clients, so the number of series is capped: once
+    `max_series` is reached, new task types are counted under "other".
+    """
+
+    def __init__(self, max_series: int = 256):
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._tasks: Dict[Tuple[str, str], TaskTypeMetrics] = {}
+
+    def observe(self, agent: str, task_type: str, failed: bool,
+                duration_ms: Optional[float] = None, queue_wait_ms: Optional[float] = None,
+                input_items: int = 0):
+        """Record one finished task"""
+        with self._lock:
+            key = (agent, task_type)
+            metrics = self._tasks.get(key)
+            if metrics is None:
+                if len(self._tasks) >= self.max_series:
+                    key = (agent, OTHER_TASK_TYPE)
+                metrics = self._tasks.get(key)
+                if metrics is None:
+                    metrics = self._tasks[key] = TaskTypeMetrics()
+            metrics.total += 1
+            if failed:
+                metrics.errors += 1
+            if duration_ms is not None:
+                metrics.latency.observe(duration_ms / 1000)
+            if queue_wait_ms is not None:
+                metrics.queue_wait.observe(queue_wait_ms / 1000)
+            metrics.input_items.observe(input_items)
+
+    def snapshot(self) -> List[List[Any]]:
+        """JSON-serializable [agent, task type, state] entries, for merging elsewhere"""
+        with self._lock:
+            return [[agent, task_type, metrics.to_state()] for (agent, task_type), metrics in self._tasks.items()]
+
+    @classmethod
+    def merged(cls, snapshots: Iterable[List[List[Any]]]) -> "MetricsRegistry":
+        """Registry holding the sums of several snapshots, e.g. one per worker process"""
+        registry = cls()
+        for snapshot in snapshots:
+            for agent, task_type, state in snapshot:
+                metrics = registry._tasks.get((agent, task_type))
+                if metrics is None:
+                    metrics = registry._tasks[(agent, task_type)] = TaskTypeMetrics()
+                metrics.merge_state(state)
+        return registry
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON view grouped by agent and task type"""
+        with self._lock:
+            view: Dict[str, Dict[str, Any]] = {}
+            for (agent, task_type), metrics in sorted(self._tasks.items()):
+                view.setdefault(agent, {})[task_type] = metrics.to_dict()
+            return view
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self._tasks.items())
+
+            lines.append("# HELP agent_tasks_total Tasks processed by agent and task type")
+            lines.append("# TYPE agent_tasks_total counter")
+            for (agent, task_type), metrics in items:
+                lines.append(f"agent_tasks_total{_labels(agent, task_type)} {metrics.total}")
+
+            lines.append("# HELP agent_task_errors_total Tasks that returned an error or raised")
+            lines.append("# TYPE agent_task_errors_total counter")
+            for (agent, task_type), metrics in items:
+                lines.append(f"agent_task_errors_total{_labels(agent, task_type)} {metrics.errors}")
+
+            for name, attribute, help_text in (
+                ("agent_task_duration_seconds", "latency", "Task processing time"),
+                ("agent_task_queue_wait_seconds", "queue_wait", "Time spent waiting for a pool worker"),
+                ("agent_task_input_items", "input_items", "Input size in items (log lines, data points)"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (agent, task_type), metrics in items:
+                    histogram = getattr(metrics, attribute)
+                    if not histogram.count:
+                        continue
+                    for le, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{_labels(agent, task_type, le=le)} {count}")
+                    lines.append(f"{name}_sum{_labels(agent, task_type)} {_format_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(agent, task_type)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(agent: str, task_type: str, **extra: str) -> str:
+    pairs = [("agent", agent), ("task_type", task_type)] + list(extra.items())
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value))
+
+
+# Process-wide registry shared by all agents
+registry = MetricsRegistry()
@@ -1,8 +1,43 @@
-from typing import Dict, Any, List
-from datetime import datetime
-from .base_agent import BaseAgent
+from typing import Dict, Any, FrozenSet, Iterator, List, Optional, Tuple, Union
+import asyncio
+import importlib
+import time
+from .base_agent import BaseAgent, task_handler
+from .executor import TaskExecutor
+from .jobs import JobQueue, get_job_store
 from .kpi_agent import KPIAgent
 from .logs_agent import LogsAgent
+from .result_cache import ResultCache
+from .shared_state import SharedState
+from . import metrics, settings, task_history
+
+
+# Results that must always be computed fresh: live state, streams and
+# composite tasks whose subtasks are run individually
+UNCACHEABLE_TASKS = frozenset({
+    "status",
+    "agent_info",
+    "multi_agent",
+    "summarize_stream",
+    "register_error_patterns",
+    "register_log_source",
+    "kpi_stream_append",
+    "kpi_stream_query",
+    "kpi_stream_delete"
+})
+
+# Tasks that change agent state and therefore invalidate cached results
+STATE_CHANGING_TASKS = frozenset({
+    "register_error_patterns",
+    "register_log_source"
+})
+
+# Agents that unknown task types are sent to when their name has one of the
+# keywords, so the agent reports them as unknown
+KEYWORD_ROUTES = (
+    ("kpi", ("kpi", "metric", "performance", "trend")),
+    ("logs", ("log", "error", "parse", "filter")),
+)
 
 
 class OrchestratorAgent(BaseAgent):
@@ -13,36 +48,232 @@ class OrchestratorAgent(BaseAgent):
             name="Orchestrator Agent",
             description="Coordinates tasks and delegates to specialized agents"
         )
+        # Task type -> key of the agent handling it, built as agents register
+        self.routes: Dict[str, str] = dict.fromkeys(self.task_handlers, "orchestrator")
+        self.agents: Dict[str, BaseAgent] = {}
+        self.replicated_tasks: FrozenSet[str] = frozenset()
+        self.worker_local_tasks: FrozenSet[str] = frozenset()
         self.kpi_agent = KPIAgent()
         self.logs_agent = LogsAgent()
-        self.agents = {
-            "kpi": self.kpi_agent,
-            "logs": self.logs_agent
-        }
+        self.register_agent(self.kpi_agent)
+        self.register_agent(self.logs_agent)
+        for spec in settings.AGENT_PLUGINS:
+            self.load_plugin(spec)
+        self.executor = TaskExecutor()
+        self.result_cache = ResultCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            max_bytes=settings.CACHE_MAX_BYTES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS
+        )
+        self.jobs = JobQueue(
+            self.process,
+            workers=settings.JOB_WORKERS,
+            max_queued=settings.JOB_MAX_QUEUED,
+            store=get_job_store(settings.JOB_STORE, settings.JOB_MAX_FINISHED)
+        )
+        self.shared = SharedState(settings.SHARED_STATE) if settings.SHARED_STATE else None
+        self._sync_lock = asyncio.Lock()
+        self._checked_at = float("-inf")
+        self._publisher: Optional[asyncio.Task] = None
+        if self.shared is not None:
+            # Start from the checkpointed state; later changes are replayed on the first sync
+            for key, state in self.shared.join().items():
+                if key in self.agents:
+                    self.agents[key].restore_replicated_state(state)
 
     async def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Process a task by routing it to the appropriate agent"""
         task_type = task.get("type", "")
+        await self.sync_shared_state()
+
+        cache_key = None
+        if self._is_cacheable(task):
+            cache_key = self.result_cache.make_key(task)
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    self.log_task(task, cached, 0.0, cache="hit")
+                    return cached
+
+        # Delegations are recorded in handle(), orchestrator tasks are not
+        result = await self.handle(task)
+
+        if cache_key is not None and result.get("status") == "success":
+            self.result_cache.put(cache_key, result)
+        if self._changes_state(task_type):
+            await self._state_changed(task, result)
+
+        return result
+
+    def _changes_state(self, task_type: str) -> bool:
+        return task_type in STATE_CHANGING_TASKS or task_type in self.replicated_tasks
+
+    async def _state_changed(self, task: Dict[str, Any], result: Dict[str, Any]):
+        """Drop cached results once a task changed agent state, wherever it ran, and share the change"""
+        self.result_cache.clear()
+        if self.shared is not None and result.get("status") == "success":
+            replay = task.get("type", "") in self.replicated_tasks
+            await asyncio.to_thread(self.shared.record_change, task, replay)
+            await self.sync_shared_state(force=True)
+
+    async def sync_shared_state(self, force: bool = False):
+        """Apply the state changes made by the other server workers since the last sync
+
+        Replicated tasks are run again on the agent (without counting them as
+        processed here) and any change clears the result cache. Changes are
+        applied in log order; concurrent registrations on different workers
+        commute, so each worker ends up with the same state. The state is
+        then checkpointed, which lets the log be pruned.
+
+        The log is looked at most every AGENT_SHARED_STATE_CHECK_SECONDS
+        (unless `force`), SQLite is only queried off the event loop and the
+        replays run on a worker thread.
+        """
+        if self.shared is None:
+            return
+        if self._publisher is None:
+            self._publisher = asyncio.create_task(self._publish_snapshots())
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.SHARED_STATE_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        if await asyncio.to_thread(self.shared.latest_change) == self.shared.applied:
+            return
+        async with self._sync_lock:
+            changes = await asyncio.to_thread(self.shared.changes_after, self.shared.applied)
+            if not changes:
+                return
+            others = [(task_type, task) for _, worker, task_type, task in changes if worker != self.shared.worker]
+            replays = [
+                (self.agents[self.routes[task_type]], task)
+                for task_type, task in others
+                if task is not None and task_type in self.routes
+            ]
+            if replays:
+                await asyncio.to_thread(self._replay, replays)
+            self.shared.applied = changes[-1][0]
+            if others:
+                self.result_cache.clear()
+            state = {key: agent.replicated_state() for key, agent in self.agents.items()}
+            await asyncio.to_thread(self.shared.checkpoint, state)
+
+    @staticmethod
+    def _replay(replays: List[Tuple[BaseAgent, Dict[str, Any]]]):
+        """Run other workers' replicated tasks in log order, on this thread's own event loop"""
+        async def replay():
+            for agent, task in replays:
+                await agent.handle(task)
+
+        asyncio.run(replay())
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """This worker's metrics, task counts and latest task summaries, for the shared state"""
+        return {
+            "metrics": metrics.registry.snapshot(),
+            "tasks": {
+                agent.name: {
+                    "total": agent.task_history.total,
+                    "failed": agent.task_history.failed,
+                    "recent": agent.task_history.recent(settings.STATUS_RECENT_TASKS)
+                }
+                for agent in [self] + list(self.agents.values())
+            }
+        }
+
+    async def _publish_snapshots(self):
+        """Publish this worker's snapshot whenever it changed, every few moments"""
+        published = None
+        while True:
+            snapshot = self._snapshot()
+            if snapshot != published:
+                await asyncio.to_thread(self.shared.publish, snapshot)
+                published = snapshot
+            await asyncio.sleep(settings.SHARED_STATE_SYNC_SECONDS)
+
+    async def _worker_snapshots(self) -> List[Dict[str, Any]]:
+        """Latest snapshot of every worker, this one's published first so it is current"""
+        snapshot = self._snapshot()
+        shared = self.shared
+
+        def exchange() -> List[Dict[str, Any]]:
+            shared.publish(snapshot)
+            return shared.snapshots()
+
+        return await asyncio.to_thread(exchange)
+
+    async def metrics_view(self) -> metrics.MetricsRegistry:
+        """Task metrics of the whole server: merged across workers when they share state"""
+        if self.shared is None:
+            return metrics.registry
+        snapshots = await self._worker_snapshots()
+        return metrics.MetricsRegistry.merged(snapshot["metrics"] for snapshot in snapshots)
+
+    async def shutdown(self):
+        """Stop the job workers, publish a last snapshot, flush the history and stop the worker processes"""
+        await self.jobs.shutdown()
+        if self.shared is not None:
+            if self._publisher is not None:
+                self._publisher.cancel()
+                self._publisher = None
+            shared, self.shared = self.shared, None
+            await asyncio.to_thread(shared.publish, self._snapshot())
+            await asyncio.to_thread(shared.close)
+        await asyncio.to_thread(task_history.close_history_sinks)
+        self.executor.shutdown()
+
+    def _is_cacheable(self, task: Dict[str, Any]) -> bool:
+        task_type = task.get("type", "")
+        data = task.get("data")
+        return (
+            self.result_cache.enabled
+            and task_type not in UNCACHEABLE_TASKS
+            and task_type not in settings.CACHE_EXCLUDED_TASKS
+            # Results over server-side log files change with the files
+            and not (isinstance(data, dict) and (data.get("source") or data.get("path")))
+        )
+
+    def _worker_local_error(self, task_type: str) -> Optional[Dict[str, Any]]:
+        """Error result for a task whose state would stay in this worker while workers share state"""
+        if self.shared is None or task_type not in self.worker_local_tasks:
+            return None
+        return {
+            "status": "error",
+            "message": f"{task_type} keeps its state in one server worker and is not available "
+                       "while several workers share state; run a single worker to use it"
+        }
+
+    async def handle(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Route a task to the appropriate agent"""
+        task_type = task.get("type", "")
+        local_error = self._worker_local_error(task_type)
+        if local_error is not None:
+            return local_error
 
         # Determine which agent should handle this task
         agent_type = self._determine_agent(task_type)
 
         if agent_type == "orchestrator":
-            # Handle orchestrator-specific tasks
-            return await self._handle_orchestrator_task(task)
+            # Handle orchestrator-specific tasks; they are counted in the
+            # metrics but kept out of the task history
+            started = time.perf_counter()
+            result = await self._handle_orchestrator_task(task)
+            metrics.registry.observe(
+                self.name, task_type, result.get("status") == "error",
+                (time.perf_counter() - started) * 1000
+            )
+            return result
         elif agent_type in self.agents:
             # Delegate to specialized agent
             agent = self.agents[agent_type]
-            result = await agent.process(task)
-
-            # Log the delegation
-            delegation_record = {
-                "delegated_to": agent.name,
-                "task": task,
-                "result": result,
-                "timestamp": datetime.now().isoformat()
-            }
-            self.log_task(task, delegation_record)
+            started = time.perf_counter()
+            try:
+                result = await self.executor.run(agent, task)
+            except Exception:
+                self.log_failure(task, (time.perf_counter() - started) * 1000, delegated_to=agent.name)
+                raise
+
+            # Log the delegation (the agent keeps its own record of the task)
+            self.log_task(task, result, (time.perf_counter() - started) * 1000, delegated_to=agent.name)
 
             return result
         else:
@@ -51,101 +282,237 @@ class OrchestratorAgent(BaseAgent):
                 "message": f"Unknown agent type: {agent_type}"
             }
 
+    def stream(self, task: Dict[str, Any]) -> Union[Dict[str, Any], Iterator[str]]:
+        """NDJSON lines of a task whose entries can be streamed, or an error result
+
+        Streamed tasks bypass the result cache and the worker processes: the
+        agent produces its entries in the calling thread as they are sent.
+        """
+        task_type = task.get("type", "")
+        agent = self.agents.get(self._determine_agent(task_type))
+        if agent is None or task_type not in getattr(agent, "streamable_tasks", ()):
+            return {"status": "error", "message": f"Task type cannot be streamed: {task_type}"}
+        return agent.stream_entries(task)
+
+    def register_agent(self, agent: BaseAgent):
+        """Route the task types an agent handles to it; raises ValueError on conflicts"""
+        key = agent.agent_type
+        if not key or key == "orchestrator" or key in self.agents:
+            raise ValueError(f"Invalid or duplicate agent type: {key!r}")
+        for task_type in agent.task_handlers:
+            if task_type in self.routes:
+                raise ValueError(f"Task type {task_type} is already handled by {self.routes[task_type]}")
+        self.agents[key] = agent
+        self.routes.update(dict.fromkeys(agent.task_handlers, key))
+        self.replicated_tasks |= agent.replicated_tasks
+        self.worker_local_tasks |= agent.worker_local_tasks
+
+    def load_plugin(self, spec: str) -> BaseAgent:
+        """Instantiate and register the agent class named by "package.module:ClassName" """
+        module_name, _, class_name = spec.partition(":")
+        if not module_name or not class_name:
+            raise ValueError(f"Agent plugins are given as module:ClassName, not {spec!r}")
+        agent_class = getattr(importlib.import_module(module_name), class_name)
+        if not (isinstance(agent_class, type) and issubclass(agent_class, BaseAgent)):
+            raise ValueError(f"{spec} is not a BaseAgent subclass")
+        agent = agent_class()
+        self.register_agent(agent)
+        return agent
+
     def _determine_agent(self, task_type: str) -> str:
         """Determine which agent should handle a task based on task type"""
-        kpi_tasks = [
-            "analyze_metrics",
-            "calculate_kpi",
-            "trend_analysis",
-            "performance_report"
-        ]
-
-        logs_tasks = [
-            "parse_logs",
-            "find_errors",
-            "analyze_patterns",
-            "filter_logs",
-            "summarize_logs"
-        ]
-
-        if task_type in kpi_tasks:
-            return "kpi"
-        elif task_type in logs_tasks:
-            return "logs"
-        elif task_type in ["multi_agent", "status", "agent_info"]:
-            return "orchestrator"
-        else:
-            # Try to infer from keywords
-            if any(keyword in task_type.lower() for keyword in ["kpi", "metric", "performance", "trend"]):
-                return "kpi"
-            elif any(keyword in task_type.lower() for keyword in ["log", "error", "parse", "filter"]):
-                return "logs"
-            else:
-                return "orchestrator"
+        agent_type = self.routes.get(task_type)
+        if agent_type is not None:
+            return agent_type
+
+        # Try to infer from keywords
+        lowered = task_type.lower()
+        for agent_type, keywords in KEYWORD_ROUTES:
+            if agent_type in self.agents and any(keyword in lowered for keyword in keywords):
+                return agent_type
+        return "orchestrator"
 
     async def _handle_orchestrator_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Handle tasks that require orchestrator-level processing"""
         task_type = task.get("type", "")
-
-        if task_type == "multi_agent":
-            # Execute multiple agent tasks in sequence or parallel
-            return await self._execute_multi_agent_task(task)
-        elif task_type == "status":
-            # Return status of all agents
-            return self._get_system_status()
-        elif task_type == "agent_info":
-            # Return information about a specific agent
-            agent_name = task.get("data", {}).get("agent")
-            return self._get_agent_info(agent_name)
-        else:
+        handler = self.task_handlers.get(task_type)
+        if handler is None:
             return {
                 "status": "error",
                 "message": f"Unknown orchestrator task type: {task_type}"
             }
+        return await getattr(self, handler)(task.get("data", {}))
 
-    async def _execute_multi_agent_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a task that involves multiple agents"""
-        subtasks = task.get("data", {}).get("subtasks", [])
+    @task_handler("status")
+    async def _status_task(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return status of all agents"""
+        return await self._get_system_status()
 
-        results = []
-        for subtask in subtasks:
-            agent_type = self._determine_agent(subtask.get("type", ""))
-
-            if agent_type in self.agents:
-                agent = self.agents[agent_type]
-                result = await agent.process(subtask)
-                results.append({
-                    "agent": agent.name,
-                    "subtask": subtask,
-                    "result": result
-                })
-            else:
-                results.append({
-                    "agent": "unknown",
-                    "subtask": subtask,
-                    "result": {
-                        "status": "error",
-                        "message": "Could not determine appropriate agent"
+    @task_handler("agent_info")
+    async def _agent_info_task(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return information about a specific agent"""
+        return self._get_agent_info(data.get("agent"))
+
+    @task_handler("multi_agent")
+    async def _execute_multi_agent_task(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a task that involves multiple agents
+
+        Independent subtasks run concurrently, at most `max_concurrency` at a
+        time; CPU-bound ones are sent to the executor's process pool. A subtask
+        may name others (by "id") in "depends_on" and then only starts after
+        they have succeeded. Results are returned in the original order.
+        """
+        subtasks = data.get("subtasks", [])
+        max_concurrency = data.get("max_concurrency", settings.MAX_SUBTASK_CONCURRENCY)
+        if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1:
+            return {"status": "error", "message": "max_concurrency must be an integer of at least 1"}
+        max_concurrency = min(max_concurrency, settings.MAX_SUBTASK_CONCURRENCY)
+
+        ids = [subtask.get("id") for subtask in subtasks]
+        dependency_error = self._check_subtask_dependencies(subtasks, ids)
+        if dependency_error:
+            return {"status": "error", "message": dependency_error}
+
+        index_by_id = {subtask_id: index for index, subtask_id in enumerate(ids) if subtask_id is not None}
+        semaphore = asyncio.Semaphore(max_concurrency)
+        runs: Dict[int, asyncio.Task] = {}
+
+        async def run_subtask(subtask: Dict[str, Any]) -> Dict[str, Any]:
+            for dependency in subtask.get("depends_on", []):
+                outcome = await runs[index_by_id[dependency]]
+                if outcome["result"].get("status") != "success":
+                    return {
+                        "agent": "none",
+                        "subtask": subtask,
+                        "result": {
+                            "status": "error",
+                            "message": f"Dependency {dependency} did not succeed"
+                        }
                     }
-                })
+            async with semaphore:
+                return await self._run_subtask(subtask)
+
+        # Start subtasks in dependency order so every dependency is scheduled
+        # before the subtasks waiting on it
+        for index in self._topological_order(subtasks, ids):
+            runs[index] = asyncio.ensure_future(run_subtask(subtasks[index]))
+        results = await asyncio.gather(*(runs[index] for index in range(len(subtasks))))
 
         return {
             "status": "success",
             "total_subtasks": len(subtasks),
             "completed": len([r for r in results if r["result"].get("status") == "success"]),
-            "results": results
+            "results": list(results)
         }
 
-    def _get_system_status(self) -> Dict[str, Any]:
-        """Get status of all agents in the system"""
+    async def _run_subtask(self, subtask: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one subtask on the agent responsible for it"""
+        agent_type = self._determine_agent(subtask.get("type", ""))
+
+        if agent_type not in self.agents:
+            return {
+                "agent": "unknown",
+                "subtask": subtask,
+                "result": {
+                    "status": "error",
+                    "message": "Could not determine appropriate agent"
+                }
+            }
+
+        agent = self.agents[agent_type]
+        result = self._worker_local_error(subtask.get("type", ""))
+        if result is None:
+            try:
+                result = await self.executor.run(agent, subtask)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+        if self._changes_state(subtask.get("type", "")):
+            await self._state_changed(subtask, result)
         return {
+            "agent": agent.name,
+            "subtask": subtask,
+            "result": result
+        }
+
+    def _check_subtask_dependencies(self, subtasks: List[Dict[str, Any]], ids: List[Any]) -> Optional[str]:
+        """Validate subtask ids and dependencies, returning an error message if invalid"""
+        known_ids = [subtask_id for subtask_id in ids if subtask_id is not None]
+        if len(known_ids) != len(set(known_ids)):
+            return "Subtask ids must be unique"
+
+        for subtask in subtasks:
+            for dependency in subtask.get("depends_on", []):
+                if dependency not in known_ids:
+                    return f"Unknown dependency: {dependency}"
+
+        if len(self._topological_order(subtasks, ids)) != len(subtasks):
+            return "Subtask dependencies contain a cycle"
+
+        return None
+
+    def _topological_order(self, subtasks: List[Dict[str, Any]], ids: List[Any]) -> List[int]:
+        """Order subtask indices so that dependencies come first (Kahn's algorithm)"""
+        index_by_id = {subtask_id: index for index, subtask_id in enumerate(ids) if subtask_id is not None}
+        waiting = [len(subtask.get("depends_on", [])) for subtask in subtasks]
+        dependents: Dict[int, List[int]] = {}
+        for index, subtask in enumerate(subtasks):
+            for dependency in subtask.get("depends_on", []):
+                dependents.setdefault(index_by_id[dependency], []).append(index)
+
+        order = [index for index, count in enumerate(waiting) if count == 0]
+        for index in order:
+            for dependent in dependents.get(index, []):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    order.append(dependent)
+        return order
+
+    async def _get_system_status(self) -> Dict[str, Any]:
+        """Get status of all agents in the system
+
+        With shared state, task counts, latest tasks and metrics cover every
+        server worker; the executor, cache and jobs figures are this worker's.
+        """
+        status = {
             "status": "success",
             "orchestrator": self.get_info(),
             "agents": {
                 name: agent.get_info()
                 for name, agent in self.agents.items()
-            }
+            },
+            "executor": self.executor.get_info(),
+            "cache": self.result_cache.stats(),
+            "jobs": self.jobs.get_info(),
+            "metrics": metrics.registry.to_dict()
+        }
+        if self.shared is None:
+            return status
+
+        snapshots = await self._worker_snapshots()
+        limit = settings.STATUS_RECENT_TASKS
+        tasks: Dict[str, Dict[str, Any]] = {}
+        for snapshot in snapshots:
+            for name, history in snapshot["tasks"].items():
+                merged = tasks.setdefault(name, {"total": 0, "failed": 0, "recent": []})
+                merged["total"] += history["total"]
+                merged["failed"] += history.get("failed", 0)
+                merged["recent"].extend(dict(entry, worker=snapshot["worker"]) for entry in history.get("recent", []))
+        for info in [status["orchestrator"]] + list(status["agents"].values()):
+            history = tasks.get(info["name"], {"total": 0, "failed": 0, "recent": []})
+            info["tasks_completed"] = history["total"]
+            info["tasks_failed"] = history["failed"]
+            # ISO timestamps sort chronologically
+            recent = sorted(history["recent"], key=lambda entry: entry["timestamp"])
+            info["recent_tasks"] = recent[-limit:] if limit > 0 else []
+        status["metrics"] = metrics.MetricsRegistry.merged(snapshot["metrics"] for snapshot in snapshots).to_dict()
+        status["workers"] = {
+            "current": self.shared.worker,
+            "processes": [
+                {"worker": snapshot["worker"], "pid": snapshot["pid"], "updated_at": snapshot["updated_at"]}
+                for snapshot in snapshots
+            ]
         }
+        return status
 
     def _get_agent_info(self, agent_name: str) -> Dict[str, Any]:
         """Get information about a specific agent"""
@@ -0,0 +1,242 @@
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+import math
+from . import kpi_compute
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; values are then bucketed one by one
+    np = None
+
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BUCKETS = 2048
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+# Magnitudes below this are counted in the zero bucket
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+def _percentile_name(percentile: float) -> str:
+    """50 -> "p50", 99.9 -> "p99.9\""""
+    return f"p{percentile:g}"
+
+
+class DDSketch:
+    """Mergeable quantile sketch with a relative-error guarantee (DDSketch)
+
+    Values are counted in logarithmically sized buckets: bucket `k` holds
+    the magnitudes in (gamma^(k-1), gamma^k] with gamma = (1 + a) / (1 - a),
+    so any quantile is answered within a relative error `a` of the exact
+    value, using memory that depends on the range of the data, not on the
+    number of samples. Sketches with the same accuracy merge by adding their
+    bucket counts, which makes partial sketches built by several workers
+    combinable; to_dict/from_dict give a JSON-friendly form for that. When
+    more than `max_buckets` buckets are in use, the lowest ones are
+    collapsed, so only the smallest quantiles lose accuracy. NaN and
+    infinite values have no bucket and are ignored.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets: int = DEFAULT_MAX_BUCKETS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inverse_log_gamma = 1 / math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) * self._inverse_log_gamma)
+
+    def _bucket_value(self, key: int) -> float:
+        """Representative of a bucket, within the relative accuracy of all its values"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Count `value` (`count` times); non-finite values are ignored"""
+        if not math.isfinite(value):
+            return
+        if value > MIN_INDEXABLE_VALUE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < -MIN_INDEXABLE_VALUE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero_count += count
+
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self._collapse()
+
+    def add_many(self, values: Sequence[float]):
+        """Count a whole series, vectorized when NumPy is the KPI compute backend"""
+        if not len(values):
+            return
+        if np is None or kpi_compute.BACKEND != "numpy":
+            for value in values:
+                self.add(value)
+            return
+
+        array = np.asarray(values, dtype=float)
+        array = array[np.isfinite(array)]
+        if not len(array):
+            return
+        for store, magnitudes in ((self.positive, array[array > MIN_INDEXABLE_VALUE]),
+                                  (self.negative, -array[array < -MIN_INDEXABLE_VALUE])):
+            if not len(magnitudes):
+                continue
+            keys = np.ceil(np.log(magnitudes) * self._inverse_log_gamma).astype(np.int64)
+            lowest = int(keys.min())
+            counts = np.bincount(keys - lowest)
+            for offset in np.flatnonzero(counts).tolist():
+                key = lowest + offset
+                store[key] = store.get(key, 0) + int(counts[offset])
+
+        self.zero_count += int(np.count_nonzero(np.abs(array) <= MIN_INDEXABLE_VALUE))
+        self.count += len(array)
+        self.sum += float(array.sum())
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+        self._collapse()
+
+    def merge(self, other: "DDSketch"):
+        """Add another sketch's counts into this one; both must share the relative accuracy"""
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracies")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest buckets together once more than max_buckets are in use"""
+        excess = len(self.positive) + len(self.negative) - self.max_buckets
+        while excess > 0:
+            # The smallest values are the most negative ones first, then the
+            # smallest positive magnitudes
+            if len(self.negative) > 1:
+                store, keys = self.negative, sorted(self.negative, reverse=True)
+            elif len(self.positive) > 1:
+                store, keys = self.positive, sorted(self.positive)
+            else:
+                return
+            folded = min(excess, len(keys) - 1)
+            target = keys[folded]
+            for key in keys[:folded]:
+                store[target] += store.pop(key)
+            excess -= folded
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile `q` in [0, 1] (None for an empty sketch)"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._bucket_value(key), self.min)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._bucket_value(key), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Optional[float]]:
+        """{"p50": ..., "p99.9": ...} for the given percentiles (0-100)"""
+        return {_percentile_name(p): self.quantile(p / 100) for p in percentiles}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form; each store is a key offset and a dense list of counts"""
+        def dense(store: Dict[int, int]) -> Dict[str, Any]:
+            if not store:
+                return {"offset": 0, "counts": []}
+            lowest = min(store)
+            counts = [0] * (max(store) - lowest + 1)
+            for key, count in store.items():
+                counts[key - lowest] = count
+            return {"offset": lowest, "counts": counts}
+
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self.zero_count,
+            "positive": dense(self.positive),
+            "negative": dense(self.negative)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_buckets: int = DEFAULT_MAX_BUCKETS) -> "DDSketch":
+        """Rebuild a sketch from to_dict output; raises ValueError when it is malformed"""
+        try:
+            sketch = cls(float(data["relative_accuracy"]), max_buckets)
+            for store, name in ((sketch.positive, "positive"), (sketch.negative, "negative")):
+                offset = int(data[name]["offset"])
+                for position, count in enumerate(data[name]["counts"]):
+                    if count:
+                        store[offset + position] = int(count)
+            sketch.zero_count = int(data.get("zero_count", 0))
+            sketch.count = int(data["count"])
+            sketch.sum = float(data.get("sum", 0.0))
+            if sketch.count:
+                sketch.min = float(data["min"])
+                sketch.max = float(data["max"])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed sketch: {e!r}") from e
+
+        if sketch.count != sketch.zero_count + sum(sketch.positive.values()) + sum(sketch.negative.values()):
+            raise ValueError("Malformed sketch: bucket counts do not add up to count")
+        sketch._collapse()
+        return sketch
+
+
+def merge_sketches(sketches: Iterable[Dict[str, Any]]) -> Optional[DDSketch]:
+    """Merge serialized sketches into one (None when there are none); raises ValueError"""
+    merged = None
+    for data in sketches:
+        sketch = DDSketch.from_dict(data)
+        if merged is None:
+            merged = sketch
+        else:
+            merged.merge(sketch)
+    return merged
+
+
+def parse_percentiles(percentiles: Optional[List[Any]]) -> List[float]:
+    """Requested percentiles (0-100), or the defaults; raises ValueError"""
+    if percentiles is None:
+        return list(DEFAULT_PERCENTILES)
+    if not isinstance(percentiles, list) or not percentiles:
+        raise ValueError("percentiles must be a non-empty list")
+    for percentile in percentiles:
+        if isinstance(percentile, bool) or not isinstance(percentile, (int, float)) or not 0 <= percentile <= 100:
+            raise ValueError(f"Invalid percentile: {percentile!r}")
+    return percentiles
@@ -0,0 +1,114 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import time
+
+
+def _encode_buffer(value: Any) -> str:
+    """Key stand-in for binary arrays (NumPy, array.array) in task data: a digest of their bytes"""
+    try:
+        view = memoryview(value)
+    except TypeError:
+        raise TypeError(f"Cannot hash {type(value).__name__}") from None
+    if not view.c_contiguous:
+        raise TypeError("Cannot hash a non-contiguous buffer")
+    return f"buffer:{view.format}:{hashlib.sha256(view.cast('B')).hexdigest()}"
+
+
+class ResultCache:
+    """LRU/TTL cache of task results keyed on a content hash of the task
+
+    The key is a SHA-256 of the canonical JSON encoding of the task type and
+    data, so identical payloads hit regardless of key order. Entries expire
+    after `ttl_seconds`, and the least recently used ones are evicted once
+    either `max_entries` or the `max_bytes` budget (measured on the encoded
+    result) is exceeded. Results are copied in and out, so a caller changing
+    the dict it was given cannot alter later hits.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def make_key(self, task: Dict[str, Any]) -> Optional[str]:
+        """Stable hash of the task type and data, or None if the data cannot be hashed"""
+        try:
+            encoded = json.dumps(
+                {"type": task.get("type", ""), "data": task.get("data", {})},
+                sort_keys=True, separators=(",", ":"), allow_nan=True, default=_encode_buffer
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for `key`, counting the lookup as a hit or miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        result, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result, evicting old entries to respect the limits"""
+        try:
+            size = len(json.dumps(result, separators=(",", ":"), default=str))
+        except (TypeError, ValueError):
+            return
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (copy.deepcopy(result), size, time.monotonic() + self.ttl_seconds)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,95 @@
+import os
+
+
+def _int_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# Extra agents (comma separated "package.module:ClassName") registered with the
+# orchestrator at startup; their modules must be importable
+AGENT_PLUGINS = tuple(
+    spec.strip() for spec in os.getenv("AGENT_PLUGINS", "").split(",") if spec.strip()
+)
+
+# Upper bound on concurrently running subtasks of one multi_agent request
+MAX_SUBTASK_CONCURRENCY = _int_env("AGENT_MAX_SUBTASK_CONCURRENCY", 8)
+
+# Where CPU-bound agent tasks run: "process" (worker processes), "thread"
+# (worker threads) or "inline" (directly on the event loop)
+EXECUTOR_MODE = os.getenv("AGENT_EXECUTOR", "process")
+
+# Server worker processes (uvicorn --workers); each runs its own agents
+WORKERS = _int_env("AGENT_WORKERS", 1)
+
+# Size of the worker pool used for CPU-bound agent tasks; by default the
+# cores are divided between the server workers
+EXECUTOR_WORKERS = _int_env("AGENT_EXECUTOR_WORKERS", max(1, (os.cpu_count() or 1) // WORKERS))
+
+# SQLite database through which server workers share metrics, task counts,
+# agent state changes and cache invalidations; on by default with several workers
+SHARED_STATE = os.getenv("AGENT_SHARED_STATE", ".agent_state.db" if WORKERS > 1 else "")
+
+# Seconds between a worker's snapshots of its metrics in the shared state
+SHARED_STATE_SYNC_SECONDS = float(os.getenv("AGENT_SHARED_STATE_SYNC_SECONDS") or 1.0)
+
+# Seconds between a worker's checks for state changes made by the others;
+# its own changes are always shared at once
+SHARED_STATE_CHECK_SECONDS = float(os.getenv("AGENT_SHARED_STATE_CHECK_SECONDS") or 0.1)
+
+# Compact task summaries kept in memory per agent
+HISTORY_MAX_ENTRIES = _int_env("AGENT_HISTORY_MAX_ENTRIES", 1000)
+
+# Latest task summaries per agent reported by the status endpoints
+STATUS_RECENT_TASKS = _int_env("AGENT_STATUS_RECENT_TASKS", 10)
+
+# Optional persistent history sink, e.g. "jsonl:history.jsonl" or "sqlite:history.db"
+HISTORY_SINK = os.getenv("AGENT_HISTORY_SINK", "")
+
+# The sink writes queued records in batches off the event loop: every so many
+# seconds, or as soon as a batch is full
+HISTORY_SINK_FLUSH_SECONDS = float(os.getenv("AGENT_HISTORY_SINK_FLUSH_SECONDS") or 1.0)
+HISTORY_SINK_BATCH_SIZE = _int_env("AGENT_HISTORY_SINK_BATCH_SIZE", 500)
+
+# Result cache in front of the orchestrator; AGENT_CACHE_MAX_ENTRIES=0 disables it
+CACHE_MAX_ENTRIES = _int_env("AGENT_CACHE_MAX_ENTRIES", 1024)
+CACHE_MAX_BYTES = _int_env("AGENT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+CACHE_TTL_SECONDS = _int_env("AGENT_CACHE_TTL_SECONDS", 300)
+
+# Extra task types (comma separated) whose results must never be cached
+CACHE_EXCLUDED_TASKS = frozenset(
+    task_type.strip() for task_type in os.getenv("AGENT_CACHE_EXCLUDE", "").split(",") if task_type.strip()
+)
+
+# Directory holding the persistent indexes of registered log sources
+LOG_INDEX_DIR = os.getenv("AGENT_LOG_INDEX_DIR", ".log_index")
+
+# Directories (comma separated) that server-side log sources may be read from;
+# empty disables server-side log files
+LOG_SOURCE_ROOTS = tuple(
+    root.strip() for root in os.getenv("AGENT_LOG_SOURCE_ROOTS", "").split(",") if root.strip()
+)
+
+# Default cap on the entries returned by a query against a log source
+LOG_QUERY_LIMIT = _int_env("AGENT_LOG_QUERY_LIMIT", 1000)
+
+# Raw bytes of a server-side log file decoded and analyzed at a time
+LOG_FILE_CHUNK_BYTES = _int_env("AGENT_LOG_FILE_CHUNK_BYTES", 8 * 1024 * 1024)
+
+# Named KPI streams kept in memory, and the sliding window (in points) and
+# EWMA smoothing factor new streams get unless the first append sets them
+KPI_MAX_STREAMS = _int_env("AGENT_KPI_MAX_STREAMS", 1000)
+KPI_STREAM_WINDOW = _int_env("AGENT_KPI_STREAM_WINDOW", 1000)
+KPI_STREAM_MAX_WINDOW = _int_env("AGENT_KPI_STREAM_MAX_WINDOW", 100000)
+KPI_STREAM_ALPHA = float(os.getenv("AGENT_KPI_STREAM_ALPHA") or 0.1)
+
+# Upper bound on the KPI definitions of one calculate_kpi_batch request
+KPI_BATCH_MAX_ITEMS = _int_env("AGENT_KPI_BATCH_MAX_ITEMS", 10000)
+
+# Asynchronous jobs: concurrently running jobs, jobs allowed to wait before
+# submissions are rejected, finished jobs kept with their results, and where
+# they are kept ("memory" or e.g. "sqlite:jobs.db" to survive restarts)
+JOB_WORKERS = _int_env("AGENT_JOB_WORKERS", 4)
+JOB_MAX_QUEUED = _int_env("AGENT_JOB_MAX_QUEUED", 100)
+JOB_MAX_FINISHED = _int_env("AGENT_JOB_MAX_FINISHED", 1000)
+JOB_STORE = os.getenv("AGENT_JOB_STORE", "memory")
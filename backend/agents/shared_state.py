@@ -0,0 +1,191 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import json
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+
+
+def _encode(value: Any) -> Any:
+    """JSON fallback for arrays in task payloads"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Whether a process with this pid runs on this host"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedState:
+    """State the worker processes of one server share through a local SQLite database
+
+    Several uvicorn workers each run their own orchestrator and agents; this
+    store is what they have in common. In WAL mode readers never block the
+    writer, and every operation is a short transaction:
+
+    - `workers` holds one row per worker process with its latest snapshot
+      (metrics and task counts), which any worker merges to report the
+      whole server.
+      Rows of processes gone from this host are dropped when a worker
+      starts, so a restarted server counts from zero.
+    - `changes` is a log of the tasks that changed agent state. Each worker
+      applies the changes made by the others in log order: tasks marked
+      `replay` (state held in process memory, such as error patterns) are
+      run again, and any change clears the result cache, so no worker
+      serves results computed before it.
+    - `checkpoint` holds the replicated agent state as of a position in the
+      log. A worker starting up restores it and only replays the changes
+      after it; the changes both covered by the checkpoint and applied by
+      every live worker are deleted, so the log stays short.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Unique even when a pid is reused by a later worker
+        self.worker = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.applied = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " worker TEXT PRIMARY KEY, pid INTEGER, updated_at TEXT, snapshot TEXT, applied INTEGER DEFAULT 0)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, worker TEXT, type TEXT, task TEXT, replay INTEGER)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER, state TEXT)"
+        )
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(workers)")]
+        if "applied" not in columns:
+            self._connection.execute("ALTER TABLE workers ADD COLUMN applied INTEGER DEFAULT 0")
+        host = socket.gethostname()
+        gone = [
+            (worker,) for worker, pid in self._connection.execute("SELECT worker, pid FROM workers")
+            if worker.startswith(f"{host}-") and not process_alive(pid)
+        ]
+        self._connection.executemany("DELETE FROM workers WHERE worker = ?", gone)
+        self._connection.commit()
+
+    def join(self) -> Dict[str, Any]:
+        """Register this worker and return the checkpointed agent state it starts from
+
+        `applied` is set to the checkpoint's position, so only later changes
+        are replayed. Both happen in one transaction, so the changes after
+        it cannot be pruned before this worker has applied them.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute("SELECT seq, state FROM checkpoint WHERE id = 1").fetchone()
+                self.applied, state = (row[0], json.loads(row[1])) if row else (0, {})
+                self._connection.execute(
+                    "INSERT INTO workers (worker, pid, updated_at, applied) VALUES (?, ?, ?, ?)",
+                    (self.worker, os.getpid(), datetime.now().isoformat(), self.applied)
+                )
+            except BaseException:
+                self._connection.rollback()
+                raise
+            self._connection.commit()
+        return state
+
+    def publish(self, snapshot: Dict[str, Any]):
+        """Store this worker's latest snapshot"""
+        encoded = json.dumps(snapshot)
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO workers (worker, pid, updated_at, snapshot, applied) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(worker) DO UPDATE SET updated_at = excluded.updated_at,"
+                " snapshot = excluded.snapshot, applied = excluded.applied",
+                (self.worker, os.getpid(), datetime.now().isoformat(), encoded, self.applied)
+            )
+            self._connection.commit()
+
+    def checkpoint(self, state: Dict[str, Any]):
+        """Record how far this worker got, checkpoint its state if it is the furthest, and prune the log
+
+        `state` is the replicated agent state with every change up to
+        `applied` in it.
+        """
+        encoded = json.dumps(state, default=_encode)
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "UPDATE workers SET applied = ? WHERE worker = ?", (self.applied, self.worker)
+                )
+                row = self._connection.execute("SELECT seq FROM checkpoint WHERE id = 1").fetchone()
+                checkpointed = row[0] if row else 0
+                if self.applied > checkpointed:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO checkpoint (id, seq, state) VALUES (1, ?, ?)",
+                        (self.applied, encoded)
+                    )
+                    checkpointed = self.applied
+                live = [
+                    applied for pid, applied in self._connection.execute("SELECT pid, applied FROM workers")
+                    if process_alive(pid)
+                ]
+                self._connection.execute(
+                    "DELETE FROM changes WHERE seq <= ?", (min(live + [checkpointed]),)
+                )
+            except BaseException:
+                self._connection.rollback()
+                raise
+            self._connection.commit()
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Latest snapshot of every worker, with `worker`, `pid` and `updated_at`"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT worker, pid, updated_at, snapshot FROM workers WHERE snapshot IS NOT NULL ORDER BY worker"
+            ).fetchall()
+        return [
+            dict(json.loads(snapshot), worker=worker, pid=pid, updated_at=updated_at)
+            for worker, pid, updated_at, snapshot in rows
+        ]
+
+    def record_change(self, task: Dict[str, Any], replay: bool) -> int:
+        """Append a state-changing task to the log; returns its sequence number"""
+        encoded = json.dumps(task, default=_encode) if replay else None
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO changes (worker, type, task, replay) VALUES (?, ?, ?, ?)",
+                (self.worker, task.get("type", ""), encoded, int(replay))
+            )
+            self._connection.commit()
+            return cursor.lastrowid
+
+    def latest_change(self) -> int:
+        """Sequence number of the last change recorded, even once pruned"""
+        with self._lock:
+            row = self._connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def changes_after(self, seq: int) -> List[Tuple[int, str, str, Any]]:
+        """(seq, worker, task type, task or None) of the changes after `seq`, in log order"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT seq, worker, type, task FROM changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        return [(seq, worker, task_type, json.loads(task) if task else None) for seq, worker, task_type, task in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
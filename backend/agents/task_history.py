@@ -0,0 +1,230 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from collections import deque
+from datetime import datetime
+import json
+import logging
+import sqlite3
+import threading
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+
+def payload_items(value: Any, depth: int = 2) -> int:
+    """Rough size of a payload: the number of list items it carries (lines, points, ...)"""
+    if isinstance(value, (str, bytes)):
+        return 0
+    if isinstance(value, dict):
+        if depth == 0:
+            return 0
+        return sum(payload_items(item, depth - 1) for item in value.values())
+    if hasattr(value, "__len__"):
+        return len(value)
+    return 0
+
+
+class HistorySink(ABC):
+    """Destination that persists task history records beyond the in-memory buffer
+
+    `write` only queues a record, so recording a task never blocks the event
+    loop on file or database I/O. A background thread hands the queued
+    records to `write_batch` every `flush_seconds`, or as soon as
+    `batch_size` records are waiting, and `close` writes whatever is left.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_seconds: Optional[float] = None):
+        self.batch_size = batch_size or settings.HISTORY_SINK_BATCH_SIZE
+        self.flush_seconds = flush_seconds or settings.HISTORY_SINK_FLUSH_SECONDS
+        self._pending: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        # Serializes write_batch calls between the writer thread and flush()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name=f"{type(self).__name__}-writer", daemon=True)
+        self._writer.start()
+
+    @abstractmethod
+    def write_batch(self, records: List[Dict[str, Any]]):
+        """Persist several history records at once"""
+        pass
+
+    def write(self, record: Dict[str, Any]):
+        """Queue one history record for the writer thread"""
+        with self._condition:
+            if self._closed:
+                raise ValueError("History sink is closed")
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self):
+        """Write all queued records now"""
+        with self._flush_lock:
+            with self._condition:
+                records, self._pending = self._pending, []
+            if records:
+                self.write_batch(records)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_seconds)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not write task history records")
+            if closed:
+                return
+
+    def close(self):
+        """Write the queued records and stop the writer thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._writer.join()
+
+
+class JsonlHistorySink(HistorySink):
+    """Appends history records to a JSON Lines file"""
+
+    def __init__(self, path: str, **options: Any):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        super().__init__(**options)
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class SqliteHistorySink(HistorySink):
+    """Stores history records in a local SQLite database"""
+
+    def __init__(self, path: str, **options: Any):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS task_history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " timestamp TEXT, agent TEXT, type TEXT, status TEXT,"
+            " input_items INTEGER, result_items INTEGER, duration_ms REAL, details TEXT)"
+        )
+        self._connection.commit()
+        super().__init__(**options)
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        core = ("timestamp", "agent", "type", "status", "input_items", "result_items", "duration_ms")
+        rows = []
+        for record in records:
+            details = {key: value for key, value in record.items() if key not in core}
+            rows.append(tuple(record.get(key) for key in core) + (json.dumps(details, default=str),))
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO task_history"
+                " (timestamp, agent, type, status, input_items, result_items, duration_ms, details)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+
+_sinks: Dict[str, HistorySink] = {}
+
+
+def get_history_sink(spec: str) -> Optional[HistorySink]:
+    """Shared sink for a spec such as "jsonl:/var/log/agents.jsonl" or "sqlite:history.db" """
+    if not spec:
+        return None
+    if spec not in _sinks:
+        kind, _, path = spec.partition(":")
+        if kind == "jsonl":
+            _sinks[spec] = JsonlHistorySink(path)
+        elif kind == "sqlite":
+            _sinks[spec] = SqliteHistorySink(path)
+        else:
+            raise ValueError(f"Unknown history sink: {spec}")
+    return _sinks[spec]
+
+
+def close_history_sinks():
+    """Write the queued records of every shared sink and close them"""
+    while _sinks:
+        _, sink = _sinks.popitem()
+        sink.close()
+
+
+class TaskHistory:
+    """Bounded history of compact task summaries
+
+    Only a summary of each task (type, status, payload sizes, duration) is
+    kept, never the payloads themselves, and the in-memory buffer is a ring
+    that evicts the oldest entries once `max_entries` is reached. Every record
+    can additionally be written to a persistent sink. The running total is
+    kept separately so counts stay O(1) and survive eviction.
+    """
+
+    def __init__(self, agent_name: str, max_entries: int = 1000, sink: Optional[HistorySink] = None):
+        self.agent_name = agent_name
+        self.max_entries = max_entries
+        self.entries: deque = deque(maxlen=max_entries)
+        self.sink = sink
+        self.total = 0
+        self.failed = 0
+
+    def record(self, task: Dict[str, Any], result: Dict[str, Any],
+               duration_ms: Optional[float] = None, **details: Any) -> Dict[str, Any]:
+        """Record a compact summary of a finished task and return it"""
+        status = result.get("status", "unknown") if isinstance(result, dict) else "unknown"
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "agent": self.agent_name,
+            "type": task.get("type", ""),
+            "status": status,
+            "input_items": payload_items(task.get("data", {})),
+            "result_items": payload_items(result) if isinstance(result, dict) else 0,
+            "duration_ms": round(duration_ms, 3) if duration_ms is not None else None
+        }
+        entry.update(details)
+
+        self.entries.append(entry)
+        self.total += 1
+        if status == "error":
+            self.failed += 1
+        if self.sink is not None:
+            self.sink.write(entry)
+        return entry
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent summaries, oldest first; all of them when `limit` is None"""
+        entries = list(self.entries)
+        if limit is None:
+            return entries
+        return entries[-limit:] if limit > 0 else []
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the configuration travels to worker processes
+        return {
+            "agent_name": self.agent_name,
+            "max_entries": self.max_entries,
+            "entries": deque(maxlen=self.max_entries),
+            "sink": None,
+            "total": 0,
+            "failed": 0
+        }
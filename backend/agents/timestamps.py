@@ -0,0 +1,175 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from functools import lru_cache
+import re
+import time
+
+
+MONTHS = {
+    name: number for number, name in enumerate(
+        ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1
+    )
+}
+
+# Epoch seconds (9-10 digits, optionally fractional) or milliseconds (12-13 digits)
+EPOCH_TIMESTAMP = re.compile(r"(\d{9,10}(?:\.\d+)?|\d{12,13})")
+
+# Apache/nginx access logs: 10/Oct/2000:13:55:36 -0700
+COMMON_LOG_TIMESTAMP = re.compile(
+    r"(\d{1,2})/([A-Z][a-z]{2})/(\d{4}):(\d\d):(\d\d):(\d\d)(?:\s*(Z|[+-]\d\d:?\d\d))?"
+)
+
+# BSD syslog, which has no year: Oct 11 22:14:15
+SYSLOG_TIMESTAMP = re.compile(r"([A-Z][a-z]{2}) +(\d{1,2}) (\d\d):(\d\d):(\d\d)(\.\d+)?")
+
+
+@lru_cache(maxsize=4096)
+def _day_start(year: int, month: int, day: int) -> float:
+    """Epoch seconds of midnight UTC; raises ValueError for invalid dates"""
+    return datetime(year, month, day, tzinfo=timezone.utc).timestamp()
+
+
+def _utc_offset(zone: Optional[str]) -> int:
+    """Seconds east of UTC of a "Z", "+0200" or "-07:00" suffix"""
+    if not zone or zone == "Z":
+        return 0
+    digits = zone[1:].replace(":", "")
+    offset = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+    return -offset if zone[0] == "-" else offset
+
+
+def _parse_epoch(text: str) -> Optional[float]:
+    if not EPOCH_TIMESTAMP.fullmatch(text):
+        return None
+    value = float(text)
+    return value / 1000 if len(text) >= 12 and "." not in text else value
+
+
+def _parse_iso(text: str) -> Optional[float]:
+    try:
+        parsed = datetime.fromisoformat(text.replace(",", "."))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_common_log(text: str) -> Optional[float]:
+    match = COMMON_LOG_TIMESTAMP.fullmatch(text)
+    if not match or match.group(2) not in MONTHS:
+        return None
+    day, month, year, hour, minute, second, zone = match.groups()
+    try:
+        midnight = _day_start(int(year), MONTHS[month], int(day))
+    except ValueError:
+        return None
+    return midnight + int(hour) * 3600 + int(minute) * 60 + int(second) - _utc_offset(zone)
+
+
+def _parse_syslog(text: str) -> Optional[float]:
+    match = SYSLOG_TIMESTAMP.fullmatch(text)
+    if not match or match.group(1) not in MONTHS:
+        return None
+    month, day, hour, minute, second, fraction = match.groups()
+    seconds = int(hour) * 3600 + int(minute) * 60 + int(second) + (float(fraction) if fraction else 0.0)
+
+    # Without a year, take the latest one that does not put the line more
+    # than a day in the future (logs from December read in January)
+    now = time.time()
+    year = time.gmtime(now).tm_year
+    try:
+        moment = _day_start(year, MONTHS[month], int(day)) + seconds
+        if moment > now + 86400:
+            moment = _day_start(year - 1, MONTHS[month], int(day)) + seconds
+    except ValueError:
+        return None
+    return moment
+
+
+# Timestamp layouts in the order they are tried; each returns None on mismatch
+TIMESTAMP_LAYOUTS: List[Callable[[str], Optional[float]]] = [
+    _parse_epoch,
+    _parse_iso,
+    _parse_common_log,
+    _parse_syslog,
+]
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Convert a log timestamp into epoch seconds
+
+    Accepts ISO 8601 strings ("2024-01-15 10:30:00", "2024-01-15T10:30:00.123Z",
+    "2024-01-15 10:30:00,123"), access log ("10/Oct/2000:13:55:36 -0700") and
+    syslog ("Oct 11 22:14:15") timestamps, epoch seconds or milliseconds and
+    plain numbers. Naive timestamps are taken as UTC. Returns None when the
+    value cannot be parsed.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    text = value.strip()
+    for layout in TIMESTAMP_LAYOUTS:
+        parsed = layout(text)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+class TimestampParser:
+    """parse_timestamp for the many timestamps of one log
+
+    The layout that parsed the previous timestamp is tried first, so a log
+    written in one layout detects it once instead of on every line, and a
+    timestamp equal to the previous one (lines logged within the same
+    second) is not parsed again.
+    """
+
+    def __init__(self):
+        self._layouts = list(TIMESTAMP_LAYOUTS)
+        self._last_text: Optional[str] = None
+        self._last_value: Optional[float] = None
+
+    def __call__(self, value: Any) -> Optional[float]:
+        if not isinstance(value, str):
+            return parse_timestamp(value)
+        if value == self._last_text:
+            return self._last_value
+
+        parsed = None
+        text = value.strip()
+        layouts = self._layouts
+        for position, layout in enumerate(layouts):
+            parsed = layout(text)
+            if parsed is not None:
+                if position:
+                    layouts.insert(0, layouts.pop(position))
+                break
+
+        self._last_text, self._last_value = value, parsed
+        return parsed
+
+
+def parse_time_range(time_range: Optional[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
+    """Bounds of a {"start": ..., "end": ...} filter in epoch seconds (None when open)
+
+    Raises ValueError when a bound is present but cannot be parsed.
+    """
+    if not time_range:
+        return None, None
+
+    bounds = []
+    for key in ("start", "end"):
+        value = time_range.get(key)
+        if value is None or value == "":
+            bounds.append(None)
+            continue
+        parsed = parse_timestamp(value)
+        if parsed is None:
+            raise ValueError(f"Invalid time_range {key}: {value}")
+        bounds.append(parsed)
+    return bounds[0], bounds[1]
@@ -0,0 +1,46 @@
+"""Compare the fused analyze_logs task with summarize, patterns and errors run separately
+
+Run from the backend directory:
+    python -m benchmarks.bench_analyze_logs [line_count]
+"""
+import asyncio
+import sys
+
+from agents.logs_agent import LogsAgent
+from benchmarks.common import best_of, generate_log_lines
+
+
+def run_separately(agent, lines):
+    data = {"logs": lines}
+    return {
+        "summary": asyncio.run(agent._summarize_logs(data)),
+        "patterns": asyncio.run(agent._analyze_patterns(data)),
+        "errors": asyncio.run(agent._find_errors(data)),
+    }
+
+
+def run_fused(agent, lines):
+    return asyncio.run(agent._analyze_logs({"logs": lines}))
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = generate_log_lines(line_count)
+    agent = LogsAgent()
+
+    separate = run_separately(agent, lines)
+    fused = run_fused(agent, lines)
+    for name in ("summary", "patterns", "errors"):
+        assert separate[name] == fused[name], name
+
+    separate_time = best_of(lambda: run_separately(agent, lines))
+    fused_time = best_of(lambda: run_fused(agent, lines))
+
+    print(f"lines: {line_count}")
+    print(f"three separate tasks : {separate_time:.3f}s")
+    print(f"fused analyze_logs   : {fused_time:.3f}s")
+    print(f"speedup              : {separate_time / fused_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
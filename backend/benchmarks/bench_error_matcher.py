@@ -0,0 +1,48 @@
+"""Compare the compiled ErrorMatcher with the old per-pattern regex loop
+
+Run from the backend directory:
+    python -m benchmarks.bench_error_matcher [line_count]
+"""
+import re
+import sys
+
+from agents.error_matcher import ErrorMatcher
+from agents.logs_agent import LogsAgent
+from benchmarks.common import best_of, generate_log_lines
+
+
+def count_errors_loop(lines, patterns):
+    count = 0
+    for line in lines:
+        for pattern in patterns:
+            if re.search(pattern, line, re.IGNORECASE):
+                count += 1
+                break
+    return count
+
+
+def count_errors_matcher(lines, matcher):
+    is_error = matcher.is_error
+    return sum(1 for line in lines if is_error(line))
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = generate_log_lines(line_count)
+    patterns = list(LogsAgent().error_patterns)
+    matcher = ErrorMatcher(patterns)
+
+    expected = count_errors_loop(lines, patterns)
+    assert count_errors_matcher(lines, matcher) == expected
+
+    loop_time = best_of(lambda: count_errors_loop(lines, patterns))
+    matcher_time = best_of(lambda: count_errors_matcher(lines, matcher))
+
+    print(f"lines: {line_count}, errors: {expected}")
+    print(f"per-pattern loop : {loop_time:.3f}s ({line_count / loop_time:,.0f} lines/s)")
+    print(f"compiled matcher : {matcher_time:.3f}s ({line_count / matcher_time:,.0f} lines/s)")
+    print(f"speedup          : {loop_time / matcher_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
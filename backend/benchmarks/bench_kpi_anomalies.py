@@ -0,0 +1,74 @@
+"""Time anomaly detection over a dashboard's worth of metrics
+
+Scores every metric in one batched call and compares it with one call per
+metric and with the pure-Python backend (a loop over metrics and points),
+for both methods with and without a seasonal baseline. Known spikes are
+injected into every metric; the run checks that the seasonal scoring flags
+each of them.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_anomalies [metric_count] [points_per_metric]
+"""
+import math
+import random
+import sys
+
+from agents import kpi_compute
+from agents.kpi_anomalies import DEFAULT_SEASONS, DEFAULT_WINDOW, detect_anomalies
+from benchmarks.common import best_of
+
+SEASON_LENGTH = 60
+SPIKES = (0.5, 0.9, 1.0)
+
+
+def make_metrics(metric_count, points, rng):
+    metrics = {}
+    for metric in range(metric_count):
+        level = rng.uniform(10, 1000)
+        values = [
+            level * (1 + 0.2 * math.sin(2 * math.pi * x / SEASON_LENGTH)) + rng.gauss(0, level * 0.01)
+            for x in range(points)
+        ]
+        for share in SPIKES:
+            values[min(int(share * points), points - 1)] += level * 0.3
+        metrics[f"metric_{metric}"] = values
+    return metrics
+
+
+def main():
+    metric_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    points = int(sys.argv[2]) if len(sys.argv) > 2 else 1440
+    metrics = make_metrics(metric_count, points, random.Random(42))
+    spikes = {min(int(share * points), points - 1) for share in SPIKES}
+    check = points > DEFAULT_SEASONS * SEASON_LENGTH + DEFAULT_WINDOW
+    backend = kpi_compute.BACKEND
+
+    print(f"{metric_count} metrics x {points} points (backend: {backend})")
+    print(f"{'method':>8} {'seasonal':>8} {'batched (ms)':>13} {'per metric (ms)':>16} {'python (ms)':>12}")
+    for method in ("mad", "zscore"):
+        for season_length in (None, SEASON_LENGTH):
+            def batched():
+                return detect_anomalies(metrics, method=method, season_length=season_length)
+
+            def per_metric():
+                return {
+                    name: detect_anomalies({name: values}, method=method, season_length=season_length)[name]
+                    for name, values in metrics.items()
+                }
+
+            batched_time = best_of(batched)
+            per_metric_time = best_of(per_metric)
+            kpi_compute.set_backend("python")
+            python_time = best_of(batched, repeat=1)
+            kpi_compute.set_backend(backend)
+            print(f"{method:>8} {'yes' if season_length else 'no':>8} {batched_time * 1000:>13.2f} "
+                  f"{per_metric_time * 1000:>16.2f} {python_time * 1000:>12.2f}")
+
+            if season_length and check:
+                for name, found in batched().items():
+                    flagged = {anomaly["index"] for anomaly in found["anomalies"]}
+                    assert spikes <= flagged, (method, name, sorted(spikes - flagged))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare one calculate_kpi request per KPI with a single batched request
+
+Builds a mix of conversion rate, uptime and average response time
+definitions and computes them through the orchestrator one task at a time
+and as one calculate_kpi_batch task, checking that both give the same
+values. With --url it does the same against a live server (start it with
+AGENT_CACHE_MAX_ENTRIES=0 so repeated runs are not served from the cache),
+so HTTP and request validation overhead are included.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_batch [--items 500] [--url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import urllib.request
+
+from agents import kpi_compute
+from agents.orchestrator_agent import OrchestratorAgent
+from benchmarks.common import best_of
+
+
+def make_items(count, rng):
+    items = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            items.append({"kpi_type": "conversion_rate",
+                          "values": {"conversions": rng.randint(0, 500), "total": rng.randint(500, 5000)}})
+        elif kind == 1:
+            items.append({"kpi_type": "uptime_percentage",
+                          "values": {"uptime_minutes": rng.uniform(1300, 1440), "total_minutes": 1440}})
+        else:
+            items.append({"kpi_type": "average_response_time",
+                          "values": {"response_times": [round(rng.uniform(20, 800), 1) for _ in range(20)]}})
+    return items
+
+
+def post_json(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def report(label, count, individual_time, batch_time):
+    print(f"{label:<13} individual {individual_time * 1000:9.1f}ms ({count / individual_time:9.0f} KPIs/s)   "
+          f"batch {batch_time * 1000:8.1f}ms ({count / batch_time:9.0f} KPIs/s)   "
+          f"{individual_time / batch_time:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    items = make_items(args.items, random.Random(42))
+    print(f"{args.items} KPI definitions (backend: {kpi_compute.BACKEND})")
+
+    orchestrator = OrchestratorAgent()
+    orchestrator.result_cache.max_entries = 0
+
+    async def individual():
+        return [await orchestrator.process({"type": "calculate_kpi", "data": item}) for item in items]
+
+    async def batch():
+        return await orchestrator.process({"type": "calculate_kpi_batch", "data": {"items": items}})
+
+    expected = asyncio.run(individual())
+    assert asyncio.run(batch())["results"] == expected
+    report("orchestrator", args.items, best_of(lambda: asyncio.run(individual())), best_of(lambda: asyncio.run(batch())))
+
+    if args.url:
+        calculate = f"{args.url}/api/agents/kpi/calculate"
+        assert post_json(f"{calculate}/batch", {"items": items})["results"] == expected
+
+        def individual_http():
+            for item in items:
+                post_json(calculate, item)
+
+        started = time.perf_counter()
+        individual_http()
+        individual_time = time.perf_counter() - started
+        batch_time = best_of(lambda: post_json(f"{calculate}/batch", {"items": items}))
+        report("http", args.items, individual_time, batch_time)
+
+
+if __name__ == "__main__":
+    main()
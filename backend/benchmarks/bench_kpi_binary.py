@@ -0,0 +1,76 @@
+"""Compare the JSON and binary ingestion paths of the KPI endpoints
+
+Times decoding the request body plus analyze_metrics for the same series
+sent as a JSON list, as raw little-endian float64, as msgpack with a bin
+array and as an Arrow IPC stream (the last two when their packages are
+installed), and reports the size of each body.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_binary [point_count]
+"""
+from array import array
+import asyncio
+import io
+import json
+import random
+import sys
+
+from agents import kpi_binary, kpi_compute
+from agents.kpi_agent import KPIAgent
+from benchmarks.common import best_of
+
+
+def make_bodies(values):
+    floats = array("d", values)
+    if sys.byteorder != "little":
+        floats.byteswap()
+    packed = floats.tobytes()
+    bodies = {
+        "json": ("application/json", json.dumps({"metrics": values}).encode()),
+        "float64": (kpi_binary.FLOAT64_CONTENT_TYPE, packed),
+    }
+    if kpi_binary.msgpack is not None:
+        bodies["msgpack"] = (kpi_binary.MSGPACK_CONTENT_TYPES[0], kpi_binary.msgpack.packb({"metrics": packed}))
+    if kpi_binary.pyarrow is not None:
+        pyarrow = kpi_binary.pyarrow
+        table = pyarrow.table({"metrics": pyarrow.array(values, type=pyarrow.float64())})
+        sink = io.BytesIO()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        bodies["arrow"] = (kpi_binary.ARROW_CONTENT_TYPES[0], sink.getvalue())
+    return bodies
+
+
+def decode(content_type, body):
+    if content_type == "application/json":
+        return json.loads(body)
+    return kpi_binary.build_task_data("analyze", content_type, body)
+
+
+def main():
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    values = [rng.gauss(200, 30) for _ in range(point_count)]
+    agent = KPIAgent()
+    expected = None
+
+    print(f"points: {point_count} (backend: {kpi_compute.BACKEND})")
+    print(f"{'encoding':>9} {'body (MB)':>10} {'decode (ms)':>12} {'compute (ms)':>13} {'total (ms)':>11}")
+    json_total = None
+    for name, (content_type, body) in make_bodies(values).items():
+        data = decode(content_type, body)
+        result = asyncio.run(agent._analyze_metrics(data))
+        if expected is None:
+            expected = result["average"]
+        assert abs(result["average"] - expected) < 1e-6 * abs(expected), (name, result["average"], expected)
+
+        decode_time = best_of(lambda: decode(content_type, body))
+        compute_time = best_of(lambda: asyncio.run(agent._analyze_metrics(data)))
+        total = decode_time + compute_time
+        json_total = json_total or total
+        print(f"{name:>9} {len(body) / 1e6:>10.2f} {decode_time * 1000:>12.2f} {compute_time * 1000:>13.2f} "
+              f"{total * 1000:>11.2f} ({json_total / total:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Check parity of the NumPy and pure-Python KPI backends and time them
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_compute [point_count]
+"""
+import math
+import random
+import sys
+
+from agents import kpi_compute
+from benchmarks.common import best_of
+
+
+def close(a, b) -> bool:
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def check_parity(rng: random.Random):
+    cases = [
+        [5],
+        [1, 2],
+        [100, 150, 120, 180, 200],
+        [rng.uniform(-1e3, 1e3) for _ in range(1001)],
+        [rng.randint(0, 10 ** 6) for _ in range(2000)],
+    ]
+    for values in cases:
+        kpi_compute.set_backend("python")
+        expected = kpi_compute.describe(values)
+        expected_many = kpi_compute.describe_many({"a": values, "b": values[::-1]})
+        kpi_compute.set_backend("numpy")
+        actual = kpi_compute.describe(values)
+        actual_many = kpi_compute.describe_many({"a": values, "b": values[::-1]})
+
+        for key in expected:
+            assert close(expected[key], actual[key]), (key, expected[key], actual[key])
+        for name in expected_many:
+            for key in expected_many[name]:
+                assert close(expected_many[name][key], actual_many[name][key]), (name, key)
+    print(f"parity: {len(cases)} cases ok")
+
+
+def main():
+    if not kpi_compute.HAS_NUMPY:
+        print("NumPy is not installed; nothing to compare")
+        return
+
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    check_parity(rng)
+
+    values = [rng.gauss(250, 40) for _ in range(point_count)]
+    report = {f"metric_{i}": values[i::50] for i in range(50)}
+
+    for backend in ("python", "numpy"):
+        kpi_compute.set_backend(backend)
+        describe_time = best_of(lambda: kpi_compute.describe(values), repeat=1)
+        report_time = best_of(lambda: kpi_compute.describe_many(report), repeat=1)
+        print(f"{backend:>6}: describe {point_count} points {describe_time:.3f}s, "
+              f"report of {len(report)} metrics {report_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
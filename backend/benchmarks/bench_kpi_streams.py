@@ -0,0 +1,52 @@
+"""Compare re-posting a growing KPI history with appending to a KPI stream
+
+A dashboard refresh either re-sends the whole history to analyze_metrics or
+appends the newest points to a stream and reads its aggregates; the second
+should cost the same at every history length.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_streams [max_history]
+"""
+import asyncio
+import random
+import sys
+
+from agents.kpi_agent import KPIAgent
+from benchmarks.common import best_of
+
+NEW_POINTS = 10
+
+
+def refresh_full(agent, history):
+    return asyncio.run(agent._analyze_metrics({"metrics": history}))
+
+
+def refresh_stream(agent, points):
+    return asyncio.run(agent._kpi_stream_append({"stream": "latency", "points": points}))
+
+
+def main():
+    max_history = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+
+    print(f"{'history':>10} {'full re-post (ms)':>18} {'stream append (ms)':>19}")
+    history_size = 10_000
+    while history_size <= max_history:
+        history = [rng.gauss(200, 30) for _ in range(history_size)]
+        agent = KPIAgent()
+        refresh_stream(agent, history)
+        points = [rng.gauss(200, 30) for _ in range(NEW_POINTS)]
+
+        full_time = best_of(lambda: refresh_full(agent, history + points))
+        stream_time = best_of(lambda: refresh_stream(agent, points))
+        print(f"{history_size:>10} {full_time * 1000:>18.2f} {stream_time * 1000:>19.3f}")
+        history_size *= 10
+
+    agent = KPIAgent()
+    points = [rng.gauss(200, 30) for _ in range(100_000)]
+    append_time = best_of(lambda: refresh_stream(agent, points), repeat=1)
+    print(f"append throughput: {len(points) / append_time:,.0f} points/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Time the trend engine on a long KPI series and check what it finds
+
+The series has a slow drift, a daily season of 1440 minutely points, noise
+and two level shifts at known positions. The report gives the time of each
+stage and checks that the regression, the season length and the change
+points match what was put in.
+
+Run from the backend directory:
+    python -m benchmarks.bench_kpi_trends [point_count]
+"""
+import math
+import random
+import sys
+import time
+
+from agents import kpi_compute, kpi_trends
+
+SEASON_LENGTH = 1440
+DRIFT = 1e-5
+SHIFTS = ((0.4, 8.0), (0.75, -4.0))
+
+
+def make_series(point_count, rng):
+    values = [
+        100 + DRIFT * x + 5 * math.sin(2 * math.pi * x / SEASON_LENGTH) + rng.gauss(0, 2)
+        for x in range(point_count)
+    ]
+    for share, shift in SHIFTS:
+        start = int(share * point_count)
+        values[start:] = [value + shift for value in values[start:]]
+    if kpi_compute.BACKEND == "numpy":
+        values = kpi_compute.np.asarray(values)
+    return values
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    point_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    values = make_series(point_count, random.Random(42))
+
+    regression, regression_time = timed(kpi_trends.linear_trend, values)
+    season_length, season_time = timed(kpi_trends.detect_season_length, values)
+    segmentation, change_time = timed(
+        kpi_trends.change_points, values, kpi_trends.DEFAULT_MAX_CHANGE_POINTS, None,
+        season_length or SEASON_LENGTH
+    )
+
+    print(f"points: {point_count} (backend: {kpi_compute.BACKEND})")
+    print(f"regression     : {regression_time * 1000:8.1f}ms slope {regression['slope']:.3g}/point, "
+          f"confidence {regression['confidence']:.3f}")
+    print(f"season length  : {season_time * 1000:8.1f}ms found {season_length} (true {SEASON_LENGTH})")
+    print(f"change points  : {change_time * 1000:8.1f}ms drift {segmentation['drift_per_point']:.3g}/point "
+          f"(true {DRIFT:g})")
+    print(f"{'index':>10} {'true index':>10} {'delta':>8} {'true delta':>10}")
+    found = segmentation["change_points"]
+    assert len(found) == len(SHIFTS), found
+    for point, (share, shift) in zip(found, SHIFTS):
+        true_index = int(share * point_count)
+        print(f"{point['index']:>10} {true_index:>10} {point['delta']:>8.2f} {shift:>10.2f}")
+        assert abs(point["index"] - true_index) <= point_count // 1000, (point, true_index)
+        assert abs(point["delta"] - shift) <= 0.5, (point, shift)
+
+
+if __name__ == "__main__":
+    main()
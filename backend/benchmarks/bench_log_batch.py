@@ -0,0 +1,48 @@
+"""Compare memory and parse time of ParsedLogBatch with per-line dicts
+
+Run from the backend directory:
+    python -m benchmarks.bench_log_batch [line_count]
+"""
+import sys
+import tracemalloc
+
+from agents.log_batch import ParsedLogBatch
+from agents.logs_agent import LogsAgent
+from benchmarks.common import best_of, generate_log_lines
+
+
+def traced_megabytes(func) -> float:
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1e6
+
+
+def build_dicts(agent, lines):
+    return [agent._parse_log_line(line) for line in lines]
+
+
+def build_batch(lines):
+    batch = ParsedLogBatch.from_lines(lines)
+    batch.level_counts()
+    return batch
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = generate_log_lines(line_count)
+    agent = LogsAgent()
+
+    assert build_batch(lines).to_dicts() == build_dicts(agent, lines)
+
+    print(f"lines: {line_count}")
+    print(f"per-line dicts : {traced_megabytes(lambda: build_dicts(agent, lines)):.1f} MB, "
+          f"{best_of(lambda: build_dicts(agent, lines)):.3f}s")
+    print(f"ParsedLogBatch : {traced_megabytes(lambda: build_batch(lines)):.1f} MB, "
+          f"{best_of(lambda: build_batch(lines)):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
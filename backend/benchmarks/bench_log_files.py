@@ -0,0 +1,75 @@
+"""Compare summarize_logs over a server-side log file with the same logs posted inline as JSON
+
+The inline figures include decoding the JSON request body, which is what the
+server pays before the analysis can start. Peak memory is the Python heap
+high-water mark of one run.
+
+Run from the backend directory:
+    python -m benchmarks.bench_log_files [line_count]
+"""
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from agents import settings
+from agents.logs_agent import LogsAgent
+from benchmarks.common import best_of, generate_log_lines
+
+
+def run_inline(agent, body):
+    return asyncio.run(agent._summarize_logs(json.loads(body)))
+
+
+def run_path(agent, path):
+    return asyncio.run(agent._summarize_logs({"path": path}))
+
+
+def peak_memory(func) -> float:
+    """Peak Python heap usage of one call, in MB"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = generate_log_lines(line_count)
+    agent = LogsAgent()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.LOG_SOURCE_ROOTS = (directory,)
+        plain_path = os.path.join(directory, "app.log")
+        gzip_path = os.path.join(directory, "app.log.1.gz")
+        text = "\n".join(lines) + "\n"
+        with open(plain_path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        with gzip.open(gzip_path, "wt", encoding="utf-8") as handle:
+            handle.write(text)
+        body = json.dumps({"logs": lines})
+
+        expected = run_inline(agent, body)
+        assert run_path(agent, plain_path) == expected
+        assert run_path(agent, gzip_path) == expected
+
+        inline_time = best_of(lambda: run_inline(agent, body))
+        plain_time = best_of(lambda: run_path(agent, plain_path))
+        gzip_time = best_of(lambda: run_path(agent, gzip_path))
+        inline_memory = peak_memory(lambda: run_inline(agent, body))
+        plain_memory = peak_memory(lambda: run_path(agent, plain_path))
+        gzip_memory = peak_memory(lambda: run_path(agent, gzip_path))
+
+    print(f"lines: {line_count} ({len(body) / 1e6:.1f} MB as JSON)")
+    print(f"inline JSON logs : {inline_time:.3f}s, peak {inline_memory:.1f} MB")
+    print(f"mmap log file    : {plain_time:.3f}s ({inline_time / plain_time:.2f}x), peak {plain_memory:.1f} MB")
+    print(f"gzip log file    : {gzip_time:.3f}s ({inline_time / gzip_time:.2f}x), peak {gzip_memory:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
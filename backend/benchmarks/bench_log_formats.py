@@ -0,0 +1,64 @@
+"""Measure parsing throughput of each registered log format, in lines/sec
+
+Each run detects the format from a sample and then parses the whole batch
+with it, as the log tasks do.
+
+Run from the backend directory:
+    python -m benchmarks.bench_log_formats [line_count]
+"""
+import json
+import sys
+
+from agents.log_batch import ParsedLogBatch
+from agents.log_formats import detect_log_format
+from benchmarks.common import best_of, generate_log_lines
+
+SYSLOG_PRIORITIES = {"DEBUG": 15, "INFO": 14, "WARN": 12, "ERROR": 11}
+HTTP_STATUSES = {"DEBUG": 304, "INFO": 200, "WARN": 404, "ERROR": 503}
+
+
+def convert(lines):
+    """The same synthetic logs rendered in every supported format"""
+    batch = ParsedLogBatch.from_lines(lines)
+    rows = [(batch.timestamp(row), batch.level(row), batch.message(row)) for row in range(len(batch))]
+    return {
+        "bracket": lines,
+        "json": [
+            json.dumps({"timestamp": ts.replace(" ", "T") + "Z", "level": level.lower(), "message": message})
+            for ts, level, message in rows
+        ],
+        "logfmt": [
+            f'ts={ts.replace(" ", "T")}Z level={level.lower()} msg={json.dumps(message)}'
+            for ts, level, message in rows
+        ],
+        "combined": [
+            f'10.0.0.1 - - [01/Jan/2024:{ts[11:]} +0000] "GET /api/{row} HTTP/1.1" '
+            f'{HTTP_STATUSES[level]} {len(message)} "-" "bench"'
+            for row, (ts, level, message) in enumerate(rows)
+        ],
+        "syslog": [
+            f"<{SYSLOG_PRIORITIES[level]}>Jan  1 {ts[11:]} host app[42]: {message}"
+            for ts, level, message in rows
+        ],
+    }
+
+
+def parse(lines):
+    batch = ParsedLogBatch.from_lines(lines, detect_log_format(lines))
+    return batch.level_counts(), batch.first_and_last_timestamp()
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    samples = convert(generate_log_lines(line_count))
+
+    print(f"lines: {line_count}")
+    print(f"{'format':>10} {'detected':>10} {'seconds':>8} {'lines/sec':>12}")
+    for name, lines in samples.items():
+        detected = detect_log_format(lines).name
+        elapsed = best_of(lambda: parse(lines))
+        print(f"{name:>10} {detected:>10} {elapsed:>8.3f} {line_count / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Measure template mining throughput at growing input sizes
+
+Throughput should stay flat as the input grows (linear total cost), and the
+number of templates should stay bounded.
+
+Run from the backend directory:
+    python -m benchmarks.bench_log_templates [line_count]
+"""
+import sys
+
+from agents.log_batch import ParsedLogBatch
+from agents.log_templates import LogTemplateMiner
+from benchmarks.common import best_of, generate_log_lines
+
+
+def mine(messages):
+    miner = LogTemplateMiner()
+    for message in messages:
+        miner.add(message)
+    return miner
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    batch = ParsedLogBatch.from_lines(generate_log_lines(line_count))
+    messages = [batch.message(row) for row in range(len(batch))]
+
+    print(f"{'lines':>10} {'seconds':>8} {'lines/sec':>12} {'templates':>10}")
+    size = max(line_count // 4, 1)
+    while size <= line_count:
+        subset = messages[:size]
+        elapsed = best_of(lambda: mine(subset), repeat=2)
+        print(f"{size:>10} {elapsed:>8.3f} {size / elapsed:>12,.0f} {len(mine(subset).clusters):>10}")
+        size *= 2
+
+    for template in mine(messages).templates(5):
+        print(f"{template['count']:>8}  {template['template']}")
+
+
+if __name__ == "__main__":
+    main()
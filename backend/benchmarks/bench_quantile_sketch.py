@@ -0,0 +1,76 @@
+"""Check DDSketch percentiles against exact ones and time both
+
+Builds one sketch over the whole sample and one from partial sketches merged
+after a JSON round trip (as partial results from several workers would be),
+and reports the relative error of each percentile, the build and merge
+times and the size of the sketch. On data that fits in memory a sort is
+competitive; the sketch's point is that its size does not grow with the
+sample, so it works on streams and partial results too large to keep.
+
+Run from the backend directory:
+    python -m benchmarks.bench_quantile_sketch [sample_count]
+"""
+import json
+import math
+import random
+import sys
+import time
+
+from agents import kpi_compute
+from agents.quantile_sketch import DEFAULT_PERCENTILES, DDSketch, merge_sketches
+from benchmarks.common import best_of
+
+PARTS = 8
+
+
+def exact_percentile(ordered, percentile):
+    """Lower percentile of a sorted sample, the rank convention the sketch follows"""
+    return ordered[int(percentile / 100 * (len(ordered) - 1))]
+
+
+def build(samples):
+    sketch = DDSketch()
+    sketch.add_many(samples)
+    return sketch
+
+
+def main():
+    sample_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    rng = random.Random(42)
+    # Log-normal response times with a heavy tail, in ms
+    samples = [rng.lognormvariate(5, 1.2) for _ in range(sample_count)]
+    sort = sorted
+    if kpi_compute.BACKEND == "numpy":
+        samples = kpi_compute.np.asarray(samples)
+        sort = kpi_compute.np.sort
+
+    exact_time = best_of(lambda: sort(samples), repeat=1)
+    ordered = sort(samples)
+    sketch_time = best_of(lambda: build(samples), repeat=1)
+    sketch = build(samples)
+
+    parts = [build(samples[part::PARTS]).to_dict() for part in range(PARTS)]
+    payload = json.dumps(parts[0])
+    started = time.perf_counter()
+    merged = merge_sketches(json.loads(json.dumps(part)) for part in parts)
+    merge_time = time.perf_counter() - started
+
+    print(f"samples: {sample_count} (backend: {kpi_compute.BACKEND})")
+    print(f"exact (sort)   : {exact_time:.3f}s")
+    print(f"sketch build   : {sketch_time:.3f}s ({exact_time / sketch_time:.1f}x)")
+    print(f"memory         : {len(sketch.positive)} buckets vs {sample_count} samples held for the sort")
+    print(f"merge {PARTS} parts  : {merge_time * 1000:.2f}ms, {len(payload) / 1024:.1f} KB per serialized sketch")
+    print(f"{'percentile':>10} {'exact':>12} {'sketch':>12} {'merged':>12} {'rel. error':>10}")
+    for percentile in DEFAULT_PERCENTILES:
+        exact = exact_percentile(ordered, percentile)
+        estimate = sketch.quantile(percentile / 100)
+        merged_estimate = merged.quantile(percentile / 100)
+        error = abs(estimate - exact) / exact
+        assert error <= sketch.relative_accuracy + 1e-9, (percentile, error)
+        assert math.isclose(estimate, merged_estimate), (percentile, estimate, merged_estimate)
+        print(f"{'p' + format(percentile, 'g'):>10} {exact:>12.2f} {estimate:>12.2f} "
+              f"{merged_estimate:>12.2f} {error:>10.4%}")
+
+
+if __name__ == "__main__":
+    main()
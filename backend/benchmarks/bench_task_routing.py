@@ -0,0 +1,81 @@
+"""Measure the per-request cost of routing a task to its agent and handler
+
+Times the orchestrator's table lookup against the former list-and-keyword
+routing (rebuilt lists, linear `in` checks, substring scans), for task
+types early and late in those lists and for an unknown type, then the
+whole orchestrator.process overhead for a trivial task (cache disabled,
+inline executor) against calling its handler directly.
+
+Run from the backend directory:
+    python -m benchmarks.bench_task_routing [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from agents.executor import TaskExecutor
+from agents.orchestrator_agent import OrchestratorAgent
+
+
+def list_routing(task_type):
+    """Routing as done before the dispatch table: rebuilt lists and keyword scans"""
+    kpi_tasks = [
+        "analyze_metrics", "calculate_kpi", "calculate_kpi_batch", "trend_analysis", "performance_report",
+        "detect_anomalies", "kpi_stream_append", "kpi_stream_query", "kpi_stream_delete"
+    ]
+    logs_tasks = [
+        "parse_logs", "find_errors", "analyze_patterns", "filter_logs", "summarize_logs", "analyze_logs",
+        "log_histogram", "summarize_stream", "register_error_patterns", "register_log_source"
+    ]
+    if task_type in kpi_tasks:
+        return "kpi"
+    elif task_type in logs_tasks:
+        return "logs"
+    elif task_type in ["multi_agent", "status", "agent_info"]:
+        return "orchestrator"
+    if any(keyword in task_type.lower() for keyword in ["kpi", "metric", "performance", "trend"]):
+        return "kpi"
+    elif any(keyword in task_type.lower() for keyword in ["log", "error", "parse", "filter"]):
+        return "logs"
+    return "orchestrator"
+
+
+def per_call_ns(function, argument, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    orchestrator = OrchestratorAgent()
+    orchestrator.result_cache.max_entries = 0
+    orchestrator.executor = TaskExecutor(mode="inline")
+
+    print(f"{'task type':<24} {'lists (ns)':>11} {'table (ns)':>11}")
+    for task_type in ("analyze_metrics", "register_log_source", "agent_info", "no_such_task"):
+        assert list_routing(task_type) == orchestrator._determine_agent(task_type)
+        print(f"{task_type:<24} {per_call_ns(list_routing, task_type, iterations):>11.0f} "
+              f"{per_call_ns(orchestrator._determine_agent, task_type, iterations):>11.0f}")
+
+    task = {"type": "calculate_kpi", "data": {"kpi_type": "conversion_rate", "values": {"conversions": 1, "total": 4}}}
+    agent = orchestrator.kpi_agent
+    requests = iterations // 10
+
+    async def direct():
+        for _ in range(requests):
+            await agent._calculate_kpi(task["data"])
+
+    async def routed():
+        for _ in range(requests):
+            await orchestrator.process(task)
+
+    for label, run in (("handler called directly", direct), ("orchestrator.process", routed)):
+        started = time.perf_counter()
+        asyncio.run(run())
+        print(f"{label:<24} {(time.perf_counter() - started) / requests * 1e6:>8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure request throughput of a live server and check its reported totals
+
+Sends calculate_kpi requests from a pool of client threads and reports the
+requests per second, then checks that /api/agents/status counts exactly
+the requests sent, whichever worker process served them. Start the server
+with several workers and the result cache disabled, then compare with a
+single worker:
+
+    AGENT_WORKERS=4 AGENT_CACHE_MAX_ENTRIES=0 python main.py
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers [--requests 2000] [--clients 32] [--url http://localhost:8000]
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import settings
+
+
+def get_json(url):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+def post_json(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def completed(url):
+    return get_json(f"{url}/api/agents/status")["agents"]["kpi"]["tasks_completed"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--url", default="http://localhost:8000")
+    args = parser.parse_args()
+
+    calculate = f"{args.url}/api/agents/kpi/calculate"
+    # A varying total keeps requests distinct should the result cache be enabled
+    bodies = [{"kpi_type": "conversion_rate", "values": {"conversions": 1, "total": 2 + index}}
+              for index in range(args.requests)]
+    before = completed(args.url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as clients:
+        results = list(clients.map(lambda body: post_json(calculate, body), bodies))
+    elapsed = time.perf_counter() - started
+    assert all(result["status"] == "success" for result in results)
+
+    # Other workers publish their counts every AGENT_SHARED_STATE_SYNC_SECONDS
+    time.sleep(settings.SHARED_STATE_SYNC_SECONDS + 0.5)
+    status = get_json(f"{args.url}/api/agents/status")
+    # Workers appear once they served a request
+    workers = len(status.get("workers", {}).get("processes", [])) or 1
+    print(f"{args.requests} requests from {args.clients} clients to {workers} worker(s): "
+          f"{elapsed:.2f}s, {args.requests / elapsed:.0f} requests/s")
+    counted = status["agents"]["kpi"]["tasks_completed"] - before
+    print(f"status counts {counted} of {args.requests} requests")
+    assert counted == args.requests
+
+
+if __name__ == "__main__":
+    main()
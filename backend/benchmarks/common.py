@@ -0,0 +1,39 @@
+from typing import List
+import random
+import time
+
+
+LEVELS = ["INFO", "DEBUG", "WARN", "ERROR"]
+
+MESSAGES = [
+    "Request processed successfully in {n}ms",
+    "User {n} logged in",
+    "Loading configuration from /etc/app/{n}.yaml",
+    "Cache miss for key session:{n}",
+    "Failed to authenticate user {n}",
+    "Database connection timeout after {n}ms",
+    "Connection refused by 10.0.0.{n}",
+    "Heartbeat ok",
+]
+
+
+def generate_log_lines(count: int, seed: int = 42) -> List[str]:
+    """Generate synthetic log lines in the default bracket format"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        minute, second = divmod(i % 3600, 60)
+        level = rng.choice(LEVELS)
+        message = rng.choice(MESSAGES).format(n=rng.randint(1, 999))
+        lines.append(f"[2024-01-01 10:{minute:02d}:{second:02d}] {level}: {message}")
+    return lines
+
+
+def best_of(func, repeat: int = 3) -> float:
+    """Return the best wall-clock time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
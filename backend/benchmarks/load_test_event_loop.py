@@ -0,0 +1,77 @@
+"""Measure /health latency while heavy log analyses run against a live server
+
+Start the server first (e.g. `python main.py`, optionally with
+AGENT_EXECUTOR=inline to see the old behaviour), then run from the backend
+directory:
+    python -m benchmarks.load_test_event_loop --url http://localhost:8000
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+
+from benchmarks.common import generate_log_lines
+
+
+def post_json(url: str, payload: bytes):
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def probe_health(url: str, duration: float, interval: float = 0.02):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{url}/health") as response:
+            response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def describe(label: str, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<12} /health p50 {statistics.median(latencies):7.1f}ms  "
+          f"p99 {p99:7.1f}ms  max {latencies[-1]:7.1f}ms  ({len(latencies)} probes)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    payload = json.dumps({"logs": generate_log_lines(args.lines)}).encode()
+
+    describe("idle", probe_health(args.url, min(args.duration, 3.0)))
+
+    stop = threading.Event()
+    completed = [0]
+
+    def hammer():
+        while not stop.is_set():
+            post_json(f"{args.url}/api/agents/logs/summarize", payload)
+            completed[0] += 1
+
+    workers = [threading.Thread(target=hammer, daemon=True) for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.5)
+
+    describe("under load", probe_health(args.url, args.duration))
+    stop.set()
+    for worker in workers:
+        worker.join()
+    print(f"summarize requests completed under load: {completed[0]} "
+          f"({args.lines} lines each, concurrency {args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
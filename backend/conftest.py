@@ -0,0 +1 @@
+"""Lets pytest import the backend packages (agents, routes, main) from the tests directory"""
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes.agent_routes import router as agent_router
+from fastapi.responses import PlainTextResponse
+from routes.agent_routes import router as agent_router, orchestrator
+from agents import settings
 
 app = FastAPI(
     title="Triple Agent System",
@@ -28,7 +30,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "docs": "/docs",
-            "agents": "/api/agents"
+            "agents": "/api/agents",
+            "metrics": "/metrics"
         }
     }
 
@@ -38,6 +41,14 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-task metrics in the Prometheus text format, across all server workers"""
+    registry = await orchestrator.metrics_view()
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Several workers need the app as an import string
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=settings.WORKERS)
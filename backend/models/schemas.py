@@ -8,6 +8,12 @@ class TaskRequest(BaseModel):
     data: Dict[str, Any] = {}
 
 
+class JobRequest(BaseModel):
+    type: str
+    data: Dict[str, Any] = {}
+    priority: int = 0
+
+
 class TaskResponse(BaseModel):
     status: str
     data: Dict[str, Any] = {}
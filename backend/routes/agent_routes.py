@@ -1,13 +1,42 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
-from models.schemas import TaskRequest, TaskResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional
+import json
+from models.schemas import JobRequest, TaskRequest, TaskResponse
 from agents.orchestrator_agent import OrchestratorAgent
+from agents.jobs import JOB_STATES, QueueFullError
+from agents.log_stream import iter_log_lines
+from agents.kpi_binary import BINARY_TASKS, build_task_data
 
 router = APIRouter(prefix="/api/agents", tags=["agents"])
 
 # Initialize the orchestrator
 orchestrator = OrchestratorAgent()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Longest a job poll may wait for the job to finish, in seconds
+MAX_JOB_WAIT_SECONDS = 60
+
+
+async def run_log_entry_task(task: Dict[str, Any], http_request: Request):
+    """Run a task returning log entries, streamed as NDJSON when the client accepts it"""
+    if NDJSON_MEDIA_TYPE not in http_request.headers.get("accept", ""):
+        return await orchestrator.process(task)
+    # Opening the files and producing the first entries may block
+    await orchestrator.sync_shared_state()
+    lines = await run_in_threadpool(orchestrator.stream, task)
+    if isinstance(lines, dict):
+        return lines
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.on_event("shutdown")
+async def shutdown_orchestrator():
+    """Stop the job workers, the shared state publisher and the worker processes"""
+    await orchestrator.shutdown()
+
 
 @router.post("/task", response_model=TaskResponse)
 async def execute_task(task: TaskRequest):
@@ -22,10 +51,66 @@ async def execute_task(task: TaskRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/jobs", status_code=202)
+async def submit_job(job: JobRequest):
+    """Queue a task and return its job id right away; 429 when the queue is full"""
+    try:
+        submitted = orchestrator.jobs.submit({"type": job.type, "data": job.data}, job.priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return {"status": "success", "job": submitted}
+
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 100):
+    """List the most recently submitted jobs, without their results"""
+    if status is not None and status not in JOB_STATES:
+        return {"status": "error", "message": f"Unknown job status: {status}"}
+    return {"status": "success", "jobs": orchestrator.jobs.list(status, limit)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Get a job and, once finished, its result; `wait` long-polls up to that many seconds"""
+    if wait > 0:
+        job = await orchestrator.jobs.wait(job_id, min(wait, MAX_JOB_WAIT_SECONDS))
+    else:
+        job = orchestrator.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {"status": "success", "job": job}
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream a job as NDJSON: one line now and one per state change, the last with its result"""
+    if orchestrator.jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    async def lines() -> AsyncIterator[str]:
+        async for job in orchestrator.jobs.events(job_id):
+            yield json.dumps(job, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = await orchestrator.jobs.cancel(job_id)
+    if job is None:
+        if orchestrator.jobs.get(job_id) is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        if orchestrator.jobs.held_elsewhere(job_id):
+            raise HTTPException(status_code=409, detail=f"Job runs in another worker process: {job_id}")
+        raise HTTPException(status_code=409, detail=f"Job already finished: {job_id}")
+    return {"status": "success", "job": job}
+
+
 @router.get("/status")
 async def get_system_status():
     """Get status of all agents"""
-    return orchestrator._get_system_status()
+    return await orchestrator._get_system_status()
 
 
 @router.get("/info/{agent_name}")
@@ -59,6 +144,17 @@ async def calculate_kpi(request: Dict[str, Any]):
     return result
 
 
+@router.post("/kpi/calculate/batch")
+async def calculate_kpi_batch(request: Dict[str, Any]):
+    """Calculate many KPIs in one call; each item has its own result or error"""
+    task = {
+        "type": "calculate_kpi_batch",
+        "data": request
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
 @router.post("/kpi/trend")
 async def analyze_trend(request: Dict[str, Any]):
     """Analyze trends in KPI data"""
@@ -81,26 +177,96 @@ async def generate_report(request: Dict[str, Any]):
     return result
 
 
+@router.post("/kpi/anomalies")
+async def detect_anomalies(request: Dict[str, Any]):
+    """Flag anomalous points in KPI metrics"""
+    task = {
+        "type": "detect_anomalies",
+        "data": request
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.post("/kpi/binary/{operation}")
+async def kpi_binary(operation: str, request: Request):
+    """Run a KPI task on a binary body: raw float64, msgpack or Arrow IPC"""
+    try:
+        data = build_task_data(
+            operation, request.headers.get("content-type", ""), await request.body(), request.query_params
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    task = {
+        "type": BINARY_TASKS[operation],
+        "data": data
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.get("/kpi/streams")
+async def list_kpi_streams():
+    """List the named KPI streams"""
+    task = {
+        "type": "kpi_stream_query",
+        "data": {}
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.post("/kpi/streams/{stream}")
+async def append_kpi_stream(stream: str, request: Dict[str, Any]):
+    """Append points to a KPI stream, creating it on first use"""
+    task = {
+        "type": "kpi_stream_append",
+        "data": {**request, "stream": stream}
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.get("/kpi/streams/{stream}")
+async def query_kpi_stream(stream: str):
+    """Get the rolling aggregates of a KPI stream"""
+    task = {
+        "type": "kpi_stream_query",
+        "data": {"stream": stream}
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.delete("/kpi/streams/{stream}")
+async def delete_kpi_stream(stream: str):
+    """Drop a KPI stream"""
+    task = {
+        "type": "kpi_stream_delete",
+        "data": {"stream": stream}
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
 @router.post("/logs/parse")
-async def parse_logs(request: Dict[str, Any]):
+async def parse_logs(request: Dict[str, Any], http_request: Request):
     """Parse log entries"""
     task = {
         "type": "parse_logs",
         "data": request
     }
-    result = await orchestrator.process(task)
-    return result
+    return await run_log_entry_task(task, http_request)
 
 
 @router.post("/logs/errors")
-async def find_errors(request: Dict[str, Any]):
+async def find_errors(request: Dict[str, Any], http_request: Request):
     """Find errors in logs"""
     task = {
         "type": "find_errors",
         "data": request
     }
-    result = await orchestrator.process(task)
-    return result
+    return await run_log_entry_task(task, http_request)
 
 
 @router.post("/logs/patterns")
@@ -115,14 +281,13 @@ async def analyze_patterns(request: Dict[str, Any]):
 
 
 @router.post("/logs/filter")
-async def filter_logs(request: Dict[str, Any]):
+async def filter_logs(request: Dict[str, Any], http_request: Request):
     """Filter logs based on criteria"""
     task = {
         "type": "filter_logs",
         "data": request
     }
-    result = await orchestrator.process(task)
-    return result
+    return await run_log_entry_task(task, http_request)
 
 
 @router.post("/logs/summarize")
@@ -134,3 +299,51 @@ async def summarize_logs(request: Dict[str, Any]):
     }
     result = await orchestrator.process(task)
     return result
+
+
+@router.post("/logs/analyze")
+async def analyze_logs(request: Dict[str, Any]):
+    """Run summary, pattern and error analyses over logs in one pass"""
+    task = {
+        "type": "analyze_logs",
+        "data": request
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.post("/logs/histogram")
+async def log_histogram(request: Dict[str, Any]):
+    """Count log entries per level and the error rate in 1m/5m/15m/1h/1d intervals"""
+    task = {
+        "type": "log_histogram",
+        "data": request
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.post("/logs/sources")
+async def register_log_source(request: Dict[str, Any]):
+    """Register a server-side log file or directory and index it"""
+    task = {
+        "type": "register_log_source",
+        "data": request
+    }
+    result = await orchestrator.process(task)
+    return result
+
+
+@router.post("/logs/stream/summarize")
+async def summarize_log_stream(request: Request, encoding: str = "utf-8", format: Optional[str] = None):
+    """Summarize a newline-delimited log upload (plain or gzip) as it streams in"""
+    compressed = True if request.headers.get("content-encoding", "").lower() == "gzip" else None
+    task = {
+        "type": "summarize_stream",
+        "data": {
+            "stream": iter_log_lines(request.stream(), compressed=compressed, encoding=encoding),
+            "format": format
+        }
+    }
+    result = await orchestrator.process(task)
+    return result
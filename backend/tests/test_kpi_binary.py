@@ -0,0 +1,67 @@
+"""Binary KPI bodies: NaN and ±inf never reach the JSON response"""
+from array import array
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents import kpi_binary
+from main import app
+
+np = pytest.importorskip("numpy")
+
+VALUES = [1.0, math.nan, 2.0, math.inf, -math.inf, 3.0]
+
+
+def float64_body(values):
+    return np.array(values, dtype="<f8").tobytes()
+
+
+def test_decode_float64_drops_non_finite_values():
+    assert kpi_binary.decode_float64(float64_body(VALUES)).tolist() == [1.0, 2.0, 3.0]
+
+
+def test_decode_float64_keeps_finite_bodies_in_place():
+    body = float64_body([1.0, 2.0, 3.0])
+    values = kpi_binary.decode_float64(body)
+    assert values.tolist() == [1.0, 2.0, 3.0]
+    # Still a view of the request body
+    assert not values.flags.owndata
+
+
+def test_drop_non_finite_without_numpy():
+    assert kpi_binary.drop_non_finite(array("d", VALUES)) == array("d", [1.0, 2.0, 3.0])
+    finite = array("d", [1.0, 2.0])
+    assert kpi_binary.drop_non_finite(finite) is finite
+
+
+@pytest.mark.parametrize("operation", sorted(kpi_binary.BINARY_TASKS))
+def test_non_finite_values_give_a_json_response(operation):
+    client = TestClient(app)
+    response = client.post(f"/api/agents/kpi/binary/{operation}", content=float64_body(VALUES),
+                           headers={"Content-Type": kpi_binary.FLOAT64_CONTENT_TYPE})
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+
+
+def test_analyze_ignores_non_finite_values():
+    client = TestClient(app)
+    response = client.post("/api/agents/kpi/binary/analyze", content=float64_body(VALUES),
+                           headers={"Content-Type": kpi_binary.FLOAT64_CONTENT_TYPE})
+    result = response.json()
+    assert result["total_metrics"] == 3
+    assert result["average"] == 2.0
+
+
+def test_only_non_finite_values_is_an_error():
+    client = TestClient(app)
+    response = client.post("/api/agents/kpi/binary/analyze", content=float64_body([math.nan, math.inf]),
+                           headers={"Content-Type": kpi_binary.FLOAT64_CONTENT_TYPE})
+    assert response.status_code == 200
+    assert response.json()["status"] == "error"
+
+
+def test_msgpack_series_drop_non_finite_values():
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.packb({"values": float64_body(VALUES)})
+    assert kpi_binary.build_task_data("trend", "application/msgpack", body)["values"].tolist() == [1.0, 2.0, 3.0]
@@ -0,0 +1,91 @@
+"""The NumPy and pure-Python compute backends must agree, types included"""
+import math
+
+import pytest
+
+from agents import kpi_compute
+
+pytestmark = pytest.mark.skipif(not kpi_compute.HAS_NUMPY, reason="NumPy is not installed")
+
+SERIES = [
+    [1, 2, 3, 4],
+    [1, 2, 3],
+    [1, 3],
+    [7],
+    [5, 5, 5, 5],
+    [-3, 10, 2, 8, 8],
+    [1.5, 2.25, 3.0],
+    [0.1] * 10,
+    [1e9, 1e9 + 1, 1e9 + 2],
+]
+
+
+@pytest.fixture
+def run_with_backend():
+    """Call a kpi_compute function once per backend and return both results"""
+    previous = kpi_compute.BACKEND
+
+    def run(function, *args):
+        results = {}
+        for backend in ("numpy", "python"):
+            kpi_compute.set_backend(backend)
+            results[backend] = function(*args)
+        return results["numpy"], results["python"]
+
+    yield run
+    kpi_compute.BACKEND = previous
+
+
+def assert_same(numpy_result, python_result, same_types=True):
+    """Same keys, same value types and values equal up to rounding"""
+    assert numpy_result.keys() == python_result.keys()
+    for key, expected in python_result.items():
+        actual = numpy_result[key]
+        if same_types:
+            assert type(actual) is type(expected), f"{key}: {actual!r} vs {expected!r}"
+        assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-12), f"{key}: {actual!r} vs {expected!r}"
+
+
+@pytest.mark.parametrize("values", SERIES)
+def test_describe_matches_python_backend(run_with_backend, values):
+    assert_same(*run_with_backend(kpi_compute.describe, values))
+
+
+@pytest.mark.parametrize("values", SERIES)
+def test_mean_matches_python_backend(run_with_backend, values):
+    numpy_mean, python_mean = run_with_backend(kpi_compute.mean, values)
+    assert type(numpy_mean) is type(python_mean)
+    assert math.isclose(numpy_mean, python_mean, rel_tol=1e-9)
+
+
+def test_describe_many_matches_python_backend(run_with_backend):
+    series = {f"metric_{index}": values for index, values in enumerate(SERIES)}
+    numpy_result, python_result = run_with_backend(kpi_compute.describe_many, series)
+    assert numpy_result.keys() == python_result.keys()
+    for name in series:
+        assert_same(numpy_result[name], python_result[name])
+
+
+def test_mixed_series_report_floats(run_with_backend):
+    # NumPy upcasts a mixed series as a whole, where min() and max() return the element itself
+    numpy_result, python_result = run_with_backend(kpi_compute.describe, [1, 2.5, 4])
+    assert_same(numpy_result, python_result, same_types=False)
+    assert python_result["min"] == 1 and type(python_result["min"]) is int
+    assert numpy_result["min"] == 1.0 and type(numpy_result["min"]) is float
+
+
+def test_describe_many_empty(run_with_backend):
+    assert run_with_backend(kpi_compute.describe_many, {}) == ({}, {})
+
+
+def test_integer_results_stay_integers(run_with_backend):
+    numpy_result, python_result = run_with_backend(kpi_compute.describe, [1, 2, 3])
+    for result in (numpy_result, python_result):
+        assert result["mean"] == 2 and type(result["mean"]) is int
+        assert result["median"] == 2 and type(result["median"]) is int
+        assert type(result["min"]) is int and type(result["max"]) is int
+
+    # The median of an even-length series averages the middle pair
+    numpy_result, python_result = run_with_backend(kpi_compute.describe, [1, 3])
+    assert numpy_result["median"] == python_result["median"] == 2.0
+    assert type(numpy_result["median"]) is type(python_result["median"]) is float
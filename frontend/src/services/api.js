@@ -22,6 +22,22 @@ export const agentService = {
     return response.data;
   },
 
+  // Jobs
+  submitJob: async (task, priority = 0) => {
+    const response = await api.post('/agents/jobs', { ...task, priority });
+    return response.data;
+  },
+
+  getJob: async (jobId, wait = 0) => {
+    const response = await api.get(`/agents/jobs/${jobId}`, { params: { wait } });
+    return response.data;
+  },
+
+  cancelJob: async (jobId) => {
+    const response = await api.delete(`/agents/jobs/${jobId}`);
+    return response.data;
+  },
+
   // KPI operations
   analyzeMetrics: async (data) => {
     const response = await api.post('/agents/kpi/analyze', data);
@@ -33,6 +49,11 @@ export const agentService = {
     return response.data;
   },
 
+  calculateKPIBatch: async (items) => {
+    const response = await api.post('/agents/kpi/calculate/batch', { items });
+    return response.data;
+  },
+
   analyzeTrend: async (data) => {
     const response = await api.post('/agents/kpi/trend', data);
     return response.data;
@@ -43,6 +64,11 @@ export const agentService = {
     return response.data;
   },
 
+  detectAnomalies: async (data) => {
+    const response = await api.post('/agents/kpi/anomalies', data);
+    return response.data;
+  },
+
   // Logs operations
   parseLogs: async (data) => {
     const response = await api.post('/agents/logs/parse', data);
@@ -69,6 +95,16 @@ export const agentService = {
     return response.data;
   },
 
+  analyzeLogs: async (data) => {
+    const response = await api.post('/agents/logs/analyze', data);
+    return response.data;
+  },
+
+  logHistogram: async (data) => {
+    const response = await api.post('/agents/logs/histogram', data);
+    return response.data;
+  },
+
   // Generic task execution
   executeTask: async (task) => {
     const response = await api.post('/agents/task', task);